@@ -0,0 +1,32 @@
+// a call tree five levels deep, each function calling the one below twice
+int g0(int x) {
+    return x * 3 + 1;
+}
+int g1(int x) {
+    int a = g0(x + 1);
+    int b = g0(a % 97);
+    return (a + b) % 100003;
+}
+int g2(int x) {
+    int a = g1(x + 1);
+    int b = g1(a % 97);
+    return (a + b) % 100003;
+}
+int g3(int x) {
+    int a = g2(x + 1);
+    int b = g2(a % 97);
+    return (a + b) % 100003;
+}
+int g4(int x) {
+    int a = g3(x + 1);
+    int b = g3(a % 97);
+    return (a + b) % 100003;
+}
+int g5(int x) {
+    int a = g4(x + 1);
+    int b = g4(a % 97);
+    return (a + b) % 100003;
+}
+int kernel(int x) {
+    return g5(x);
+}
\ No newline at end of file
@@ -0,0 +1,26 @@
+// digit sum of a ten digit number, all division and remainder by constants
+int kernel(int x) {
+    int n = x * 7919 + 104729;
+    int s = 0;
+    s = s + n % 10;
+    n = n / 10;
+    s = s + n % 10;
+    n = n / 10;
+    s = s + n % 10;
+    n = n / 10;
+    s = s + n % 10;
+    n = n / 10;
+    s = s + n % 10;
+    n = n / 10;
+    s = s + n % 10;
+    n = n / 10;
+    s = s + n % 10;
+    n = n / 10;
+    s = s + n % 10;
+    n = n / 10;
+    s = s + n % 10;
+    n = n / 10;
+    s = s + n % 10;
+    n = n / 10;
+    return s;
+}
\ No newline at end of file
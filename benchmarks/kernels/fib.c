@@ -0,0 +1,127 @@
+// 40 steps of the Fibonacci recurrence mod 1e9+7 from a seed taken from x
+int kernel(int x) {
+    int a = x % 1000;
+    int b = 1;
+    int t = 0;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    t = (a + b) % 1000000007;
+    a = b;
+    b = t;
+    return b;
+}
\ No newline at end of file
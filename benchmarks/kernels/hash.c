@@ -0,0 +1,21 @@
+// polynomial rolling hash of 16 characters derived from x
+int kernel(int x) {
+    int h = 0;
+    h = (h * 131 + (x + 0) % 26 + 97) % 1000003;
+    h = (h * 131 + (x + 7) % 26 + 97) % 1000003;
+    h = (h * 131 + (x + 14) % 26 + 97) % 1000003;
+    h = (h * 131 + (x + 21) % 26 + 97) % 1000003;
+    h = (h * 131 + (x + 28) % 26 + 97) % 1000003;
+    h = (h * 131 + (x + 35) % 26 + 97) % 1000003;
+    h = (h * 131 + (x + 42) % 26 + 97) % 1000003;
+    h = (h * 131 + (x + 49) % 26 + 97) % 1000003;
+    h = (h * 131 + (x + 56) % 26 + 97) % 1000003;
+    h = (h * 131 + (x + 63) % 26 + 97) % 1000003;
+    h = (h * 131 + (x + 70) % 26 + 97) % 1000003;
+    h = (h * 131 + (x + 77) % 26 + 97) % 1000003;
+    h = (h * 131 + (x + 84) % 26 + 97) % 1000003;
+    h = (h * 131 + (x + 91) % 26 + 97) % 1000003;
+    h = (h * 131 + (x + 98) % 26 + 97) % 1000003;
+    h = (h * 131 + (x + 105) % 26 + 97) % 1000003;
+    return h;
+}
\ No newline at end of file
@@ -0,0 +1,22 @@
+// a degree 16 polynomial evaluated by Horner's rule
+double kernel(double x) {
+    double t = x / 1000.0;
+    double p = 9.32;
+    p = p * t + 5.88;
+    p = p * t + 8.03;
+    p = p * t + 7.99;
+    p = p * t + 3.83;
+    p = p * t + 0.20;
+    p = p * t + 1.47;
+    p = p * t + 7.31;
+    p = p * t + 6.69;
+    p = p * t + 1.73;
+    p = p * t + 3.01;
+    p = p * t + 3.52;
+    p = p * t + 4.23;
+    p = p * t + 6.20;
+    p = p * t + 1.17;
+    p = p * t + 9.79;
+    p = p * t + 7.16;
+    return p;
+}
\ No newline at end of file
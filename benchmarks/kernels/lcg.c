@@ -0,0 +1,37 @@
+// 32 steps of a linear congruential generator; CPL ints wrap, so the C side is built with -fwrapv
+int kernel(int x) {
+    int s = x;
+    s = s * 1103515245 + 12345;
+    s = s * 1103515245 + 12345;
+    s = s * 1103515245 + 12345;
+    s = s * 1103515245 + 12345;
+    s = s * 1103515245 + 12345;
+    s = s * 1103515245 + 12345;
+    s = s * 1103515245 + 12345;
+    s = s * 1103515245 + 12345;
+    s = s * 1103515245 + 12345;
+    s = s * 1103515245 + 12345;
+    s = s * 1103515245 + 12345;
+    s = s * 1103515245 + 12345;
+    s = s * 1103515245 + 12345;
+    s = s * 1103515245 + 12345;
+    s = s * 1103515245 + 12345;
+    s = s * 1103515245 + 12345;
+    s = s * 1103515245 + 12345;
+    s = s * 1103515245 + 12345;
+    s = s * 1103515245 + 12345;
+    s = s * 1103515245 + 12345;
+    s = s * 1103515245 + 12345;
+    s = s * 1103515245 + 12345;
+    s = s * 1103515245 + 12345;
+    s = s * 1103515245 + 12345;
+    s = s * 1103515245 + 12345;
+    s = s * 1103515245 + 12345;
+    s = s * 1103515245 + 12345;
+    s = s * 1103515245 + 12345;
+    s = s * 1103515245 + 12345;
+    s = s * 1103515245 + 12345;
+    s = s * 1103515245 + 12345;
+    s = s * 1103515245 + 12345;
+    return s;
+}
\ No newline at end of file
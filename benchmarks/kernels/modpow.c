@@ -0,0 +1,33 @@
+// x^1000000 mod 46337 by square and multiply, the exponent unrolled bit by bit
+int kernel(int x) {
+    int b = x % 46337;
+    int p = 1;
+    p = p * p % 46337;
+    p = p * b % 46337;
+    p = p * p % 46337;
+    p = p * b % 46337;
+    p = p * p % 46337;
+    p = p * b % 46337;
+    p = p * p % 46337;
+    p = p * b % 46337;
+    p = p * p % 46337;
+    p = p * p % 46337;
+    p = p * b % 46337;
+    p = p * p % 46337;
+    p = p * p % 46337;
+    p = p * p % 46337;
+    p = p * p % 46337;
+    p = p * p % 46337;
+    p = p * b % 46337;
+    p = p * p % 46337;
+    p = p * p % 46337;
+    p = p * p % 46337;
+    p = p * b % 46337;
+    p = p * p % 46337;
+    p = p * p % 46337;
+    p = p * p % 46337;
+    p = p * p % 46337;
+    p = p * p % 46337;
+    p = p * p % 46337;
+    return p;
+}
\ No newline at end of file
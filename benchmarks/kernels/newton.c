@@ -0,0 +1,16 @@
+// square root of x + 1 by ten Newton steps
+double kernel(double x) {
+    double a = x + 1.0;
+    double y = a;
+    y = (y + a / y) / 2.0;
+    y = (y + a / y) / 2.0;
+    y = (y + a / y) / 2.0;
+    y = (y + a / y) / 2.0;
+    y = (y + a / y) / 2.0;
+    y = (y + a / y) / 2.0;
+    y = (y + a / y) / 2.0;
+    y = (y + a / y) / 2.0;
+    y = (y + a / y) / 2.0;
+    y = (y + a / y) / 2.0;
+    return y;
+}
\ No newline at end of file
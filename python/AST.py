@@ -15,13 +15,19 @@ class NodeType(Enum):
 
     # expressions
     InfixExpression = "InfixExpression"
+    CallExpression = "CallExpression"
 
     # literals
     IntegerLiteral = "IntegerLiteral"
     DoubleLiteral = "DoubleLiteral"
     IdentifierLiteral = "IdentifierLiteral"
 
+    # helpers
+    FunctionParameter = "FunctionParameter"
+
 class Node(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def type(self) -> NodeType:
         pass
@@ -31,14 +37,20 @@ class Node(ABC):
         pass
 
 class Statement(Node):
-    pass
+    # the source line the statement starts on, 0 when it didn't come from the parser
+    __slots__ = ("line",)
 
 class Expression(Node):
-    pass
+    # filled in by HashConser, None until the node has been interned
+    __slots__ = ("structuralHash",)
 
 class Program(Node):
+    # symbols is the Resolver's symbol table, None until the program has been resolved
+    __slots__ = ("statements", "symbols")
+
     def __init__(self) -> None:
         self.statements: list[Statement] = []
+        self.symbols: list | None = None
 
     def type(self) -> NodeType:
         return NodeType.Program
@@ -51,8 +63,11 @@ class Program(Node):
     
 # region statements
 class ExpressionStatement(Statement):
-    def __init__(self, expression: Expression = None) -> None:
+    __slots__ = ("expression",)
+
+    def __init__(self, expression: Expression = None, line: int = 0) -> None:
         self.expression: Expression = expression
+        self.line: int = line
 
     def type(self) -> NodeType:
         return NodeType.ExpressionStatement
@@ -64,10 +79,13 @@ class ExpressionStatement(Statement):
         }
 
 class ShallStatement(Statement):
-    def __init__(self, name: Expression = None, value: Expression = None, valueType: str = None) -> None:
+    __slots__ = ("name", "value", "valueType")
+
+    def __init__(self, name: Expression = None, value: Expression = None, valueType: str = None, line: int = 0) -> None:
         self.name = name
         self.value = value
         self.valueType = valueType
+        self.line: int = line
 
     def type(self) -> NodeType:
         return NodeType.ShallStatement
@@ -81,8 +99,11 @@ class ShallStatement(Statement):
         }
 
 class BlockStatement(Statement):
-    def __init__(self, statements: list[Statement] = None) -> None:
+    __slots__ = ("statements",)
+
+    def __init__(self, statements: list[Statement] = None, line: int = 0) -> None:
         self.statements = statements if statements is not None else []
+        self.line: int = line
     
     def type(self) -> NodeType:
         return NodeType.BlockStatement
@@ -94,8 +115,11 @@ class BlockStatement(Statement):
         }
     
 class ReturnStatement(Statement):
-    def __init__(self, returnValue: Expression = None) -> None:
+    __slots__ = ("returnValue",)
+
+    def __init__(self, returnValue: Expression = None, line: int = 0) -> None:
         self.returnValue = returnValue
+        self.line: int = line
 
     def type(self) -> NodeType:
         return NodeType.ReturnStatement
@@ -107,11 +131,14 @@ class ReturnStatement(Statement):
         }
     
 class FunctionStatement(Statement):
-    def __init__(self, parameters: list = [], body: BlockStatement = None, name = None, returnType: str = None) -> None:
+    __slots__ = ("parameters", "body", "name", "returnType")
+
+    def __init__(self, parameters: list = [], body: BlockStatement = None, name = None, returnType: str = None, line: int = 0) -> None:
         self.parameters = parameters
         self.body = body
         self.name = name
         self.returnType = returnType
+        self.line: int = line
 
     def type(self) -> NodeType:
         return NodeType.FunctionStatement
@@ -126,9 +153,12 @@ class FunctionStatement(Statement):
         }
     
 class AssignStatement(Statement):
-    def __init__(self, ident: Expression = None, rightValue: Expression = None) -> None:
+    __slots__ = ("ident", "rightValue")
+
+    def __init__(self, ident: Expression = None, rightValue: Expression = None, line: int = 0) -> None:
         self.ident = ident
         self.rightValue = rightValue
+        self.line: int = line
 
     def type(self) -> NodeType:
         return NodeType.AssignStatement
@@ -143,10 +173,13 @@ class AssignStatement(Statement):
 
 # region expressions
 class InfixExpression(Expression):
+    __slots__ = ("leftNode", "operator", "rightNode")
+
     def __init__(self, leftNode: Expression, operator: str, rightNode: Expression = None) -> None:
         self.leftNode: Expression = leftNode
         self.operator: str = operator
         self.rightNode: Expression = rightNode
+        self.structuralHash: int | None = None
 
     def type(self) -> NodeType:
         return NodeType.InfixExpression
@@ -158,12 +191,33 @@ class InfixExpression(Expression):
             "operator": self.operator,
             "rightNode": self.rightNode.json()
         }   
+
+class CallExpression(Expression):
+    __slots__ = ("function", "arguments")
+
+    def __init__(self, function: Expression = None, arguments: list[Expression] = None) -> None:
+        self.function: Expression = function
+        self.arguments: list[Expression] = arguments if arguments is not None else []
+        self.structuralHash: int | None = None
+
+    def type(self) -> NodeType:
+        return NodeType.CallExpression
+
+    def json(self) -> dict:
+        return {
+            "type": self.type().value,
+            "function": self.function.json(),
+            "arguments": [argument.json() for argument in self.arguments]
+        }
 # endregion
 
 # region literals
 class IntegerLiteral(Expression):
+    __slots__ = ("value",)
+
     def __init__(self, value: int) -> None:
         self.value: int = value
+        self.structuralHash: int | None = None
 
     def type(self) -> NodeType:
         return NodeType.IntegerLiteral
@@ -175,8 +229,11 @@ class IntegerLiteral(Expression):
         }
 
 class DoubleLiteral(Expression):
+    __slots__ = ("value",)
+
     def __init__(self, value: float) -> None:
         self.value: float = value
+        self.structuralHash: int | None = None
 
     def type(self) -> NodeType:
         return NodeType.DoubleLiteral
@@ -188,8 +245,13 @@ class DoubleLiteral(Expression):
         }
     
 class IdentifierLiteral(Expression):
+    # symbol is bound by the Resolver
+    __slots__ = ("value", "symbol")
+
     def __init__(self, value: str) -> None:
         self.value: str = value
+        self.symbol = None
+        self.structuralHash: int | None = None
 
     def type(self) -> NodeType:
         return NodeType.IdentifierLiteral
@@ -199,4 +261,24 @@ class IdentifierLiteral(Expression):
             "type": self.type().value,
             "value": self.value
         }
+# endregion
+
+# region helpers
+class FunctionParameter(Node):
+    __slots__ = ("value", "valueType", "symbol")
+
+    def __init__(self, value: str, valueType: str) -> None:
+        self.value: str = value
+        self.valueType: str = valueType
+        self.symbol = None
+
+    def type(self) -> NodeType:
+        return NodeType.FunctionParameter
+
+    def json(self) -> dict:
+        return {
+            "type": self.type().value,
+            "value": self.value,
+            "valueType": self.valueType
+        }
 # endregion
\ No newline at end of file
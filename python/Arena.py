@@ -0,0 +1,287 @@
+from array import array
+import pickle
+
+from AST import Node, NodeType, Program, ExpressionStatement, InfixExpression, IntegerLiteral, DoubleLiteral
+from AST import ShallStatement, IdentifierLiteral, BlockStatement, FunctionStatement, ReturnStatement, AssignStatement
+from AST import CallExpression, FunctionParameter
+from Resolver import Symbol
+
+# node kinds are indices into NODE_KINDS
+NODE_KINDS: list[NodeType] = list(NodeType)
+KIND_OF: dict[NodeType, int] = {nodeType: kind for kind, nodeType in enumerate(NODE_KINDS)}
+
+PROGRAM: int = KIND_OF[NodeType.Program]
+EXPRESSION_STATEMENT: int = KIND_OF[NodeType.ExpressionStatement]
+SHALL_STATEMENT: int = KIND_OF[NodeType.ShallStatement]
+FUNCTION_STATEMENT: int = KIND_OF[NodeType.FunctionStatement]
+RETURN_STATEMENT: int = KIND_OF[NodeType.ReturnStatement]
+BLOCK_STATEMENT: int = KIND_OF[NodeType.BlockStatement]
+ASSIGN_STATEMENT: int = KIND_OF[NodeType.AssignStatement]
+INFIX_EXPRESSION: int = KIND_OF[NodeType.InfixExpression]
+CALL_EXPRESSION: int = KIND_OF[NodeType.CallExpression]
+INTEGER_LITERAL: int = KIND_OF[NodeType.IntegerLiteral]
+DOUBLE_LITERAL: int = KIND_OF[NodeType.DoubleLiteral]
+IDENTIFIER_LITERAL: int = KIND_OF[NodeType.IdentifierLiteral]
+
+OPERATORS: list[str] = ["+", "-", "*", "/", "%", "^"]
+OPERATOR_OF: dict[str, int] = {operator: index for index, operator in enumerate(OPERATORS)}
+
+# missing child, e.g. after a parse error
+NONE: int = -1
+
+class ASTArena:
+    # column layout per kind:
+    #   Program, BlockStatement  left = first entry in children, right = count
+    #   ExpressionStatement      left = expression
+    #   ShallStatement           value = name, left = value, right = valueType name
+    #   ReturnStatement          left = returnValue
+    #   FunctionStatement        value = name, left = body, right = signature in children:
+    #                            returnType name, parameter count, then (name, valueType name, symbol) per parameter
+    #   AssignStatement          value = name, left = rightValue
+    #   InfixExpression          operator, left, right
+    #   CallExpression           left = first entry in children (the callee, then the arguments), right = count
+    #   IntegerLiteral           value (two's complement int64)
+    #   DoubleLiteral            value = index into doubles
+    #   IdentifierLiteral        value = name
+    # names are indices into the names table; nodes are stored after their children
+    # symbols holds the resolved Symbol.id of identifiers and of the names that statements declare or assign, NONE elsewhere
+    # lines holds the source line of statements, 0 for expressions
+    def __init__(self) -> None:
+        self.kinds: array = array('B')
+        self.operators: array = array('B')
+        self.lefts: array = array('i')
+        self.rights: array = array('i')
+        self.values: array = array('q')
+        self.symbols: array = array('i')
+        self.lines: array = array('i')
+
+        self.children: array = array('i')
+        self.doubles: array = array('d')
+        self.names: list[str] = []
+        self.nameIndex: dict[str, int] = {}
+
+        # the Resolver's symbol table of the source program, None if it was never resolved
+        self.symbolTable: list[Symbol] | None = None
+
+        self.root: int = NONE
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def nbytes(self) -> int:
+        columns: list[array] = [self.kinds, self.operators, self.lefts, self.rights, self.values, self.symbols, self.lines, self.children, self.doubles]
+        return sum(column.itemsize * len(column) for column in columns)
+
+    # region building
+    def intern(self, name: str | None) -> int:
+        if name is None:
+            return NONE
+
+        index: int | None = self.nameIndex.get(name)
+        if index is None:
+            index = len(self.names)
+            self.names.append(name)
+            self.nameIndex[name] = index
+        return index
+
+    def append(self, kind: int, operator: int = 0, left: int = NONE, right: int = NONE, value: int = 0, symbol: int = NONE, line: int = 0) -> int:
+        self.kinds.append(kind)
+        self.operators.append(operator)
+        self.lefts.append(left)
+        self.rights.append(right)
+        self.values.append(value)
+        self.symbols.append(symbol)
+        self.lines.append(line)
+        return len(self.kinds) - 1
+
+    def symbolOf(self, node: IdentifierLiteral | FunctionParameter) -> int:
+        return node.symbol.id if node.symbol is not None else NONE
+
+    def appendList(self, kind: int, items: list[int], line: int = 0) -> int:
+        start: int = len(self.children)
+        self.children.extend(items)
+        return self.append(kind, left=start, right=len(items), line=line)
+
+    def childNodes(self, node: Node) -> list[Node]:
+        match node.type():
+            case NodeType.Program | NodeType.BlockStatement:
+                return node.statements
+            case NodeType.ExpressionStatement:
+                return [node.expression]
+            case NodeType.ShallStatement:
+                return [node.value]
+            case NodeType.ReturnStatement:
+                return [node.returnValue]
+            case NodeType.FunctionStatement:
+                return [node.body]
+            case NodeType.AssignStatement:
+                return [node.rightValue]
+            case NodeType.InfixExpression:
+                return [node.leftNode, node.rightNode]
+            case NodeType.CallExpression:
+                return [node.function] + node.arguments
+        return []
+
+    def appendNode(self, node: Node, children: list[int]) -> int:
+        match node.type():
+            case NodeType.Program:
+                return self.appendList(PROGRAM, children)
+            case NodeType.BlockStatement:
+                return self.appendList(BLOCK_STATEMENT, children, node.line)
+            case NodeType.ExpressionStatement:
+                return self.append(EXPRESSION_STATEMENT, left=children[0], line=node.line)
+            case NodeType.ShallStatement:
+                return self.append(SHALL_STATEMENT, left=children[0], right=self.intern(node.valueType), value=self.intern(node.name.value), symbol=self.symbolOf(node.name), line=node.line)
+            case NodeType.ReturnStatement:
+                return self.append(RETURN_STATEMENT, left=children[0], line=node.line)
+            case NodeType.FunctionStatement:
+                signature: int = len(self.children)
+                self.children.extend((self.intern(node.returnType), len(node.parameters)))
+                for parameter in node.parameters:
+                    self.children.extend((self.intern(parameter.value), self.intern(parameter.valueType), self.symbolOf(parameter)))
+                return self.append(FUNCTION_STATEMENT, left=children[0], right=signature, value=self.intern(node.name.value), symbol=self.symbolOf(node.name), line=node.line)
+            case NodeType.AssignStatement:
+                return self.append(ASSIGN_STATEMENT, left=children[0], value=self.intern(node.ident.value), symbol=self.symbolOf(node.ident), line=node.line)
+            case NodeType.InfixExpression:
+                return self.append(INFIX_EXPRESSION, operator=OPERATOR_OF[node.operator], left=children[0], right=children[1])
+            case NodeType.CallExpression:
+                return self.appendList(CALL_EXPRESSION, children)
+            case NodeType.IntegerLiteral:
+                value: int = (node.value + (1 << 63)) % (1 << 64) - (1 << 63)
+                return self.append(INTEGER_LITERAL, value=value)
+            case NodeType.DoubleLiteral:
+                self.doubles.append(node.value)
+                return self.append(DOUBLE_LITERAL, value=len(self.doubles) - 1)
+            case NodeType.IdentifierLiteral:
+                return self.append(IDENTIFIER_LITERAL, value=self.intern(node.value), symbol=self.symbolOf(node))
+
+    def add(self, node: Node | None) -> int:
+        # post-order with an explicit stack, children land in the arena before their parent
+        results: list[int] = []
+        stack: list[tuple[Node | None, int]] = [(node, -1)]
+
+        while len(stack) > 0:
+            current, childCount = stack.pop()
+
+            if current is None:
+                results.append(NONE)
+            elif childCount < 0:
+                children: list[Node] = self.childNodes(current)
+                stack.append((current, len(children)))
+                for child in reversed(children):
+                    stack.append((child, -1))
+            else:
+                start: int = len(results) - childCount
+                index: int = self.appendNode(current, results[start:])
+                del results[start:]
+                results.append(index)
+
+        return results[0]
+
+    @classmethod
+    def fromProgram(cls, program: Program) -> "ASTArena":
+        arena: ASTArena = cls()
+        arena.root = arena.add(program)
+        arena.symbolTable = program.symbols
+        return arena
+    # endregion
+
+    # region reading
+    def name(self, index: int) -> str | None:
+        return self.names[index] if index != NONE else None
+
+    def listItems(self, index: int) -> array:
+        start: int = self.lefts[index]
+        return self.children[start:start + self.rights[index]]
+
+    def symbolAt(self, symbol: int) -> Symbol | None:
+        return self.symbolTable[symbol] if symbol != NONE and self.symbolTable is not None else None
+
+    def operator(self, index: int) -> str:
+        return OPERATORS[self.operators[index]]
+
+    def functionSignature(self, index: int) -> tuple[str | None, list[tuple[str, str | None, int]]]:
+        start: int = self.rights[index]
+        children: array = self.children
+
+        parameters: list[tuple[str, str | None, int]] = []
+        for item in range(start + 2, start + 2 + 3 * children[start + 1], 3):
+            parameters.append((self.names[children[item]], self.name(children[item + 1]), children[item + 2]))
+
+        return self.name(children[start]), parameters
+
+    def toProgram(self) -> Program:
+        # children always precede their parent, so one forward sweep rebuilds the tree
+        nodes: list[Node | None] = [None] * len(self.kinds)
+
+        def child(index: int) -> Node | None:
+            return nodes[index] if index != NONE else None
+
+        def identifier(name: int, symbol: int) -> IdentifierLiteral:
+            node: IdentifierLiteral = IdentifierLiteral(value=self.names[name])
+            node.symbol = self.symbolAt(symbol)
+            return node
+
+        for index in range(len(self.kinds)):
+            kind: int = self.kinds[index]
+            left: int = self.lefts[index]
+            right: int = self.rights[index]
+            value: int = self.values[index]
+            line: int = self.lines[index]
+
+            if kind == INFIX_EXPRESSION:
+                node: Node = InfixExpression(leftNode=child(left), operator=OPERATORS[self.operators[index]], rightNode=child(right))
+            elif kind == INTEGER_LITERAL:
+                node = IntegerLiteral(value=value)
+            elif kind == DOUBLE_LITERAL:
+                node = DoubleLiteral(value=self.doubles[value])
+            elif kind == IDENTIFIER_LITERAL:
+                node = identifier(value, self.symbols[index])
+            elif kind == EXPRESSION_STATEMENT:
+                node = ExpressionStatement(expression=child(left), line=line)
+            elif kind == SHALL_STATEMENT:
+                node = ShallStatement(name=identifier(value, self.symbols[index]), value=child(left), valueType=self.name(right), line=line)
+            elif kind == RETURN_STATEMENT:
+                node = ReturnStatement(returnValue=child(left), line=line)
+            elif kind == CALL_EXPRESSION:
+                items: array = self.listItems(index)
+                node = CallExpression(function=child(items[0]), arguments=[child(item) for item in items[1:]])
+            elif kind == FUNCTION_STATEMENT:
+                returnType, signature = self.functionSignature(index)
+                parameters: list[FunctionParameter] = []
+                for name, valueType, symbol in signature:
+                    parameters.append(FunctionParameter(value=name, valueType=valueType))
+                    parameters[-1].symbol = self.symbolAt(symbol)
+                node = FunctionStatement(parameters=parameters, body=child(left), name=identifier(value, self.symbols[index]), returnType=returnType, line=line)
+            elif kind == ASSIGN_STATEMENT:
+                node = AssignStatement(ident=identifier(value, self.symbols[index]), rightValue=child(left), line=line)
+            elif kind == BLOCK_STATEMENT:
+                node = BlockStatement(statements=[nodes[item] for item in self.listItems(index)], line=line)
+            else:
+                node = Program()
+                node.statements = [nodes[item] for item in self.listItems(index)]
+                node.symbols = self.symbolTable
+
+            nodes[index] = node
+
+        return nodes[self.root]
+    # endregion
+
+    # region serialization
+    def serialize(self, locations: bool = True, symbols: bool = True) -> bytes:
+        # the columns pickle as raw bytes, so this is close to a memory copy;
+        # without locations the bytes only change when the code does, not when it moves to another line,
+        # and without symbols they don't change when the rest of the file declares more or fewer names
+        lines: array = self.lines if locations else array('i')
+        symbolColumn: array = self.symbols if symbols else array('i', [NONE] * len(self.symbols))
+        columns: tuple = (self.kinds, self.operators, self.lefts, self.rights, self.values, symbolColumn, lines, self.children, self.doubles)
+        return pickle.dumps((columns, self.names, self.symbolTable if symbols else None, self.root), protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def deserialize(cls, data: bytes) -> "ASTArena":
+        arena: ASTArena = cls()
+        columns, arena.names, arena.symbolTable, arena.root = pickle.loads(data)
+        arena.kinds, arena.operators, arena.lefts, arena.rights, arena.values, arena.symbols, arena.lines, arena.children, arena.doubles = columns
+        arena.nameIndex = {name: index for index, name in enumerate(arena.names)}
+        return arena
+    # endregion
\ No newline at end of file
@@ -0,0 +1,169 @@
+import os
+import shutil
+import subprocess
+import tempfile
+
+from llvmlite import ir
+import llvmlite.binding as llvm
+
+# level -> (speed level, size level) as LLVM's PassBuilder understands them
+OPT_LEVELS: dict[str, tuple[int, int]] = {
+    "O0": (0, 0),
+    "O1": (1, 0),
+    "O2": (2, 0),
+    "O3": (3, 0),
+    "Os": (2, 1),
+    "Oz": (2, 2)
+}
+
+# the C side of a standalone executable: calls mn and reports like main.py does
+ENTRY_STUB: str = r"""#include <stdio.h>
+#include <time.h>
+
+int mn(void);
+
+int main(void) {
+    struct timespec start, end;
+    clock_gettime(CLOCK_MONOTONIC, &start);
+    int result = mn();
+    clock_gettime(CLOCK_MONOTONIC, &end);
+
+    double elapsed = (end.tv_sec - start.tv_sec) * 1e3 + (end.tv_nsec - start.tv_nsec) / 1e6;
+    printf("\nProgram returned: %d\n === Executed in %.9g ms. ===\n", result, elapsed);
+    return 0;
+}
+"""
+
+initialized: bool = False
+
+def initializeLLVM() -> None:
+    global initialized
+    if initialized:
+        return
+
+    llvm.initialize()
+    llvm.initialize_native_target()
+    llvm.initialize_native_asmprinter()
+    initialized = True
+
+class Backend:
+    def __init__(self, optLevel: str = "O2", hostCPU: bool = True) -> None:
+        if optLevel not in OPT_LEVELS:
+            raise ValueError(f"Unknown optimization level {optLevel}, expected one of {', '.join(OPT_LEVELS)}")
+
+        initializeLLVM()
+
+        self.optLevel: str = optLevel
+        self.speedLevel, self.sizeLevel = OPT_LEVELS[optLevel]
+
+        # targeting the host lets the vectorizers and the scheduler use the real machine instead of a generic x86-64/aarch64
+        self.triple: str = llvm.get_process_triple() if hostCPU else llvm.get_default_triple()
+        self.target: llvm.Target = llvm.Target.from_triple(self.triple)
+        self.cpu: str = llvm.get_host_cpu_name() if hostCPU else ""
+        self.features: str = llvm.get_host_cpu_features().flatten() if hostCPU else ""
+
+        # optimization and object emission only borrow a target machine, so they share this one
+        self.targetMachine: llvm.TargetMachine = self.createTargetMachine()
+        self.dataLayout: str = str(self.targetMachine.target_data)
+
+    def createTargetMachine(self) -> llvm.TargetMachine:
+        # MCJIT takes ownership of its target machine, so every engine needs a fresh one
+        return self.target.create_target_machine(cpu=self.cpu, features=self.features, opt=self.speedLevel)
+
+    def parse(self, module: ir.Module) -> llvm.ModuleRef:
+        module.triple = self.triple
+        module.data_layout = self.dataLayout
+
+        moduleRef: llvm.ModuleRef = llvm.parse_assembly(str(module))
+        moduleRef.verify()
+        return moduleRef
+
+    def parseAssembly(self, text: str, verify: bool = True) -> llvm.ModuleRef:
+        # IR that was written without knowing the target
+        moduleRef: llvm.ModuleRef = llvm.parse_assembly(text)
+        moduleRef.triple = self.triple
+        moduleRef.data_layout = self.dataLayout
+        if verify:
+            moduleRef.verify()
+        return moduleRef
+
+    def optimize(self, moduleRef: llvm.ModuleRef) -> llvm.ModuleRef:
+        # the default module pipeline for the level: inlining, the function simplification passes, vectorization
+        # llvmlite aborts on size level 1, so Os runs the O2 pipeline with the size-growing loop transforms turned off below
+        sizeLevel: int = self.sizeLevel if self.sizeLevel != 1 else 0
+        tuning: llvm.PipelineTuningOptions = llvm.create_pipeline_tuning_options(speed_level=self.speedLevel, size_level=sizeLevel)
+        tuning.loop_vectorization = self.speedLevel >= 2 and self.sizeLevel == 0
+        tuning.slp_vectorization = self.speedLevel >= 2 and self.sizeLevel == 0
+        tuning.loop_unrolling = self.sizeLevel == 0
+
+        passBuilder: llvm.PassBuilder = llvm.create_pass_builder(self.targetMachine, tuning)
+        passBuilder.getModulePassManager().run(moduleRef, passBuilder)
+        return moduleRef
+
+    def compile(self, module: ir.Module) -> llvm.ModuleRef:
+        return self.optimize(self.parse(module))
+
+    def jit(self, moduleRef: llvm.ModuleRef) -> llvm.ExecutionEngine:
+        engine: llvm.ExecutionEngine = llvm.create_mcjit_compiler(moduleRef, self.createTargetMachine())
+        engine.finalize_object()
+        return engine
+
+    def emitObject(self, moduleRef: llvm.ModuleRef) -> bytes:
+        return self.targetMachine.emit_object(moduleRef)
+
+    def loadObject(self, objectCode: bytes) -> llvm.ExecutionEngine:
+        return self.loadObjects([objectCode])
+
+    def loadObjects(self, objects: list[bytes]) -> llvm.ExecutionEngine:
+        # the engine's own module stays empty, all the code comes from already compiled objects whose symbols it links
+        moduleRef: llvm.ModuleRef = llvm.parse_assembly("")
+        moduleRef.triple = self.triple
+        moduleRef.data_layout = self.dataLayout
+
+        engine: llvm.ExecutionEngine = llvm.create_mcjit_compiler(moduleRef, self.createTargetMachine())
+        for objectCode in objects:
+            engine.add_object_file(llvm.ObjectFileRef.from_data(objectCode))
+        engine.finalize_object()
+        return engine
+
+    # region ahead of time
+    def toolchain(self) -> str:
+        compiler: str | None = shutil.which(os.environ.get("CC", "cc"))
+        if compiler is None:
+            raise RuntimeError("No C compiler found to link with, set CC")
+        return compiler
+
+    def runToolchain(self, arguments: list[str]) -> None:
+        completed: subprocess.CompletedProcess = subprocess.run([self.toolchain(), *arguments], capture_output=True, text=True)
+        if completed.returncode != 0:
+            raise RuntimeError(f"{os.path.basename(arguments[-1])} failed to link:\n{completed.stderr}")
+
+    def writeObject(self, objects: list[bytes], path: str) -> None:
+        # several objects, e.g. from a per-function build, are merged into one relocatable object
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if len(objects) == 1:
+            with open(path, "wb") as f:
+                f.write(objects[0])
+            return
+
+        with tempfile.TemporaryDirectory() as directory:
+            self.runToolchain(["-r", "-nostdlib", *self.spill(objects, directory), "-o", path])
+
+    def linkExecutable(self, objects: list[bytes], path: str) -> None:
+        # code generation used the JIT's non-PIC relocation model, so the executable is linked non-PIE
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with tempfile.TemporaryDirectory() as directory:
+            stub: str = os.path.join(directory, "entry.c")
+            with open(stub, "w") as f:
+                f.write(ENTRY_STUB)
+
+            self.runToolchain(["-O2", "-no-pie", stub, *self.spill(objects, directory), "-lm", "-o", path])
+
+    def spill(self, objects: list[bytes], directory: str) -> list[str]:
+        paths: list[str] = []
+        for index, objectCode in enumerate(objects):
+            paths.append(os.path.join(directory, f"unit{index}.o"))
+            with open(paths[-1], "wb") as f:
+                f.write(objectCode)
+        return paths
+    # endregion
\ No newline at end of file
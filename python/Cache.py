@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import llvmlite.binding as llvm
+
+# bump when the layout of the cache directory changes
+CACHE_FORMAT: int = 1
+
+STATISTICS_FILE: str = "statistics.json"
+
+compilerDigest: str | None = None
+
+def compilerVersion() -> str:
+    # every compiler module takes part, so any edit invalidates what older code produced;
+    # main.py is left out, its flags reach the keys explicitly and editing them must not drop the whole cache
+    global compilerDigest
+    if compilerDigest is not None:
+        return compilerDigest
+
+    digest = hashlib.sha256(f"format {CACHE_FORMAT}, llvm {llvm.llvm_version_info}".encode())
+    directory: str = os.path.dirname(os.path.abspath(__file__))
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".py") and name != "main.py":
+            with open(os.path.join(directory, name), "rb") as f:
+                digest.update(name.encode())
+                digest.update(f.read())
+
+    compilerDigest = digest.hexdigest()
+    return compilerDigest
+
+def hashFile(path: str | os.PathLike, chunkSize: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunkSize):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class CompilationCache:
+    # one directory per key holding one file per artifact; an entry's mtime is its last use, which drives LRU eviction
+    def __init__(self, directory: str | os.PathLike, maxBytes: int = 256 << 20) -> None:
+        self.directory: str = os.fspath(directory)
+        self.maxBytes: int = maxBytes
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        # this run only, saveStatistics() adds them to the totals on disk that report() shows
+        self.statistics: dict[str, int] = {
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "bytes read": 0,
+            "bytes written": 0
+        }
+
+    # region keys
+    def key(self, *parts: object) -> str:
+        return hashlib.sha256("\0".join([compilerVersion(), *map(str, parts)]).encode()).hexdigest()
+
+    def frontendKey(self, sourceDigest: str) -> str:
+        # the AST only depends on the source and the compiler itself
+        return self.key("frontend", sourceDigest)
+
+    def backendKey(self, sourceDigest: str, optLevel: str, triple: str, cpu: str, features: str, options: tuple = ()) -> str:
+        # code depends on everything that changes what reaches LLVM or what LLVM makes of it
+        return self.key("backend", sourceDigest, optLevel, triple, cpu, features, *options)
+    # endregion
+
+    # region entries
+    def entryPath(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def load(self, key: str, artifact: str) -> bytes | None:
+        entry: str = self.entryPath(key)
+        try:
+            with open(os.path.join(entry, artifact), "rb") as f:
+                data: bytes = f.read()
+        except OSError:
+            self.statistics["misses"] += 1
+            return None
+
+        # touching the entry marks it as recently used
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+
+        self.statistics["hits"] += 1
+        self.statistics["bytes read"] += len(data)
+        return data
+
+    def store(self, key: str, artifacts: dict[str, bytes], evict: bool = True) -> None:
+        entry: str = self.entryPath(key)
+        os.makedirs(entry, exist_ok=True)
+
+        for artifact, data in artifacts.items():
+            # write then rename, so a concurrent reader never sees half an artifact
+            temporary: str = os.path.join(entry, f".{artifact}.{os.getpid()}")
+            with open(temporary, "wb") as f:
+                f.write(data)
+            os.replace(temporary, os.path.join(entry, artifact))
+
+            self.statistics["bytes written"] += len(data)
+
+        self.statistics["stores"] += 1
+        os.utime(entry)
+
+        # eviction scans the whole directory, callers storing many entries at once evict once at the end
+        if evict:
+            self.evict()
+
+    def entries(self) -> list[tuple[float, int, str]]:
+        # (last use, size, path) of every entry
+        entries: list[tuple[float, int, str]] = []
+        for prefix in os.scandir(self.directory):
+            if not prefix.is_dir():
+                continue
+
+            for entry in os.scandir(prefix.path):
+                try:
+                    size: int = sum(artifact.stat().st_size for artifact in os.scandir(entry.path))
+                    entries.append((entry.stat().st_mtime, size, entry.path))
+                except OSError:
+                    # removed by another process meanwhile
+                    continue
+
+        return entries
+
+    def size(self) -> int:
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self) -> None:
+        entries: list[tuple[float, int, str]] = self.entries()
+        total: int = sum(size for _, size, _ in entries)
+        if total <= self.maxBytes:
+            return
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.maxBytes:
+                break
+
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            self.statistics["evictions"] += 1
+
+    def clear(self) -> None:
+        for _, _, path in self.entries():
+            shutil.rmtree(path, ignore_errors=True)
+    # endregion
+
+    # region statistics
+    def totals(self) -> dict[str, int]:
+        try:
+            with open(os.path.join(self.directory, STATISTICS_FILE), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def saveStatistics(self) -> None:
+        totals: dict[str, int] = self.totals()
+        for name, count in self.statistics.items():
+            totals[name] = totals.get(name, 0) + count
+        totals["last run"] = int(time.time())
+
+        temporary: str = os.path.join(self.directory, f".{STATISTICS_FILE}.{os.getpid()}")
+        with open(temporary, "w") as f:
+            json.dump(totals, f, indent=4)
+        os.replace(temporary, os.path.join(self.directory, STATISTICS_FILE))
+
+    def report(self) -> str:
+        totals: dict[str, int] = self.totals()
+        lines: list[str] = [f"=== CACHE ({self.directory}, {self.size()} of {self.maxBytes} bytes) ==="]
+
+        for name, count in self.statistics.items():
+            lines.append(f"{name}: {count} this run, {totals.get(name, count)} in total")
+
+        lookups: int = self.statistics["hits"] + self.statistics["misses"]
+        if lookups > 0:
+            lines.append(f"hit rate: {100 * self.statistics['hits'] / lookups:.1f}%")
+
+        return "\n".join(lines)
+    # endregion
\ No newline at end of file
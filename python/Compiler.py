@@ -1,12 +1,28 @@
+import os
+
 from llvmlite import ir
 
 from AST import Node, NodeType, Program, Expression, ExpressionStatement, InfixExpression, IntegerLiteral, DoubleLiteral
 from AST import ShallStatement, IdentifierLiteral, BlockStatement, FunctionStatement, ReturnStatement, AssignStatement
+from AST import CallExpression
+
+from Resolver import Resolver, Symbol
+from Arena import ASTArena, NONE, PROGRAM, EXPRESSION_STATEMENT, SHALL_STATEMENT, FUNCTION_STATEMENT, RETURN_STATEMENT
+from Arena import BLOCK_STATEMENT, ASSIGN_STATEMENT, INFIX_EXPRESSION, INTEGER_LITERAL, DOUBLE_LITERAL, IDENTIFIER_LITERAL, OPERATORS
+from Arena import CALL_EXPRESSION
+
+# bit size and DWARF encoding of the language's types
+DEBUG_TYPES: dict[str, tuple[int, str]] = {
+    "int": (32, "DW_ATE_signed"),
+    "double": (64, "DW_ATE_float")
+}
 
-from Environment import Environment
+def slotOf(symbol: Symbol | None) -> int:
+    return symbol.id if symbol is not None else NONE
 
 class Compiler:
-    def __init__(self) -> None:
+    def __init__(self, cse: bool = False, ssa: bool = False, instrument: bool = False, functionAttributes: dict[str, list[str]] | None = None,
+                 debugFile: str | None = None) -> None:
         self.typeMap: dict[str, ir.Type] = {
             "int": ir.IntType(32),
             "double": ir.DoubleType()
@@ -16,168 +32,601 @@ class Compiler:
 
         self.builder: ir.IRBuilder = ir.IRBuilder()
 
-        self.environment: Environment = Environment()
+        # storage per resolved symbol, indexed by Symbol.id: (pointer, type) for variables, (function, return type) for functions
+        self.slots: list[tuple[ir.Value, ir.Type] | None] = []
 
         # temporary error implementation
         self.errors: list[str] = []
-    
-    def compile(self, node: Node) -> None:
-        match node.type():
-            case NodeType.Program:
-                self.visitProgram(node)
+
+        # dispatch on the node class directly instead of calling node.type() for every node
+        self.visitors: dict[type, callable] = {
+            Program: self.visitProgram,
 
             # statements
-            case NodeType.ExpressionStatement:
-                self.visitExpressionStatement(node)
-            case NodeType.ShallStatement:
-                self.visitShallStatement(node)
-            case NodeType.FunctionStatement:
-                self.visitFunctionStatement(node)
-            case NodeType.BlockStatement:
-                self.visitBlockStatement(node)
-            case NodeType.ReturnStatement:
-                self.visitReturnStatement(node)
-            case NodeType.AssignStatement:
-                self.visitAssignStatement(node)
+            ExpressionStatement: self.visitExpressionStatement,
+            ShallStatement: self.visitShallStatement,
+            FunctionStatement: self.visitFunctionStatement,
+            BlockStatement: self.visitBlockStatement,
+            ReturnStatement: self.visitReturnStatement,
+            AssignStatement: self.visitAssignStatement,
 
             # expressions
-            case NodeType.InfixExpression:
-                self.visitInfixExpression(node)
+            InfixExpression: self.visitInfixExpression,
+            CallExpression: self.visitCallExpression
+        }
+
+        self.arena: ASTArena | None = None
+
+        # common subexpression reuse within the current block; pays off on hash-consed trees where repeats share one node
+        self.cse: bool = cse
+        self.valueCache: dict[Expression, tuple[ir.Value, ir.Type, frozenset[int]]] = {}
+        self.cacheUsers: dict[int, list[Expression]] = {}
+
+        # with ssa on, a variable's slot holds its current SSA value instead of a stack slot; the language has no branches,
+        # so every function is one block and the last value written is the one every later read sees
+        self.ssa: bool = ssa
+
+        # without ssa, the last alloca of the current function; new ones go right after it in the entry block
+        self.lastAlloca: ir.AllocaInstr | None = None
+
+        # with instrument on, every function counts its calls and cycles in its own global (see Profile.py);
+        # the current function's counters and the cycle count at its entry
+        self.instrument: bool = instrument
+        self.profileCounters: ir.GlobalVariable | None = None
+        self.cycleStart: ir.Value | None = None
+
+        # extra attributes per function name, e.g. from a runtime profile
+        self.functionAttributes: dict[str, list[str]] = functionAttributes if functionAttributes is not None else {}
+
+        # with a source file, functions get a DWARF subprogram and instructions the line of the statement they came from;
+        # the current function's subprogram, None outside of functions
+        self.debugFile: ir.DIValue | None = None
+        self.debugUnit: ir.DIValue | None = None
+        self.debugScope: ir.DIValue | None = None
+        self.debugTypes: dict[str, ir.DIValue] = {}
+        if debugFile is not None:
+            self.startDebugInfo(debugFile)
+    
+    def compile(self, node: Node) -> None:
+        visitor: callable | None = self.visitors.get(node.__class__)
+        if visitor is not None:
+            visitor(node)
 
     # region visit methods
     def visitProgram(self, node: Program) -> None:
+        if node.symbols is None:
+            resolver: Resolver = Resolver()
+            resolver.resolve(node)
+            self.errors.extend(resolver.errors)
+
+        self.slots = [None] * len(node.symbols)
+
+        # top-level functions are declared up front so calls may come before the definition
+        for statement in node.statements:
+            if statement.__class__ is FunctionStatement:
+                self.declareFunction(statement.name.value, slotOf(statement.name.symbol), statement.returnType, self.parameterList(statement))
+
         for statement in node.statements:
             self.compile(statement)
 
+    def compileUnit(self, node: FunctionStatement, symbols: list[Symbol], externals: list[FunctionStatement]) -> None:
+        # one resolved top-level function on its own; the functions it calls are only declared, another module defines them
+        self.slots = [None] * len(symbols)
+
+        for external in externals:
+            self.declareFunction(external.name.value, slotOf(external.name.symbol), external.returnType, self.parameterList(external))
+
+        self.compile(node)
+
     def visitExpressionStatement(self, node: ExpressionStatement) -> None:
         self.compile(node.expression)
 
 
-    def visitInfixExpression(self, node: InfixExpression) -> None:
-        operator: str = node.operator
-        leftValue, leftType = self.resolveValue(node.leftNode)
-        rightValue, rightType = self.resolveValue(node.rightNode)
-
-        value = None
-        Type = None
-        
-        if (isinstance(leftType, ir.IntType) and isinstance(rightType, ir.IntType)):
-            Type = self.typeMap["int"]
-            match operator:
-                case "+":
-                    value = self.builder.add(leftValue, rightValue)
-                case "-":
-                    value = self.builder.sub(leftValue, rightValue)
-                case "*":
-                    value = self.builder.mul(leftValue, rightValue)
-                case "/":
-                    value = self.builder.sdiv(leftValue, rightValue)
-                case "%":
-                    value = self.builder.srem(leftValue, rightValue)
-            
-        elif (isinstance(leftType, ir.DoubleType) and isinstance(rightType, ir.DoubleType)):
-            Type = self.typeMap["double"]
-            match operator:
-                case "+":
-                    value = self.builder.fadd(leftValue, rightValue)
-                case "-":
-                    value = self.builder.fsub(leftValue, rightValue)
-                case "*":
-                    value = self.builder.fmul(leftValue, rightValue)
-                case "/":
-                    value = self.builder.fdiv(leftValue, rightValue)
-                case "%":
-                    value = self.builder.frem(leftValue, rightValue)
+    def visitInfixExpression(self, node: InfixExpression) -> tuple[ir.Value, ir.Type]:
+        return self.emitExpression(node)
+
+    def visitCallExpression(self, node: CallExpression) -> tuple[ir.Value, ir.Type]:
+        return self.emitExpression(node)
+
+    def emitExpression(self, node: Expression) -> tuple[ir.Value, ir.Type]:
+        # post-order walk with an explicit stack, so operator chains and nested calls of any depth never recurse
+        values: list[tuple[ir.Value, ir.Type]] = []
+        stack: list[tuple[Expression, bool]] = [(node, False)]
+
+        # with cse on, the slots each pending value reads, kept in step with values
+        cse: bool = self.cse
+        reads: list[frozenset[int]] = []
+
+        while len(stack) > 0:
+            current, visited = stack.pop()
+
+            if visited:
+                # functions cannot touch anything but their arguments, so a call is cached like any other value
+                if current.__class__ is CallExpression:
+                    count: int = len(current.arguments)
+                    arguments: list[tuple[ir.Value, ir.Type]] = values[len(values) - count:]
+                    del values[len(values) - count:]
+
+                    callee: int = slotOf(current.function.symbol) if current.function.__class__ is IdentifierLiteral else NONE
+                    value, Type = self.emitCall(callee, arguments)
+
+                    if cse:
+                        nodeReads: frozenset[int] = frozenset().union(*reads[len(reads) - count:])
+                        del reads[len(reads) - count:]
+                else:
+                    rightValue, rightType = values.pop()
+                    leftValue, leftType = values.pop()
+                    value, Type = self.emitInfix(current.operator, leftValue, leftType, rightValue, rightType)
+
+                    if cse:
+                        rightReads: frozenset[int] = reads.pop()
+                        nodeReads = reads.pop() | rightReads
+
+                values.append((value, Type))
+
+                if cse:
+                    reads.append(nodeReads)
+                    self.cacheValue(current, value, Type, nodeReads)
+            elif current.__class__ is InfixExpression or current.__class__ is CallExpression:
+                cached: tuple[ir.Value, ir.Type, frozenset[int]] | None = self.valueCache.get(current) if cse else None
+                if cached is not None:
+                    values.append((cached[0], cached[1]))
+                    reads.append(cached[2])
+                    continue
+
+                stack.append((current, True))
+                if current.__class__ is CallExpression:
+                    for argument in reversed(current.arguments):
+                        stack.append((argument, False))
+                else:
+                    stack.append((current.rightNode, False))
+                    stack.append((current.leftNode, False))
+            else:
+                values.append(self.resolveValue(current))
+
+                if cse:
+                    reads.append(frozenset((slotOf(current.symbol),)) if current.__class__ is IdentifierLiteral else frozenset())
+
+        return values.pop()
 
-        return value, Type
-    
     def visitShallStatement(self, node: ShallStatement) -> None:
-        name: str = node.name.value
+        slot: int = slotOf(node.name.symbol)
         value: Expression = node.value
         valueType: str = node.valueType
 
         value, Type = self.resolveValue(node=value)
 
-        if self.environment.lookup(name) is None:
-            pointer = self.builder.alloca(Type)
-
-            self.builder.store(value, pointer)
-
-            self.environment.define(name, pointer, Type)
-        else: 
-            pointer, _ = self.environment.lookup(name)
-            self.builder.store(value, pointer)
+        self.declareVariable(slot, value, Type)
 
     def visitBlockStatement(self, node: BlockStatement) -> None:
         for statement in node.statements:
+            # whatever follows a return is unreachable, the TypeChecker has still seen it
+            if self.builder.block.is_terminated:
+                break
+            self.locate(statement.line)
             self.compile(statement)
 
     def visitReturnStatement(self, node: ReturnStatement) -> None:
         value: Expression = node.returnValue
         value, Type = self.resolveValue(value)
 
-        self.builder.ret(value)
+        self.emitReturn(value, Type)
 
     def visitFunctionStatement(self, node: FunctionStatement) -> None:
         name: str = node.name.value
         body: BlockStatement = node.body
-        params: list[IdentifierLiteral] = node.parameters
 
-        paramNames: list[str] = [par.value for par in params]
-        paramTypes: list[ir.Type] = []
-        returnType: ir.Type = self.typeMap[node.returnType]
+        outerScope = self.beginFunction(name, slotOf(node.name.symbol), node.returnType, self.parameterList(node), node.line)
+
+        self.compile(body)
+
+        self.endFunction(outerScope)
+
+    def visitAssignStatement(self, node: AssignStatement) -> None: 
+        slot: int = slotOf(node.ident.symbol)
+        value: Expression = node.rightValue
+
+        value, Type = self.resolveValue(value)
+
+        self.assignVariable(slot, value, Type)
+    # endregion
+
+    # region arena
+    def compileArena(self, arena: ASTArena) -> None:
+        # walks the flat arena directly, without materialising node objects
+        if arena.symbolTable is None:
+            self.errors.append("~~~ COMPILE ERROR: The arena was built from a program that was never resolved.")
+            return
+
+        self.arena = arena
+        self.slots = [None] * len(arena.symbolTable)
+        self.visitArenaNode(arena.root)
+        self.arena = None
+
+    def visitArenaNode(self, index: int) -> None:
+        arena: ASTArena = self.arena
+        kind: int = arena.kinds[index]
+
+        if kind == PROGRAM:
+            for item in arena.listItems(index):
+                if arena.kinds[item] == FUNCTION_STATEMENT:
+                    returnTypeName, parameters = arena.functionSignature(item)
+                    self.declareFunction(arena.names[arena.values[item]], arena.symbols[item], returnTypeName, parameters)
+
+            for item in arena.listItems(index):
+                self.visitArenaNode(item)
+        elif kind == BLOCK_STATEMENT:
+            for item in arena.listItems(index):
+                if self.builder.block.is_terminated:
+                    break
+                self.locate(arena.lines[item])
+                self.visitArenaNode(item)
+        elif kind == EXPRESSION_STATEMENT:
+            expressionKind: int = arena.kinds[arena.lefts[index]]
+            if expressionKind == INFIX_EXPRESSION or expressionKind == CALL_EXPRESSION:
+                self.resolveArenaValue(arena.lefts[index])
+        elif kind == SHALL_STATEMENT:
+            value, Type = self.resolveArenaValue(arena.lefts[index])
+            self.declareVariable(arena.symbols[index], value, Type)
+        elif kind == ASSIGN_STATEMENT:
+            value, Type = self.resolveArenaValue(arena.lefts[index])
+            self.assignVariable(arena.symbols[index], value, Type)
+        elif kind == RETURN_STATEMENT:
+            value, Type = self.resolveArenaValue(arena.lefts[index])
+            self.emitReturn(value, Type)
+        elif kind == FUNCTION_STATEMENT:
+            returnTypeName, parameters = arena.functionSignature(index)
+            outerScope = self.beginFunction(arena.names[arena.values[index]], arena.symbols[index], returnTypeName, parameters, arena.lines[index])
+            self.visitArenaNode(arena.lefts[index])
+            self.endFunction(outerScope)
+        elif kind == INFIX_EXPRESSION or kind == CALL_EXPRESSION:
+            self.resolveArenaValue(index)
+
+    def resolveArenaValue(self, index: int) -> tuple[ir.Value, ir.Type]:
+        arena: ASTArena = self.arena
+        kinds = arena.kinds
+
+        values: list[tuple[ir.Value, ir.Type]] = []
+        stack: list[tuple[int, bool]] = [(index, False)]
+
+        while len(stack) > 0:
+            current, visited = stack.pop()
+            kind: int = kinds[current]
+
+            if visited and kind == CALL_EXPRESSION:
+                # the first list entry is the callee, the rest are arguments
+                count: int = arena.rights[current] - 1
+                arguments: list[tuple[ir.Value, ir.Type]] = values[len(values) - count:]
+                del values[len(values) - count:]
+
+                callee: int = arena.children[arena.lefts[current]]
+                slot: int = arena.symbols[callee] if callee != NONE else NONE
+                values.append(self.emitCall(slot, arguments))
+            elif visited:
+                rightValue, rightType = values.pop()
+                leftValue, leftType = values.pop()
+                values.append(self.emitInfix(OPERATORS[arena.operators[current]], leftValue, leftType, rightValue, rightType))
+            elif kind == INFIX_EXPRESSION:
+                stack.append((current, True))
+                stack.append((arena.rights[current], False))
+                stack.append((arena.lefts[current], False))
+            elif kind == CALL_EXPRESSION:
+                stack.append((current, True))
+                for argument in reversed(arena.listItems(current)[1:]):
+                    stack.append((argument, False))
+            elif kind == INTEGER_LITERAL:
+                Type: ir.Type = self.typeMap["int"]
+                values.append((ir.Constant(Type, arena.values[current]), Type))
+            elif kind == DOUBLE_LITERAL:
+                Type = self.typeMap["double"]
+                values.append((ir.Constant(Type, arena.doubles[arena.values[current]]), Type))
+            elif kind == IDENTIFIER_LITERAL:
+                values.append(self.loadVariable(arena.symbols[current]))
+
+        return values.pop()
+    # endregion
+        
+    # region helpers
+    def parameterList(self, node: FunctionStatement) -> list[tuple[str, str, int]]:
+        return [(par.value, par.valueType, slotOf(par.symbol)) for par in node.parameters]
+
+    def declareFunction(self, name: str, slot: int, returnTypeName: str, parameters: list[tuple[str, str, int]]) -> ir.Function:
+        record: tuple[ir.Value, ir.Type] | None = self.slots[slot] if slot != NONE else None
+        if record is not None and record[0].is_declaration:
+            # declared up front, this is its definition
+            return record[0]
+
+        if name in self.module.globals:
+            self.errors.append(f"~~~ COMPILE ERROR: Function {name} was already defined.")
+            name = self.module.get_unique_name(name)
+
+        returnType: ir.Type = self.typeMap[returnTypeName]
+        paramTypes: list[ir.Type] = [self.typeMap[typeName] for _, typeName, _ in parameters]
 
         funcType: ir.FunctionType = ir.FunctionType(returnType, paramTypes)
         func: ir.Function = ir.Function(self.module, funcType, name=name)
+        for attribute in self.functionAttributes.get(name, ()):
+            func.attributes.add(attribute)
+
+        if record is None and slot != NONE:
+            self.slots[slot] = (func, returnType)
+
+        return func
+
+    def beginFunction(self, name: str, slot: int, returnTypeName: str, parameters: list[tuple[str, str, int]], line: int = 0) -> tuple:
+        func: ir.Function = self.declareFunction(name, slot, returnTypeName, parameters)
 
         block: ir.Block = func.append_basic_block(f'{name}_entry')
 
-        previousBuilder = self.builder
+        outerScope: tuple = (self.builder, self.valueCache, self.cacheUsers, self.lastAlloca, self.profileCounters, self.cycleStart, self.debugScope)
 
         self.builder = ir.IRBuilder(block)
+        self.valueCache = {}
+        self.cacheUsers = {}
+        self.lastAlloca = None
+
+        if self.debugUnit is not None:
+            # the entry code, parameters and counters included, belongs to the line of the definition
+            self.debugScope = self.subprogram(func, returnTypeName, parameters, line)
+            self.locate(line)
+
+        if self.instrument:
+            self.profileEntry(func)
+
+        # parameters live in stack slots like any other variable, so they can be reassigned
+        for (paramName, _, paramSlot), argument in zip(parameters, func.args):
+            argument.name = paramName
+            self.declareVariable(paramSlot, argument, argument.type)
+
+        return outerScope
+
+    def endFunction(self, outerScope: tuple) -> None:
+        # a block without a terminator fails LLVM's verifier, which a lazy JIT only runs on the first call
+        if not self.builder.block.is_terminated:
+            self.errors.append(f"~~~ COMPILE ERROR: Function {self.builder.function.name} ended without returning a value.")
+
+        self.builder, self.valueCache, self.cacheUsers, self.lastAlloca, self.profileCounters, self.cycleStart, self.debugScope = outerScope
+
+    def emitReturn(self, value: ir.Value, Type: ir.Type) -> None:
+        func: ir.Function = self.builder.function
+        returnType: ir.Type = func.function_type.return_type
+        if Type != returnType:
+            # LLVM would reject the ret, and only when it parses the function; a lazy JIT does that on the first call
+            self.errors.append(f"~~~ COMPILE ERROR: Function {func.name} returns {returnType}, not {Type}.")
+            value = ir.Constant(returnType, ir.Undefined)
+
+        if self.instrument:
+            self.profileExit()
+        self.builder.ret(value)
+
+    def profileEntry(self, func: ir.Function) -> None:
+        # calls += 1, then remember the cycle counter for the returns
+        counterType: ir.IntType = ir.IntType(64)
+        self.profileCounters = ir.GlobalVariable(self.module, ir.LiteralStructType([counterType, counterType]), name=func.name + ".profile")
+        self.profileCounters.initializer = ir.Constant(self.profileCounters.value_type, None)
+
+        index: ir.IntType = ir.IntType(32)
+        callsPointer: ir.Value = self.builder.gep(self.profileCounters, [ir.Constant(index, 0), ir.Constant(index, 0)])
+        self.builder.store(self.builder.add(self.builder.load(callsPointer), ir.Constant(counterType, 1)), callsPointer)
+
+        self.cycleStart = self.builder.call(self.cycleCounter(), [])
+
+    def profileExit(self) -> None:
+        # cycles += now - start
+        counterType: ir.IntType = ir.IntType(64)
+        index: ir.IntType = ir.IntType(32)
+        elapsed: ir.Value = self.builder.sub(self.builder.call(self.cycleCounter(), []), self.cycleStart)
+
+        cyclesPointer: ir.Value = self.builder.gep(self.profileCounters, [ir.Constant(index, 0), ir.Constant(index, 1)])
+        self.builder.store(self.builder.add(self.builder.load(cyclesPointer), elapsed), cyclesPointer)
+
+    def startDebugInfo(self, path: str) -> None:
+        path = os.path.abspath(path)
+        self.debugFile = self.module.add_debug_info("DIFile", {"filename": os.path.basename(path), "directory": os.path.dirname(path)})
+        self.debugUnit = self.module.add_debug_info("DICompileUnit", {
+            "language": ir.DIToken("DW_LANG_C"),
+            "file": self.debugFile,
+            "producer": "cpl",
+            "isOptimized": True,
+            "runtimeVersion": 0,
+            "emissionKind": ir.DIToken("FullDebug")
+        }, is_distinct=True)
+        self.module.add_named_metadata("llvm.dbg.cu", self.debugUnit)
+
+        int32: ir.IntType = ir.IntType(32)
+        self.module.add_named_metadata("llvm.module.flags", [int32(7), "Dwarf Version", int32(4)])
+        self.module.add_named_metadata("llvm.module.flags", [int32(2), "Debug Info Version", int32(3)])
+
+    def subprogram(self, func: ir.Function, returnTypeName: str, parameters: list[tuple[str, str, int]], line: int) -> ir.DIValue:
+        types: list[ir.DIValue] = [self.debugType(typeName) for typeName in [returnTypeName, *(typeName for _, typeName, _ in parameters)]]
+        subroutineType: ir.DIValue = self.module.add_debug_info("DISubroutineType", {"types": self.module.add_metadata(types)})
+
+        scope: ir.DIValue = self.module.add_debug_info("DISubprogram", {
+            "name": func.name,
+            "scope": self.debugFile,
+            "file": self.debugFile,
+            "line": line,
+            "type": subroutineType,
+            "scopeLine": line,
+            "spFlags": ir.DIToken("DISPFlagDefinition | DISPFlagOptimized"),
+            "unit": self.debugUnit
+        }, is_distinct=True)
+        func.set_metadata("dbg", scope)
+        return scope
+
+    def debugType(self, typeName: str) -> ir.DIValue:
+        Type: ir.DIValue | None = self.debugTypes.get(typeName)
+        if Type is None:
+            size, encoding = DEBUG_TYPES[typeName]
+            Type = self.module.add_debug_info("DIBasicType", {"name": typeName, "size": size, "encoding": ir.DIToken(encoding)})
+            self.debugTypes[typeName] = Type
+        return Type
+
+    def locate(self, line: int) -> None:
+        # what the builder emits from here on is attributed to this source line
+        if self.debugScope is not None and line > 0:
+            self.builder.debug_metadata = self.module.add_debug_info("DILocation", {"line": line, "column": 0, "scope": self.debugScope})
+
+    def cycleCounter(self) -> ir.Function:
+        intrinsic: ir.Function | None = self.module.globals.get("llvm.readcyclecounter")
+        if intrinsic is None:
+            intrinsic = ir.Function(self.module, ir.FunctionType(ir.IntType(64), []), name="llvm.readcyclecounter")
+        return intrinsic
+
+    def declareVariable(self, slot: int, value: ir.Value, Type: ir.Type) -> None:
+        # unresolved names have no slot, the Resolver already reported them
+        if slot == NONE:
+            return
+
+        record: tuple[ir.Value, ir.Type] | None = self.slots[slot]
+        if record is not None and Type != record[1]:
+            # redeclaring reuses the variable's slot, so it keeps its type like an assignment does
+            self.errors.append(f"~~~ COMPILE ERROR: A {Type} can't be assigned to a variable of type {record[1]}.")
+            return
+
+        if self.ssa:
+            self.slots[slot] = (value, Type)
+        elif record is None:
+            pointer = self.allocate(Type)
 
-        previousEnvironment = self.environment
+            self.builder.store(value, pointer)
 
-        self.environment = Environment(parent=self.environment)
-        self.environment.define(name, func, returnType)
+            self.slots[slot] = (pointer, Type)
+        else: 
+            self.builder.store(value, record[0])
 
-        self.compile(body)
+        self.invalidate(slot)
 
-        self.environment = previousEnvironment
-        self.environment.define(name, func, returnType)
+    def assignVariable(self, slot: int, value: ir.Value, Type: ir.Type) -> None:
+        if slot == NONE or self.slots[slot] is None:
+            return
 
-        self.builder = previousBuilder
+        if Type != self.slots[slot][1]:
+            self.errors.append(f"~~~ COMPILE ERROR: A {Type} can't be assigned to a variable of type {self.slots[slot][1]}.")
+            return
 
-    def visitAssignStatement(self, node: AssignStatement) -> None: 
-        name: str = node.ident.value
-        value: Expression = node.rightValue
+        if self.ssa:
+            self.slots[slot] = (value, Type)
+        else:
+            self.builder.store(value, self.slots[slot][0])
 
-        value, Type = self.resolveValue(value)
+        self.invalidate(slot)
+
+    def loadVariable(self, slot: int) -> tuple[ir.Value, ir.Type]:
+        record: tuple[ir.Value, ir.Type] | None = self.slots[slot] if slot != NONE else None
+        if record is None:
+            Type: ir.Type = self.typeMap["int"]
+            return ir.Constant(Type, ir.Undefined), Type
+
+        if self.ssa:
+            return record
 
-        if self.environment.lookup(name) is None:
-            self.errors.append(f"~~~ COMPILE ERROR: Identifier {name} wasn't declared previously.")
+        pointer, Type = record
+        return self.builder.load(pointer), Type
+
+    def allocate(self, Type: ir.Type) -> ir.AllocaInstr:
+        # stack slots are grouped at the top of the entry block, where mem2reg looks for them
+        entry: ir.Block = self.builder.function.entry_basic_block
+        allocaBuilder: ir.IRBuilder = ir.IRBuilder(entry)
+        if self.lastAlloca is None:
+            allocaBuilder.position_at_start(entry)
         else:
-            pointer, _ = self.environment.lookup(name)
-            self.builder.store(value, pointer)
-    # endregion
+            allocaBuilder.position_after(self.lastAlloca)
+
+        self.lastAlloca = allocaBuilder.alloca(Type)
+
+        # the main builder appends, so it has to move past the inserted instruction
+        self.builder.position_at_end(self.builder.block)
+        return self.lastAlloca
+
+    def cacheValue(self, node: Expression, value: ir.Value, Type: ir.Type, reads: frozenset[int]) -> None:
+        self.valueCache[node] = (value, Type, reads)
+        for slot in reads:
+            self.cacheUsers.setdefault(slot, []).append(node)
+
+    def invalidate(self, slot: int) -> None:
+        # a store makes every cached value that read the old contents stale
+        for node in self.cacheUsers.pop(slot, ()):
+            self.valueCache.pop(node, None)
+
+    def emitCall(self, slot: int, arguments: list[tuple[ir.Value, ir.Type]]) -> tuple[ir.Value, ir.Type]:
+        record: tuple[ir.Value, ir.Type] | None = self.slots[slot] if slot != NONE else None
+
+        if record is None:
+            Type: ir.Type = self.typeMap["int"]
+            return ir.Constant(Type, ir.Undefined), Type
+
+        func, returnType = record
+        paramTypes: list[ir.Type] = func.function_type.args
+        if len(arguments) != len(paramTypes) or any(Type != paramType for (_, Type), paramType in zip(arguments, paramTypes)):
+            self.errors.append(f"~~~ COMPILE ERROR: Function {func.name} called with the wrong arguments.")
+            return ir.Constant(returnType, ir.Undefined), returnType
+
+        return self.builder.call(func, [value for value, _ in arguments]), returnType
+
+    def emitInfix(self, operator: str, leftValue: ir.Value, leftType: ir.Type, rightValue: ir.Value, rightType: ir.Type) -> tuple[ir.Value, ir.Type]:
+        value = None
+        Type = None
         
-    # region helpers
+        if (isinstance(leftType, ir.IntType) and isinstance(rightType, ir.IntType)):
+            Type = self.typeMap["int"]
+            match operator:
+                case "+":
+                    value = self.builder.add(leftValue, rightValue)
+                case "-":
+                    value = self.builder.sub(leftValue, rightValue)
+                case "*":
+                    value = self.builder.mul(leftValue, rightValue)
+                case "/":
+                    value = self.builder.sdiv(leftValue, rightValue)
+                case "%":
+                    value = self.builder.srem(leftValue, rightValue)
+            
+        elif (isinstance(leftType, ir.DoubleType) and isinstance(rightType, ir.DoubleType)):
+            Type = self.typeMap["double"]
+            match operator:
+                case "+":
+                    value = self.builder.fadd(leftValue, rightValue)
+                case "-":
+                    value = self.builder.fsub(leftValue, rightValue)
+                case "*":
+                    value = self.builder.fmul(leftValue, rightValue)
+                case "/":
+                    value = self.builder.fdiv(leftValue, rightValue)
+                case "%":
+                    value = self.builder.frem(leftValue, rightValue)
+
+        if value is None:
+            # the same error as the text backend; the placeholder only keeps code generation going until the errors are reported
+            self.errors.append(f"~~~ COMPILE ERROR: Operator {operator} can't be applied to {leftType} and {rightType}.")
+            return ir.Constant(leftType, ir.Undefined), leftType
+
+        return value, Type
+
     def resolveValue(self, node: Expression) -> tuple[ir.Value, ir.Type]:
-        match node.type():
-            case NodeType.IntegerLiteral:
-                node: IntegerLiteral = node
-                value, Type = node.value, self.typeMap["int"]
-                return ir.Constant(Type, value), Type
-            case NodeType.DoubleLiteral:
-                node: DoubleLiteral = node
-                value, Type = node.value, self.typeMap["double"]
-                return ir.Constant(Type, value), Type
-            case NodeType.IdentifierLiteral:
-                node: IdentifierLiteral = node
-                pointer, Type = self.environment.lookup(node.value)
-                return self.builder.load(pointer), Type
-
-            # expression values
-            case NodeType.InfixExpression:
-                return self.visitInfixExpression(node)
+        nodeClass: type = node.__class__
+
+        if nodeClass is IntegerLiteral:
+            Type: ir.Type = self.typeMap["int"]
+            return ir.Constant(Type, node.value), Type
+        elif nodeClass is DoubleLiteral:
+            Type = self.typeMap["double"]
+            return ir.Constant(Type, node.value), Type
+        elif nodeClass is IdentifierLiteral:
+            slot: int = slotOf(node.symbol)
+
+            if self.cse:
+                cached: tuple[ir.Value, ir.Type, frozenset[int]] | None = self.valueCache.get(node)
+                if cached is not None:
+                    return cached[0], cached[1]
+
+                value, Type = self.loadVariable(slot)
+                self.cacheValue(node, value, Type, frozenset((slot,)))
+                return value, Type
+
+            return self.loadVariable(slot)
+
+        # expression values
+        elif nodeClass is InfixExpression or nodeClass is CallExpression:
+            return self.emitExpression(node)
     # endregion
\ No newline at end of file
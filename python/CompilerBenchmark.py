@@ -0,0 +1,248 @@
+from Generator import ProgramGenerator
+from Lexer import Lexer
+from IndexedParser import IndexedParser
+from AST import Program
+from Arena import ASTArena
+from Compiler import Compiler
+from TextCompiler import TextCompiler
+from Resolver import Resolver
+from Backend import Backend
+from Instrumentation import Instrumentation
+import gc
+import json
+import math
+import os
+import platform
+import time
+
+import llvmlite.binding as llvm
+
+# compiler throughput on generated programs: every phase of the pipeline timed on its own, for each program shape at growing sizes
+SAVE_BASELINE: bool = 0
+TEXT_BACKEND: bool = 1
+SSA_CODEGEN: bool = 1
+
+OPT_LEVEL: str = "O2"
+SEED: int = 1
+
+# program shape -> sizes, each twice the one before so the scaling check compares like with like
+WORKLOADS: dict[str, list[int]] = {
+    "functions": [125, 250, 500, 1000],
+    "statements": [500, 1000, 2000, 4000],
+    "nesting": [250, 500, 1000, 2000],
+    "width": [1000, 2000, 4000, 8000],
+    "variables": [500, 1000, 2000, 4000]
+}
+
+# the fastest of RUNS measured runs counts, after WARMUP unmeasured ones
+RUNS: int = 5
+WARMUP: int = 1
+
+BASELINE_PATH: str = "../benchmarks/compiler-baseline.json"
+
+# a phase this much slower than the baseline, on the geometric mean over every workload and size, is a regression.
+# times are compared relative to a fixed calibration loop timed alongside them: machine speed drifts too much to compare raw times,
+# and a single case is too noisy to judge on its own
+TOLERANCE: float = 0.15
+CALIBRATION_ITERATIONS: int = 200_000
+
+# a phase whose time grows faster than size to this power is reported as nonlinear;
+# nonlinear phases the baseline already has only count when their exponent grew by more than SCALING_SLACK
+SCALING_LIMIT: float = 1.4
+SCALING_SLACK: float = 0.2
+
+# phases shorter than this are too noisy to judge, for scaling and against the baseline alike
+NOISE_FLOOR_MS: float = 20.0
+
+PHASES: list[str] = ["lex", "parse", "resolution", "code generation", "IR printing", "LLVM parse", "LLVM optimization", "MCJIT finalization"]
+
+def createCompiler() -> Compiler | TextCompiler:
+    return TextCompiler(ssa=SSA_CODEGEN) if TEXT_BACKEND else Compiler(ssa=SSA_CODEGEN)
+
+def compileOnce(source: str, backend: Backend, instrumentation: Instrumentation) -> tuple[int, int]:
+    # one pass through the pipeline as main.py runs it, without the AST optimizer or the cache; returns tokens and AST nodes
+    with instrumentation.phase("lex"):
+        lexer: Lexer = Lexer(source)
+
+    with instrumentation.phase("parse"):
+        parser: IndexedParser = IndexedParser(lexer.buffer)
+        program: Program = parser.parseProgram()
+
+    if len(parser.errors) > 0:
+        raise ValueError(f"generated program doesn't parse: {parser.errors[0]}")
+
+    nodes: int = len(ASTArena.fromProgram(program))
+
+    with instrumentation.phase("resolution"):
+        Resolver().resolve(program)
+
+    compiler: Compiler | TextCompiler = createCompiler()
+    with instrumentation.phase("code generation"):
+        compiler.compile(program)
+
+    if len(compiler.errors) > 0:
+        raise ValueError(f"generated program doesn't compile: {compiler.errors[0]}")
+
+    with instrumentation.phase("IR printing"):
+        text: str = str(compiler.module)
+
+    with instrumentation.phase("LLVM parse"):
+        moduleRef: llvm.ModuleRef = backend.parseAssembly(text)
+
+    with instrumentation.phase("LLVM optimization"):
+        backend.optimize(moduleRef)
+
+    with instrumentation.phase("MCJIT finalization"):
+        backend.jit(moduleRef)
+
+    return len(lexer.buffer), nodes
+
+def calibrate() -> int:
+    # plain interpreter work whose cost never changes with the compiler
+    startTime: int = time.perf_counter_ns()
+    total: int = 0
+    for index in range(CALIBRATION_ITERATIONS):
+        total += index * index % 7
+    return time.perf_counter_ns() - startTime
+
+def measure(source: str, backend: Backend) -> dict:
+    instrumentation: Instrumentation = Instrumentation(memory=False)
+    calibrations: list[int] = []
+
+    for run in range(WARMUP + RUNS):
+        gc.collect()
+        instrumentation.startRun(warmup=run < WARMUP)
+        tokens, nodes = compileOnce(source, backend, instrumentation)
+        instrumentation.endRun()
+        calibrations.append(calibrate())
+
+    phases: dict[str, float] = {name: min(record.wallTimes) / 1e6 for name, record in instrumentation.phases.items()}
+    return {"tokens": tokens, "nodes": nodes, "bytes": len(source), "calibration": min(calibrations) / 1e6, "phases": phases}
+
+# region analysis
+def scalingExponent(sizes: list[int], times: list[float]) -> float:
+    # least squares slope of log time over log size: 1 is linear, 2 quadratic
+    xs: list[float] = [math.log(size) for size in sizes]
+    ys: list[float] = [math.log(max(wallTime, 1e-6)) for wallTime in times]
+    meanX: float = sum(xs) / len(xs)
+    meanY: float = sum(ys) / len(ys)
+    spread: float = sum((x - meanX) ** 2 for x in xs)
+    return sum((x - meanX) * (y - meanY) for x, y in zip(xs, ys)) / spread if spread > 0 else 0.0
+
+def scaling(results: dict) -> dict[str, dict[str, float]]:
+    # workload -> phase -> exponent, for the phases long enough to tell
+    exponents: dict[str, dict[str, float]] = {}
+    for workload, bySize in results.items():
+        sizes: list[int] = sorted(int(size) for size in bySize)
+        if len(sizes) < 2:
+            continue
+
+        exponents[workload] = {}
+        for phase in PHASES:
+            times: list[float] = [bySize[str(size)]["phases"][phase] for size in sizes]
+            if times[-1] >= NOISE_FLOOR_MS:
+                exponents[workload][phase] = round(scalingExponent(sizes, times), 3)
+    return exponents
+
+def checkScaling(exponents: dict[str, dict[str, float]], baseline: dict[str, dict[str, float]]) -> tuple[list[str], list[str]]:
+    # (new nonlinear phases, ones the baseline already had)
+    findings: list[str] = []
+    known: list[str] = []
+    for workload, byPhase in exponents.items():
+        for phase, exponent in byPhase.items():
+            if exponent <= SCALING_LIMIT:
+                continue
+
+            reference: float | None = baseline.get(workload, {}).get(phase)
+            if reference is not None and exponent <= reference + SCALING_SLACK:
+                known.append(f"{workload} / {phase}: size^{exponent:.2f}, baseline size^{reference:.2f}")
+            else:
+                findings.append(f"{workload} / {phase}: size^{exponent:.2f}" + (f", baseline size^{reference:.2f}" if reference is not None else ""))
+    return findings, known
+
+def compareBaseline(results: dict, baseline: dict) -> dict[str, tuple[float, int]]:
+    # phase -> (geometric mean of current over baseline calibrated time, number of cases it covers)
+    logRatios: dict[str, list[float]] = {phase: [] for phase in PHASES}
+    for workload, bySize in results.items():
+        for size, result in bySize.items():
+            reference: dict | None = baseline.get(workload, {}).get(size)
+            if reference is None:
+                continue
+
+            for phase, wallTime in result["phases"].items():
+                referenceTime: float | None = reference["phases"].get(phase)
+                if referenceTime is None or max(wallTime, referenceTime) < NOISE_FLOOR_MS:
+                    continue
+                logRatios[phase].append(math.log((wallTime / result["calibration"]) / (referenceTime / reference["calibration"])))
+
+    return {phase: (math.exp(sum(ratios) / len(ratios)), len(ratios)) for phase, ratios in logRatios.items() if len(ratios) > 0}
+# endregion
+
+def table(results: dict) -> str:
+    lines: list[str] = [f"=== COMPILER THROUGHPUT ({'text' if TEXT_BACKEND else 'llvmlite'} backend, {OPT_LEVEL}, fastest of {RUNS} runs) ==="]
+    lines.append(f"{'workload':<11} {'size':>6} {'tokens':>8} {'nodes':>8} {'phase':<19} {'ms':>10} {'Mtokens/s':>10} {'Mnodes/s':>10}")
+
+    for workload, bySize in results.items():
+        for size, result in bySize.items():
+            for phase in PHASES:
+                wallTime: float = result["phases"][phase]
+                tokenRate: float = result["tokens"] / wallTime / 1e3 if wallTime > 0 else 0.0
+                nodeRate: float = result["nodes"] / wallTime / 1e3 if wallTime > 0 else 0.0
+                lines.append(f"{workload:<11} {size:>6} {result['tokens']:>8} {result['nodes']:>8} {phase:<19} {wallTime:>10.3f} {tokenRate:>10.3f} {nodeRate:>10.3f}")
+
+            total: float = sum(result["phases"].values())
+            lines.append(f"{workload:<11} {size:>6} {result['tokens']:>8} {result['nodes']:>8} {'total':<19} {total:>10.3f} "
+                         f"{result['tokens'] / total / 1e3:>10.3f} {result['nodes'] / total / 1e3:>10.3f}")
+
+    return "\n".join(lines)
+
+if __name__ == '__main__':
+    backend: Backend = Backend(optLevel=OPT_LEVEL)
+
+    results: dict[str, dict[str, dict]] = {}
+    for workload, sizes in WORKLOADS.items():
+        results[workload] = {}
+        for size in sizes:
+            source: str = ProgramGenerator(SEED).generate(workload, size)
+            results[workload][str(size)] = measure(source, backend)
+            print(f"{workload} {size}: {sum(results[workload][str(size)]['phases'].values()):.1f} ms", flush=True)
+
+    print(table(results))
+
+    exponents: dict[str, dict[str, float]] = scaling(results)
+
+    if SAVE_BASELINE:
+        os.makedirs(os.path.dirname(os.path.abspath(BASELINE_PATH)), exist_ok=True)
+        with open(BASELINE_PATH, "w") as f:
+            json.dump({"processor": llvm.get_host_cpu_name(), "machine": platform.machine(), "results": results, "scaling": exponents}, f, indent=4)
+        print(f"Baseline written to {BASELINE_PATH}")
+        exit(0)
+
+    baseline: dict | None = None
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, "r") as f:
+            baseline = json.load(f)
+
+    problems: list[str] = []
+
+    nonlinear, known = checkScaling(exponents, baseline["scaling"] if baseline is not None else {})
+    print(f"=== SCALING (limit size^{SCALING_LIMIT}) ===")
+    print("\n".join(nonlinear) if len(nonlinear) > 0 else "no phase became nonlinear")
+    if len(known) > 0:
+        print("already in the baseline:\n" + "\n".join(known))
+    problems.extend(nonlinear)
+
+    if baseline is not None:
+        # numbers from another CPU say little about this one
+        if baseline["processor"] != llvm.get_host_cpu_name():
+            print(f"recorded on {baseline['processor']}, this is {llvm.get_host_cpu_name()}; comparing anyway")
+
+        ratios: dict[str, tuple[float, int]] = compareBaseline(results, baseline["results"])
+        print(f"=== BASELINE (tolerance {round(TOLERANCE * 100)}%, calibrated) ===")
+        for phase, (ratio, cases) in ratios.items():
+            regressed: bool = ratio > 1 + TOLERANCE
+            print(f"{phase:<19} {100 * (ratio - 1):>+6.1f}% over {cases} cases{' REGRESSION' if regressed else ''}")
+            if regressed:
+                problems.append(f"{phase}: {100 * (ratio - 1):+.1f}%")
+
+    exit(1 if len(problems) > 0 else 0)
\ No newline at end of file
@@ -0,0 +1,292 @@
+import math
+
+from AST import Program, Statement, Expression, ExpressionStatement, InfixExpression, IntegerLiteral, DoubleLiteral, CallExpression
+from AST import ShallStatement, IdentifierLiteral, BlockStatement, FunctionStatement, ReturnStatement, AssignStatement
+from Resolver import Symbol
+
+INT32_MIN: int = -(1 << 31)
+
+# region arithmetic
+# these mirror what the Compiler emits: i32 add/sub/mul/sdiv/srem and double fadd/fsub/fmul/fdiv/frem
+def wrapInt32(value: int) -> int:
+    return (value + (1 << 31)) % (1 << 32) - (1 << 31)
+
+def foldInteger(operator: str, left: int, right: int) -> int | None:
+    left, right = wrapInt32(left), wrapInt32(right)
+
+    match operator:
+        case "+":
+            return wrapInt32(left + right)
+        case "-":
+            return wrapInt32(left - right)
+        case "*":
+            return wrapInt32(left * right)
+        case "/" | "%":
+            # division by zero and INT32_MIN / -1 are undefined at run time, leave them alone
+            if right == 0 or (left == INT32_MIN and right == -1):
+                return None
+
+            quotient: int = abs(left) // abs(right)
+            if (left < 0) != (right < 0):
+                quotient = -quotient
+
+            return quotient if operator == "/" else left - right * quotient
+    return None
+
+def foldDouble(operator: str, left: float, right: float) -> float | None:
+    match operator:
+        case "+":
+            return left + right
+        case "-":
+            return left - right
+        case "*":
+            return left * right
+        case "/":
+            if right == 0.0:
+                if left == 0.0 or math.isnan(left):
+                    return math.nan
+                return math.copysign(math.inf, left) * math.copysign(1.0, right)
+            return left / right
+        case "%":
+            try:
+                return math.fmod(left, right)
+            except ValueError:
+                return None
+    return None
+# endregion
+
+# value types the evaluator tracks, matching the Compiler's typeMap keys
+INT: str = "int"
+DOUBLE: str = "double"
+
+class EvaluationAbandoned(Exception):
+    pass
+
+class BudgetExhausted(EvaluationAbandoned):
+    pass
+
+class ConstantEvaluator:
+    def __init__(self, program: Program, stepBudget: int = 100_000, depthLimit: int = 64) -> None:
+        self.stepBudget: int = stepBudget
+        self.depthLimit: int = depthLimit
+
+        # only top-level functions are candidates, by the symbol the Resolver gave them, so a call that a local variable
+        # shadows never matches; two definitions share a symbol, which is an error the Compiler reports
+        self.functions: dict[Symbol, FunctionStatement] = {}
+        duplicates: set[Symbol] = set()
+        for statement in program.statements:
+            if statement.__class__ is FunctionStatement and statement.name is not None and statement.name.symbol is not None:
+                if statement.name.symbol in self.functions:
+                    duplicates.add(statement.name.symbol)
+                self.functions[statement.name.symbol] = statement
+
+        for symbol in duplicates:
+            del self.functions[symbol]
+
+        self.pure: set[Symbol] = self.findPureFunctions()
+
+        # (symbol id, argument keys) -> (type, value) of the result, None when evaluation was abandoned
+        self.memo: dict[tuple, Expression | None] = {}
+        self.hits: int = 0
+
+        self.steps: int = 0
+        self.depth: int = 0
+
+    # region purity
+    def findPureFunctions(self) -> set[Symbol]:
+        # a function is pure when its body is straight-line code over its own variables and it only calls pure functions
+        callees: dict[Symbol, set[Symbol]] = {}
+        for symbol, function in self.functions.items():
+            calls: set[Symbol] | None = self.bodyCalls(function)
+            if calls is not None:
+                callees[symbol] = calls
+
+        pure: set[Symbol] = set(callees)
+        changed: bool = True
+        while changed:
+            changed = False
+            for symbol in list(pure):
+                if not callees[symbol] <= pure:
+                    pure.discard(symbol)
+                    changed = True
+
+        return pure
+
+    def bodyCalls(self, function: FunctionStatement) -> set[Symbol] | None:
+        if function.returnType not in (INT, DOUBLE) or function.body is None:
+            return None
+        if any(parameter.valueType not in (INT, DOUBLE) for parameter in function.parameters):
+            return None
+
+        calls: set[Symbol] = set()
+        for statement in function.body.statements:
+            statementClass: type = statement.__class__
+
+            if statementClass is ShallStatement:
+                expression: Expression | None = statement.value
+            elif statementClass is AssignStatement:
+                expression = statement.rightValue
+            elif statementClass is ReturnStatement:
+                expression = statement.returnValue
+            elif statementClass is ExpressionStatement:
+                expression = statement.expression
+            else:
+                return None
+
+            stack: list[Expression | None] = [expression]
+            while len(stack) > 0:
+                current: Expression | None = stack.pop()
+                currentClass: type = current.__class__
+
+                if currentClass is InfixExpression:
+                    stack.append(current.leftNode)
+                    stack.append(current.rightNode)
+                elif currentClass is CallExpression:
+                    if current.function.__class__ is not IdentifierLiteral or current.function.symbol is None:
+                        return None
+                    calls.add(current.function.symbol)
+                    stack.extend(current.arguments)
+                elif currentClass is not IntegerLiteral and currentClass is not DoubleLiteral and currentClass is not IdentifierLiteral:
+                    return None
+
+        return calls
+    # endregion
+
+    def evaluate(self, symbol: Symbol | None, arguments: list[Expression]) -> Expression | None:
+        # arguments are literals; returns the literal the call produces or None when it has to run at run time
+        if symbol not in self.pure:
+            return None
+
+        values: list[tuple[str, int | float]] = [self.literalValue(argument) for argument in arguments]
+
+        self.steps = 0
+        self.depth = 0
+        try:
+            valueType, value = self.call(symbol, values)
+        except EvaluationAbandoned:
+            return None
+
+        return IntegerLiteral(value=value) if valueType == INT else DoubleLiteral(value=value)
+
+    def literalValue(self, node: Expression) -> tuple[str, int | float]:
+        if node.__class__ is IntegerLiteral:
+            return INT, wrapInt32(node.value)
+        return DOUBLE, node.value
+
+    def memoKey(self, symbol: Symbol, arguments: list[tuple[str, int | float]]) -> tuple:
+        # hex keeps 0.0 and -0.0 apart and lets NaN arguments share
+        return (symbol.id, *((valueType, value.hex() if valueType == DOUBLE else value) for valueType, value in arguments))
+
+    def call(self, symbol: Symbol | None, arguments: list[tuple[str, int | float]]) -> tuple[str, int | float]:
+        function: FunctionStatement | None = self.functions.get(symbol)
+        if symbol not in self.pure or len(arguments) != len(function.parameters):
+            raise EvaluationAbandoned()
+
+        key: tuple = self.memoKey(symbol, arguments)
+        if key in self.memo:
+            self.hits += 1
+            result: tuple[str, int | float] | None = self.memo[key]
+            if result is None:
+                raise EvaluationAbandoned()
+            return result
+
+        if self.depth >= self.depthLimit:
+            raise BudgetExhausted()
+
+        self.depth += 1
+        try:
+            result = self.run(function, arguments)
+        except BudgetExhausted:
+            # running out of budget says nothing about the call itself, only genuine failures are remembered
+            raise
+        except EvaluationAbandoned:
+            self.memo[key] = None
+            raise
+        finally:
+            self.depth -= 1
+
+        self.memo[key] = result
+        return result
+
+    def run(self, function: FunctionStatement, arguments: list[tuple[str, int | float]]) -> tuple[str, int | float]:
+        variables: dict[Symbol, tuple[str, int | float]] = {}
+        for parameter, (valueType, value) in zip(function.parameters, arguments):
+            if parameter.valueType != valueType:
+                raise EvaluationAbandoned()
+            variables[parameter.symbol] = (valueType, value)
+
+        for statement in function.body.statements:
+            statementClass: type = statement.__class__
+
+            if statementClass is ShallStatement:
+                symbol: Symbol = statement.name.symbol
+                result: tuple[str, int | float] = self.expression(statement.value, variables)
+                # redeclaring stores into the existing slot, which only works for the same type
+                if symbol in variables and variables[symbol][0] != result[0]:
+                    raise EvaluationAbandoned()
+                variables[symbol] = result
+            elif statementClass is AssignStatement:
+                symbol = statement.ident.symbol
+                result = self.expression(statement.rightValue, variables)
+                if symbol not in variables or variables[symbol][0] != result[0]:
+                    raise EvaluationAbandoned()
+                variables[symbol] = result
+            elif statementClass is ReturnStatement:
+                result = self.expression(statement.returnValue, variables)
+                if result[0] != function.returnType:
+                    raise EvaluationAbandoned()
+                return result
+            elif statement.expression.__class__ is InfixExpression or statement.expression.__class__ is CallExpression:
+                # the Compiler only emits infix and call expression statements
+                self.expression(statement.expression, variables)
+
+        # falling off the end has no defined result
+        raise EvaluationAbandoned()
+
+    def expression(self, node: Expression | None, variables: dict[Symbol, tuple[str, int | float]]) -> tuple[str, int | float]:
+        results: list[tuple[str, int | float]] = []
+        stack: list[tuple[Expression | None, bool]] = [(node, False)]
+
+        while len(stack) > 0:
+            current, visited = stack.pop()
+            currentClass: type = current.__class__
+
+            self.steps += 1
+            if self.steps > self.stepBudget:
+                raise BudgetExhausted()
+
+            if currentClass is InfixExpression:
+                if not visited:
+                    stack.append((current, True))
+                    stack.append((current.rightNode, False))
+                    stack.append((current.leftNode, False))
+                    continue
+
+                rightType, rightValue = results.pop()
+                leftType, leftValue = results.pop()
+                if leftType != rightType:
+                    raise EvaluationAbandoned()
+
+                value: int | float | None = foldInteger(current.operator, leftValue, rightValue) if leftType == INT else foldDouble(current.operator, leftValue, rightValue)
+                if value is None:
+                    raise EvaluationAbandoned()
+                results.append((leftType, value))
+            elif currentClass is CallExpression:
+                if not visited:
+                    stack.append((current, True))
+                    for argument in reversed(current.arguments):
+                        stack.append((argument, False))
+                    continue
+
+                count: int = len(current.arguments)
+                arguments: list[tuple[str, int | float]] = results[len(results) - count:]
+                del results[len(results) - count:]
+                results.append(self.call(current.function.symbol, arguments))
+            elif currentClass is IntegerLiteral or currentClass is DoubleLiteral:
+                results.append(self.literalValue(current))
+            elif currentClass is IdentifierLiteral and current.symbol in variables:
+                results.append(variables[current.symbol])
+            else:
+                raise EvaluationAbandoned()
+
+        return results[0]
\ No newline at end of file
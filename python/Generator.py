@@ -0,0 +1,135 @@
+import random
+
+# int operators a generated expression may use between any two operands; / and % only ever get a nonzero literal on the right
+OPERATORS: list[str] = ["+", "-", "*"]
+
+class ProgramGenerator:
+    # valid CPL programs of a chosen shape and size, the same ones for the same seed.
+    # every program defines mn() -> int, generated code never mixes int and double and never divides by anything but a literal
+    def __init__(self, seed: int = 0) -> None:
+        self.random: random.Random = random.Random(seed)
+
+        self.shapes: dict[str, callable] = {
+            "functions": self.manyFunctions,
+            "statements": self.longStatements,
+            "nesting": self.deepNesting,
+            "width": self.wideExpression,
+            "variables": self.manyVariables
+        }
+
+    def generate(self, shape: str, size: int) -> str:
+        return self.shapes[shape](size)
+
+    # region pieces
+    def literal(self, double: bool = False) -> str:
+        if double:
+            return f"{self.random.randint(0, 99)},{self.random.randint(0, 99)}"
+        return str(self.random.randint(0, 999))
+
+    def operand(self, names: list[str], double: bool = False) -> str:
+        if len(names) > 0 and self.random.random() < 0.6:
+            return self.random.choice(names)
+        return self.literal(double)
+
+    def expression(self, names: list[str], operators: int, double: bool = False) -> str:
+        # a flat chain, the parser's precedence climbing does the grouping; every few operands a literal divisor keeps values small
+        parts: list[str] = [self.operand(names, double)]
+        for _ in range(operators):
+            if not double and self.random.random() < 0.1:
+                parts.append(f"{self.random.choice('/%')} {self.random.randint(1, 97)}")
+            else:
+                parts.append(f"{self.random.choice(OPERATORS)} {self.operand(names, double)}")
+        return " ".join(parts)
+
+    def function(self, name: str, parameters: list[tuple[str, str]], returnType: str, body: list[str]) -> str:
+        parameterList: str = ". ".join(f"{parameter}: {Type}" for parameter, Type in parameters)
+        lines: list[str] = [f"f {name}({parameterList}) -> {returnType} {{"]
+        lines.extend(f"    {statement}" for statement in body)
+        lines.append("}")
+        return "\n".join(lines) + "\n"
+    # endregion
+
+    # region shapes
+    def manyFunctions(self, count: int) -> str:
+        # small functions, each calling a few earlier ones of its own type; every fourth one works on doubles
+        functions: list[str] = []
+        signatures: list[tuple[str, int, bool]] = []
+
+        for index in range(count):
+            double: bool = index % 4 == 3
+            Type: str = "double" if double else "int"
+            parameters: list[tuple[str, str]] = [(f"p{position}", Type) for position in range(self.random.randint(0, 3))]
+            names: list[str] = [parameter for parameter, _ in parameters]
+
+            body: list[str] = []
+            for statement in range(self.random.randint(1, 4)):
+                value: str = self.expression(names, self.random.randint(1, 4), double)
+
+                callees: list[tuple[str, int, bool]] = [signature for signature in signatures[-16:] if signature[2] == double]
+                if len(callees) > 0 and self.random.random() < 0.5:
+                    callee, arity, _ = self.random.choice(callees)
+                    arguments: str = ". ".join(self.operand(names, double) for _ in range(arity))
+                    value = f"{callee}({arguments}) + {value}"
+
+                body.append(f"_ v{statement}: {Type} = {value}.")
+                names.append(f"v{statement}")
+
+            body.append(f"r {names[-1]}.")
+            functions.append(self.function(f"g{index}", parameters, Type, body))
+            signatures.append((f"g{index}", len(parameters), double))
+
+        last: tuple[str, int, bool] | None = next((signature for signature in reversed(signatures) if not signature[2]), None)
+        result: str = f"{last[0]}({'. '.join('1' for _ in range(last[1]))})" if last is not None else "0"
+        functions.append(self.function("mn", [], "int", [f"r {result} % 256."]))
+        return "".join(functions)
+
+    def longStatements(self, count: int) -> str:
+        # one function, a long run of declarations and reassignments over a handful of variables
+        names: list[str] = ["x"]
+        body: list[str] = []
+        for index in range(count):
+            value: str = self.expression(names, self.random.randint(1, 6))
+            if len(names) < 8 or self.random.random() < 0.3:
+                body.append(f"_ s{index}: int = {value}.")
+                names.append(f"s{index}")
+            else:
+                body.append(f"{self.random.choice(names)} = {value}.")
+        body.append(f"r {names[-1]} % 256.")
+
+        return self.function("work", [("x", "int")], "int", body) + self.function("mn", [], "int", ["r work(7)."])
+
+    def deepNesting(self, depth: int) -> str:
+        # one expression nested depth levels deep, alternating sides, with a call wrapped around every few levels
+        expression: str = "x"
+        for level in range(depth):
+            operator: str = self.random.choice(OPERATORS)
+            if level % 8 == 7:
+                expression = f"step({expression})"
+            elif level % 2 == 0:
+                expression = f"({expression} {operator} {self.literal()})"
+            else:
+                expression = f"({self.literal()} {operator} {expression})"
+
+        step: str = self.function("step", [("y", "int")], "int", ["r y % 1000 + 1."])
+        work: str = self.function("work", [("x", "int")], "int", [f"r {expression}."])
+        return step + work + self.function("mn", [], "int", ["r work(3) % 256."])
+
+    def wideExpression(self, width: int) -> str:
+        # a single expression of width operands over a few parameters
+        names: list[str] = ["a", "b", "c", "d"]
+        body: list[str] = [f"r ({self.expression(names, width - 1)}) % 256."]
+        work: str = self.function("work", [(name, "int") for name in names], "int", body)
+        return work + self.function("mn", [], "int", ["r work(1. 2. 3. 4)."])
+
+    def manyVariables(self, count: int) -> str:
+        # count distinct variables, each read again far from where it was declared
+        body: list[str] = []
+        for index in range(count):
+            earlier: list[str] = [f"w{self.random.randrange(index)}" for _ in range(3)] if index > 0 else ["x"]
+            body.append(f"_ w{index}: int = {self.expression(earlier, 2)}.")
+
+        total: str = " + ".join(f"w{index}" for index in range(0, count, max(1, count // 64)))
+        body.append(f"r ({total}) % 256.")
+
+        return self.function("work", [("x", "int")], "int", body) + self.function("mn", [], "int", ["r work(5)."])
+    # endregion
\ No newline at end of file
@@ -0,0 +1,107 @@
+from AST import Program, Statement, Expression, ExpressionStatement, InfixExpression, DoubleLiteral, IdentifierLiteral
+from AST import ShallStatement, BlockStatement, FunctionStatement, ReturnStatement, AssignStatement, CallExpression
+
+class HashConser:
+    def __init__(self) -> None:
+        # structural key -> the one shared node; children in keys are already shared, so they compare by identity
+        self.table: dict[tuple, Expression] = {}
+
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def leafKey(self, node: Expression) -> tuple:
+        if node.__class__ is DoubleLiteral:
+            # hex keeps 0.0 and -0.0 apart and lets NaN literals share
+            return (DoubleLiteral, node.value.hex())
+        if node.__class__ is IdentifierLiteral:
+            # the same name in two functions is two different variables, so only resolved identifiers are shared
+            return (IdentifierLiteral, node.value, node.symbol if node.symbol is not None else node)
+        return (node.__class__, node.value)
+
+    def intern(self, node: Expression | None) -> Expression | None:
+        # post-order with an explicit stack; children are replaced by their shared copies before the parent is looked up
+        results: list[Expression | None] = []
+        stack: list[tuple[Expression | None, bool]] = [(node, False)]
+
+        while len(stack) > 0:
+            current, visited = stack.pop()
+
+            if current is None:
+                results.append(None)
+                continue
+
+            isInfix: bool = current.__class__ is InfixExpression
+            isCall: bool = current.__class__ is CallExpression
+            if (isInfix or isCall) and not visited:
+                stack.append((current, True))
+                if isCall:
+                    for argument in reversed(current.arguments):
+                        stack.append((argument, False))
+                    stack.append((current.function, False))
+                else:
+                    stack.append((current.rightNode, False))
+                    stack.append((current.leftNode, False))
+                continue
+
+            if isInfix:
+                rightNode: Expression | None = results.pop()
+                leftNode: Expression | None = results.pop()
+                key: tuple = (InfixExpression, current.operator, leftNode, rightNode)
+            elif isCall:
+                # calls have no side effects in this language, so equal calls may share a node too
+                start: int = len(results) - len(current.arguments) - 1
+                operands: list[Expression | None] = results[start:]
+                del results[start:]
+                key = (CallExpression, *operands)
+            else:
+                key = self.leafKey(current)
+
+            shared: Expression | None = self.table.get(key)
+            if shared is None:
+                if isInfix:
+                    # swapping a child for a structurally identical one is safe even if current is reachable elsewhere
+                    current.leftNode = leftNode
+                    current.rightNode = rightNode
+                    current.structuralHash = hash((current.operator, self.hashOf(leftNode), self.hashOf(rightNode)))
+                elif isCall:
+                    current.function = operands[0]
+                    current.arguments = operands[1:]
+                    current.structuralHash = hash(tuple(self.hashOf(operand) for operand in operands))
+                else:
+                    current.structuralHash = hash(key)
+
+                self.table[key] = current
+                self.misses += 1
+                shared = current
+            else:
+                self.hits += 1
+
+            results.append(shared)
+
+        return results[0]
+
+    def hashOf(self, node: Expression | None) -> int:
+        return node.structuralHash if node is not None else 0
+
+    def internStatement(self, statement: Statement | None) -> None:
+        statementClass: type = statement.__class__
+
+        if statementClass is ExpressionStatement:
+            statement.expression = self.intern(statement.expression)
+        elif statementClass is ShallStatement:
+            statement.value = self.intern(statement.value)
+        elif statementClass is AssignStatement:
+            statement.rightValue = self.intern(statement.rightValue)
+        elif statementClass is ReturnStatement:
+            statement.returnValue = self.intern(statement.returnValue)
+        elif statementClass is FunctionStatement:
+            self.internStatement(statement.body)
+        elif statementClass is BlockStatement:
+            for inner in statement.statements:
+                self.internStatement(inner)
+
+    def internProgram(self, program: Program) -> Program:
+        for statement in program.statements:
+            self.internStatement(statement)
+
+        return program
\ No newline at end of file
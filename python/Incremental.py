@@ -0,0 +1,211 @@
+import hashlib
+
+import llvmlite.binding as llvm
+
+from AST import Program, Statement, Expression, ExpressionStatement, InfixExpression, CallExpression
+from AST import ShallStatement, IdentifierLiteral, BlockStatement, FunctionStatement, ReturnStatement, AssignStatement
+from Arena import ASTArena
+from Backend import Backend
+from Cache import CompilationCache
+from HashCons import HashConser
+from Parallel import CompilePool
+from Resolver import Resolver, Symbol
+
+def functionDigest(node: FunctionStatement, locations: bool = False) -> str:
+    # the flattened tree is a canonical form of the function: same code, same bytes, wherever it sits in the file,
+    # unless the code records source lines
+    arena: ASTArena = ASTArena()
+    arena.root = arena.add(node)
+    return hashlib.sha256(arena.serialize(locations, symbols=False)).hexdigest()
+
+def signatureOf(node: FunctionStatement) -> str:
+    return f"{node.name.value}({', '.join(str(parameter.valueType) for parameter in node.parameters)}) -> {node.returnType}"
+
+def nestedFunctions(node: FunctionStatement) -> list[FunctionStatement]:
+    functions: list[FunctionStatement] = []
+    stack: list[Statement | None] = [node]
+
+    while len(stack) > 0:
+        current: Statement | None = stack.pop()
+        if current.__class__ is FunctionStatement:
+            functions.append(current)
+            stack.append(current.body)
+        elif current.__class__ is BlockStatement:
+            stack.extend(current.statements)
+
+    return functions
+
+def calledSymbols(node: FunctionStatement) -> set[Symbol]:
+    # every resolved callee in the function, nested functions included
+    symbols: set[Symbol] = set()
+    stack: list[Statement | Expression | None] = [node]
+
+    while len(stack) > 0:
+        current: Statement | Expression | None = stack.pop()
+        currentClass: type = current.__class__
+
+        if currentClass is FunctionStatement:
+            stack.append(current.body)
+        elif currentClass is BlockStatement:
+            stack.extend(current.statements)
+        elif currentClass is ShallStatement:
+            stack.append(current.value)
+        elif currentClass is AssignStatement:
+            stack.append(current.rightValue)
+        elif currentClass is ReturnStatement:
+            stack.append(current.returnValue)
+        elif currentClass is ExpressionStatement:
+            stack.append(current.expression)
+        elif currentClass is InfixExpression:
+            stack.append(current.leftNode)
+            stack.append(current.rightNode)
+        elif currentClass is CallExpression:
+            if current.function.__class__ is IdentifierLiteral and current.function.symbol is not None:
+                symbols.add(current.function.symbol)
+            stack.extend(current.arguments)
+
+    return symbols
+
+def splittable(program: Program) -> bool:
+    # units are linked by name, so every definition needs a name of its own; anything else goes through the whole-program build
+    names: set[str] = set()
+    for statement in program.statements:
+        if statement.__class__ is not FunctionStatement:
+            return False
+
+        for function in nestedFunctions(statement):
+            if function.name.value in names:
+                return False
+            names.add(function.name.value)
+
+    return True
+
+def unitExternals(statement: FunctionStatement, definitions: dict[Symbol, FunctionStatement]) -> list[FunctionStatement]:
+    # the other top-level functions a unit calls, in a stable order
+    externals: list[FunctionStatement] = [definitions[symbol] for symbol in calledSymbols(statement) if symbol in definitions and definitions[symbol] is not statement]
+    externals.sort(key=lambda external: external.name.value)
+    return externals
+
+class IncrementalBuilder:
+    # every top-level function is its own unit with its own module and object; a unit is rebuilt only when its fingerprint changes
+    def __init__(self, backend: Backend, createCompiler: callable, cache: CompilationCache | None = None, options: tuple = (), pool: CompilePool | None = None, locations: bool = False) -> None:
+        self.backend: Backend = backend
+        self.createCompiler: callable = createCompiler
+        self.cache: CompilationCache | None = cache
+
+        # compiles the units that changed in worker processes, with the same compiler settings as createCompiler
+        self.pool: CompilePool | None = pool
+
+        # whatever else changes the generated code, e.g. the codegen flags
+        self.options: tuple = options
+
+        # whether the units carry debug info, then moving a function to another line changes its object
+        self.locations: bool = locations
+
+        # fingerprint key -> object, for builds in the same process; the cache keeps them across runs
+        self.objects: dict[str, bytes] = {}
+
+        self.errors: list[str] = []
+
+        self.statistics: dict[str, int] = {
+            "functions": 0,
+            "reused": 0,
+            "compiled": 0
+        }
+
+    def build(self, program: Program, hashCons: bool = False) -> list[bytes] | None:
+        # takes the optimized program; None when it can't be split into units
+        if not splittable(program):
+            return None
+
+        # fingerprints leave the symbol ids out, they depend on the rest of the file
+        digests: list[str] = [functionDigest(statement, self.locations) for statement in program.statements]
+
+        if program.symbols is None:
+            resolver: Resolver = Resolver()
+            resolver.resolve(program)
+            if len(resolver.errors) > 0:
+                self.errors.extend(resolver.errors)
+                return None
+
+        if hashCons:
+            HashConser().internProgram(program)
+
+        definitions: dict[Symbol, FunctionStatement] = {statement.name.symbol: statement for statement in program.statements}
+
+        objects: list[bytes | None] = []
+        pending: list[tuple[int, FunctionStatement, list[FunctionStatement], str]] = []
+        for statement, digest in zip(program.statements, digests):
+            self.statistics["functions"] += 1
+
+            # callers only depend on the signatures of what they call, a changed body elsewhere is relinked, not recompiled
+            externals: list[FunctionStatement] = unitExternals(statement, definitions)
+
+            fingerprint: str = hashlib.sha256("\0".join([digest, *map(signatureOf, externals)]).encode()).hexdigest()
+            objectCode: bytes | None = self.lookup(fingerprint)
+
+            if objectCode is None:
+                pending.append((len(objects), statement, externals, fingerprint))
+            else:
+                self.statistics["reused"] += 1
+
+            objects.append(objectCode)
+
+        if self.pool is not None and len(pending) > 1:
+            results: list[tuple[bytes | None, bytes | None, list[str]]] = self.pool.compile([(statement, externals) for _, statement, externals, _ in pending])
+        else:
+            results = [self.compileUnit(statement, program.symbols, externals) for _, statement, externals, _ in pending]
+
+        for (index, _, _, fingerprint), (objectCode, bitcode, errors) in zip(pending, results):
+            if len(errors) > 0:
+                self.errors.extend(errors)
+                continue
+
+            self.statistics["compiled"] += 1
+            self.storeUnit(fingerprint, objectCode, bitcode)
+            objects[index] = objectCode
+
+        if self.cache is not None and len(pending) > 0:
+            self.cache.evict()
+
+        return objects if len(self.errors) == 0 else None
+
+    def unitKey(self, fingerprint: str) -> str:
+        if self.cache is None:
+            return fingerprint
+
+        backend: Backend = self.backend
+        return self.cache.key("function", fingerprint, backend.optLevel, backend.triple, backend.cpu, backend.features, *self.options)
+
+    def lookup(self, fingerprint: str) -> bytes | None:
+        key: str = self.unitKey(fingerprint)
+
+        objectCode: bytes | None = self.objects.get(key)
+        if objectCode is None and self.cache is not None:
+            objectCode = self.cache.load(key, "object")
+            if objectCode is not None:
+                self.objects[key] = objectCode
+
+        return objectCode
+
+    def compileUnit(self, node: FunctionStatement, symbols: list[Symbol], externals: list[FunctionStatement]) -> tuple[bytes | None, bytes | None, list[str]]:
+        compiler = self.createCompiler()
+        compiler.compileUnit(node, symbols, externals)
+        if len(compiler.errors) > 0:
+            return None, None, compiler.errors
+
+        moduleRef: llvm.ModuleRef = self.backend.parse(compiler.module)
+        self.backend.optimize(moduleRef)
+        return self.backend.emitObject(moduleRef), moduleRef.as_bitcode(), []
+
+    def storeUnit(self, fingerprint: str, objectCode: bytes, bitcode: bytes) -> None:
+        key: str = self.unitKey(fingerprint)
+        self.objects[key] = objectCode
+        if self.cache is not None:
+            self.cache.store(key, {"bitcode": bitcode, "object": objectCode}, evict=False)
+
+    def report(self) -> str:
+        lines: list[str] = ["=== INCREMENTAL BUILD ==="]
+        for name, count in self.statistics.items():
+            lines.append(f"{name}: {count}")
+        return "\n".join(lines)
\ No newline at end of file
@@ -0,0 +1,369 @@
+from typing import Any
+
+from Lexer import TokenBuffer, SYMBOL_KINDS
+from Token import TokenType, TOKEN_KINDS, KIND_OF
+from Parser import PrecedenceType, PRECEDENCES, INFIX_FRAME, GROUP_FRAME, CALL_FRAME
+
+from AST import Statement, Program, Expression, InfixExpression, IntegerLiteral, DoubleLiteral, ExpressionStatement
+from AST import IdentifierLiteral, ShallStatement, FunctionStatement, ReturnStatement, BlockStatement, AssignStatement
+from AST import CallExpression, FunctionParameter
+
+EOF: int = KIND_OF[TokenType.EOF]
+INT: int = KIND_OF[TokenType.INT]
+DOUBLE: int = KIND_OF[TokenType.DOUBLE]
+IDENTIFIER: int = KIND_OF[TokenType.IDENTIFIER]
+DOT: int = KIND_OF[TokenType.DOT]
+LPAREN: int = KIND_OF[TokenType.LPAREN]
+RPAREN: int = KIND_OF[TokenType.RPAREN]
+LBRACE: int = KIND_OF[TokenType.LBRACE]
+RBRACE: int = KIND_OF[TokenType.RBRACE]
+COLON: int = KIND_OF[TokenType.COLON]
+EQUALS: int = KIND_OF[TokenType.EQUALS]
+ARROW: int = KIND_OF[TokenType.ARROW]
+SHALL: int = KIND_OF[TokenType.SHALL]
+FUNC: int = KIND_OF[TokenType.FUNC]
+RET: int = KIND_OF[TokenType.RET]
+TYPE: int = KIND_OF[TokenType.TYPE]
+
+P_LOWEST: int = PrecedenceType.P_LOWEST.value
+
+# precedence table indexed by token kind
+PRECEDENCE_TABLE: list[int] = [P_LOWEST] * len(TOKEN_KINDS)
+for tokenType, precedence in PRECEDENCES.items():
+    PRECEDENCE_TABLE[KIND_OF[tokenType]] = precedence.value
+
+# operator spelling indexed by token kind, infix literals are always a single fixed symbol
+OPERATOR_TABLE: list[str | None] = [None] * len(TOKEN_KINDS)
+for symbol, kind in SYMBOL_KINDS.items():
+    OPERATOR_TABLE[kind] = symbol
+
+class IndexedParser:
+    def __init__(self, buffer: TokenBuffer) -> None:
+        self.buffer: TokenBuffer = buffer
+        self.source: str = buffer.source
+        self.starts: list[int] = buffer.starts.tolist()
+        self.ends: list[int] = buffer.ends.tolist()
+        self.lineNumbers: list[int] = buffer.lineNumbers.tolist()
+
+        self.errors: list[str] = []
+
+        # one trailing EOF so the peek of the last token never goes out of range
+        self.kinds: list[int] = buffer.kinds.tolist()
+        self.kinds.append(EOF)
+        self.last: int = len(buffer) - 1
+        self.index: int = 0
+
+        self.prefixParseFns: list[callable] = [None] * len(TOKEN_KINDS)
+        self.prefixParseFns[IDENTIFIER] = self.parseIdentifier
+        self.prefixParseFns[INT] = self.parseIntegerLiteral
+        self.prefixParseFns[DOUBLE] = self.parseDoubleLiteral
+
+        self.infixParseFns: list[callable] = [None] * len(TOKEN_KINDS)
+        for tokenType in PRECEDENCES:
+            self.infixParseFns[KIND_OF[tokenType]] = self.parseInfixExpression
+        self.infixParseFns[LPAREN] = None
+
+        self.statementParseFns: list[callable] = [self.parseExpressionStatement] * len(TOKEN_KINDS)
+        self.statementParseFns[SHALL] = self.parseShallStatement
+        self.statementParseFns[FUNC] = self.parseFunctionStatement
+        self.statementParseFns[RET] = self.parseReturnStatement
+
+    # region parse helpers
+    def nextToken(self) -> None:
+        if self.index < self.last:
+            self.index += 1
+
+    def currentKind(self) -> int:
+        return self.kinds[self.index]
+
+    def peekKind(self, offset: int = 1) -> int:
+        index: int = self.index + offset
+        return self.kinds[index] if index <= self.last else EOF
+
+    def currentLiteral(self) -> str:
+        index: int = self.index
+        return self.source[self.starts[index]:self.ends[index]]
+
+    def currentTokenIs(self, kind: int) -> bool:
+        return self.kinds[self.index] == kind
+
+    def peekTokenIs(self, kind: int) -> bool:
+        return self.kinds[self.index + 1] == kind
+
+    def expectPeek(self, kind: int) -> bool:
+        if self.kinds[self.index + 1] == kind:
+            self.nextToken()
+            return True
+        else:
+            self.peekError(kind)
+            return False
+
+    def peekError(self, kind: int) -> None:
+        self.errors.append(f"Expected next token to be {TOKEN_KINDS[kind]}, got {TOKEN_KINDS[self.kinds[self.index + 1]]} instead")
+
+    def noPrefixParseFnError(self, kind: int) -> None:
+        self.errors.append(f"No prefix parse function for {TOKEN_KINDS[kind]} found")
+    # endregion
+
+    def parseProgram(self) -> Program:
+        program: Program = Program()
+
+        kinds: list[int] = self.kinds
+        while kinds[self.index] != EOF:
+            statement: Statement = self.parseStatement()
+            if statement is not None:
+                program.statements.append(statement)
+
+            self.nextToken()
+
+        return program
+
+    # region statement helpers
+    def parseStatement(self) -> Statement:
+        kind: int = self.kinds[self.index]
+        line: int = self.lineNumbers[self.index] if self.index <= self.last else 0
+        if kind == IDENTIFIER and self.kinds[self.index + 1] == EQUALS:
+            statement: Statement = self.parseAssignmentStatement()
+        else:
+            statement: Statement = self.statementParseFns[kind]()
+
+        if statement is not None:
+            statement.line = line
+        return statement
+
+    def parseShallStatement(self) -> ShallStatement:
+        # shall a: int = 137
+        statement: ShallStatement = ShallStatement()
+
+        if not self.expectPeek(IDENTIFIER):
+            return None
+
+        statement.name = IdentifierLiteral(value=self.currentLiteral())
+
+        if not self.expectPeek(COLON):
+            return None
+
+        if not self.expectPeek(TYPE):
+            return None
+
+        statement.valueType = self.currentLiteral()
+
+        if not self.expectPeek(EQUALS):
+            return None
+
+        self.nextToken()
+
+        statement.value = self.parseExpression(P_LOWEST)
+
+        kinds: list[int] = self.kinds
+        while kinds[self.index] != DOT and kinds[self.index] != EOF:
+            self.nextToken()
+
+        return statement
+
+    def parseExpressionStatement(self) -> ExpressionStatement:
+        expression = self.parseExpression(P_LOWEST)
+
+        if self.kinds[self.index + 1] == DOT:
+            self.nextToken()
+
+        statement: ExpressionStatement = ExpressionStatement(expression=expression)
+        return statement
+
+    def parseFunctionStatement(self) -> FunctionStatement:
+        statement: FunctionStatement = FunctionStatement()
+
+        # f name(a: int. b: int) -> int { r 2. }
+
+        if not self.expectPeek(IDENTIFIER):
+            return None
+
+        statement.name = IdentifierLiteral(value=self.currentLiteral())
+
+        if not self.expectPeek(LPAREN):
+            return None
+
+        statement.parameters = self.parseFunctionParameters()
+
+        if statement.parameters is None:
+            return None
+
+        if not self.expectPeek(ARROW):
+            return None
+
+        if not self.expectPeek(TYPE):
+            return None
+
+        statement.returnType = self.currentLiteral()
+
+        if not self.expectPeek(LBRACE):
+            return None
+
+        statement.body = self.parseBlockStatement()
+
+        return statement
+
+    def parseFunctionParameters(self) -> list[FunctionParameter]:
+        parameters: list[FunctionParameter] = []
+
+        if self.kinds[self.index + 1] == RPAREN:
+            self.nextToken()
+            return parameters
+
+        while True:
+            if not self.expectPeek(IDENTIFIER):
+                return None
+
+            name: str = self.currentLiteral()
+
+            if not self.expectPeek(COLON):
+                return None
+
+            if not self.expectPeek(TYPE):
+                return None
+
+            parameters.append(FunctionParameter(value=name, valueType=self.currentLiteral()))
+
+            if self.kinds[self.index + 1] != DOT:
+                break
+
+            self.nextToken()
+
+        if not self.expectPeek(RPAREN):
+            return None
+
+        return parameters
+
+    def parseReturnStatement(self) -> ReturnStatement:
+        statement: Statement = ReturnStatement()
+
+        self.nextToken()
+
+        statement.returnValue = self.parseExpression(P_LOWEST)
+
+        if not self.expectPeek(DOT):
+            return None
+
+        return statement
+
+    def parseBlockStatement(self) -> BlockStatement:
+        blockStatement: BlockStatement = BlockStatement()
+
+        self.nextToken()
+
+        kinds: list[int] = self.kinds
+        while kinds[self.index] != RBRACE and kinds[self.index] != EOF:
+            statement: Statement = self.parseStatement()
+            if statement is not None:
+                blockStatement.statements.append(statement)
+
+            self.nextToken()
+
+        return blockStatement
+
+    def parseAssignmentStatement(self) -> AssignStatement:
+        statement: AssignStatement = AssignStatement()
+
+        statement.ident = IdentifierLiteral(value=self.currentLiteral())
+
+        self.nextToken() # skips IDENT
+        self.nextToken() # skips '='
+
+        statement.rightValue = self.parseExpression(P_LOWEST)
+
+        self.nextToken()
+
+        return statement
+    # endregion
+
+    # region expression helpers
+    def parseExpression(self, precedence: int) -> Expression:
+        # same explicit-stack Pratt loop as Parser.parseExpression
+        kinds: list[int] = self.kinds
+        frames: list[tuple[int, int, Expression, Any]] = []
+
+        while True:
+            if kinds[self.index] == LPAREN:
+                frames.append((GROUP_FRAME, precedence, None, None))
+                self.nextToken()
+                precedence = P_LOWEST
+                continue
+
+            prefixFunction: callable | None = self.prefixParseFns[kinds[self.index]]
+            if prefixFunction is None:
+                self.noPrefixParseFnError(kinds[self.index])
+                leftExpression: Expression = None
+                finished: bool = True
+            else:
+                leftExpression = prefixFunction()
+                finished = False
+
+            while True:
+                peekKind: int = kinds[self.index + 1]
+                if not finished and peekKind != DOT and precedence < PRECEDENCE_TABLE[peekKind]:
+                    # the peeked token is never EOF, so the index can move without the bounds check
+                    if peekKind == LPAREN:
+                        self.index += 1
+                        if kinds[self.index + 1] == RPAREN:
+                            self.index += 1
+                            leftExpression = self.parseCallExpression(leftExpression, [])
+                            continue
+
+                        frames.append((CALL_FRAME, precedence, leftExpression, []))
+                        self.nextToken()
+                        precedence = P_LOWEST
+                        break
+
+                    infixFunction: callable | None = self.infixParseFns[peekKind]
+                    if infixFunction is not None:
+                        self.index += 1
+                        frames.append((INFIX_FRAME, precedence, leftExpression, (infixFunction, OPERATOR_TABLE[peekKind])))
+                        precedence = PRECEDENCE_TABLE[peekKind]
+                        self.nextToken()
+                        break
+
+                if len(frames) == 0:
+                    return leftExpression
+
+                frameKind, precedence, leftNode, payload = frames.pop()
+                finished = False
+
+                if frameKind == INFIX_FRAME:
+                    infixFunction, operator = payload
+                    leftExpression = infixFunction(leftNode, operator, leftExpression)
+                elif frameKind == GROUP_FRAME:
+                    if not self.expectPeek(RPAREN):
+                        leftExpression = None
+                else:
+                    payload.append(leftExpression)
+
+                    if kinds[self.index + 1] == DOT:
+                        self.nextToken()
+                        self.nextToken()
+                        frames.append((CALL_FRAME, precedence, leftNode, payload))
+                        precedence = P_LOWEST
+                        break
+
+                    if self.expectPeek(RPAREN):
+                        leftExpression = self.parseCallExpression(leftNode, payload)
+                    else:
+                        leftExpression = None
+
+    def parseInfixExpression(self, leftNode: Expression, operator: str, rightNode: Expression) -> Expression:
+        return InfixExpression(leftNode=leftNode, operator=operator, rightNode=rightNode)
+
+    def parseCallExpression(self, function: Expression, arguments: list[Expression]) -> Expression:
+        return CallExpression(function=function, arguments=arguments)
+    # endregion
+
+    # region prefix helpers
+    def parseIntegerLiteral(self) -> Expression:
+        index: int = self.index
+        return IntegerLiteral(value=int(self.source[self.starts[index]:self.ends[index]]))
+
+    def parseDoubleLiteral(self) -> Expression:
+        return DoubleLiteral(value=self.buffer.literal(self.index))
+
+    def parseIdentifier(self) -> IdentifierLiteral:
+        return IdentifierLiteral(value=self.currentLiteral())
+    # endregion
\ No newline at end of file
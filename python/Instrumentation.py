@@ -0,0 +1,128 @@
+import contextlib
+import json
+import os
+import resource
+import statistics
+import time
+import tracemalloc
+
+class PhaseRecord:
+    __slots__ = ("wallTimes", "peaks")
+
+    def __init__(self) -> None:
+        # one entry per measured run that went through the phase
+        self.wallTimes: list[int] = []
+        self.peaks: list[int] = []
+
+class Instrumentation:
+    # wall time and peak traced memory per pipeline phase, and counters of what went through it, over repeated runs.
+    # phases don't nest: each one resets the tracemalloc peak, so an enclosing phase would lose its own
+    def __init__(self, enabled: bool = True, memory: bool = True) -> None:
+        self.enabled: bool = enabled
+
+        # tracing every allocation slows Python code down noticeably, the times are only comparable with the same setting
+        self.memory: bool = bool(enabled and memory)
+
+        self.phases: dict[str, PhaseRecord] = {}
+        self.counters: dict[str, int] = {}
+
+        self.runs: int = 0
+        self.warmupRuns: int = 0
+        self.warmup: bool = False
+
+        # the peak resident set of the process, which unlike tracemalloc includes what LLVM allocates
+        self.maxResident: int = 0
+
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    # region recording
+    def startRun(self, warmup: bool = False) -> None:
+        self.warmup = warmup
+        if not warmup:
+            # the counters describe one run, the last one wins
+            self.counters = {}
+
+    def endRun(self) -> None:
+        if self.warmup:
+            self.warmupRuns += 1
+        else:
+            self.runs += 1
+
+        # ru_maxrss is in KiB on Linux
+        self.maxResident = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        if not self.enabled:
+            yield
+            return
+
+        if self.memory:
+            tracemalloc.reset_peak()
+            baseline: int = tracemalloc.get_traced_memory()[0]
+
+        startTime: int = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            wallTime: int = time.perf_counter_ns() - startTime
+
+            if not self.warmup:
+                record: PhaseRecord = self.phases.setdefault(name, PhaseRecord())
+                record.wallTimes.append(wallTime)
+                if self.memory:
+                    record.peaks.append(max(0, tracemalloc.get_traced_memory()[1] - baseline))
+
+    def count(self, name: str, value: int) -> None:
+        if self.enabled and not self.warmup:
+            self.counters[name] = self.counters.get(name, 0) + value
+    # endregion
+
+    # region output
+    def json(self) -> dict:
+        phases: dict[str, dict] = {}
+        for name, record in self.phases.items():
+            phases[name] = {
+                "wall ns": record.wallTimes,
+                "min ns": min(record.wallTimes),
+                "median ns": int(statistics.median(record.wallTimes)),
+                "mean ns": int(statistics.mean(record.wallTimes)),
+                "peak bytes": max(record.peaks) if len(record.peaks) > 0 else None
+            }
+
+        return {
+            "runs": self.runs,
+            "warmup runs": self.warmupRuns,
+            "memory traced": self.memory,
+            "phases": phases,
+            "counters": self.counters,
+            "max resident bytes": self.maxResident
+        }
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.json(), f, indent=4)
+
+    def table(self) -> str:
+        medians: dict[str, float] = {name: statistics.median(record.wallTimes) for name, record in self.phases.items()}
+        total: float = sum(medians.values())
+
+        lines: list[str] = [f"=== PIPELINE PROFILE ({self.runs} runs after {self.warmupRuns} warmup, memory {'traced' if self.memory else 'not traced'}) ==="]
+        lines.append(f"{'phase':<24} {'runs':>5} {'min ms':>10} {'median ms':>10} {'mean ms':>10} {'share':>7} {'peak KiB':>10}")
+
+        for name, record in self.phases.items():
+            peak: str = f"{max(record.peaks) / 1024:.1f}" if len(record.peaks) > 0 else "-"
+            share: float = 100 * medians[name] / total if total > 0 else 0.0
+            lines.append(f"{name:<24} {len(record.wallTimes):>5} {min(record.wallTimes) / 1e6:>10.3f} {medians[name] / 1e6:>10.3f} "
+                         f"{statistics.mean(record.wallTimes) / 1e6:>10.3f} {share:>6.1f}% {peak:>10}")
+
+        lines.append(f"{'total':<24} {'':>5} {'':>10} {total / 1e6:>10.3f}")
+
+        for name, count in self.counters.items():
+            lines.append(f"{name}: {count}")
+        lines.append(f"max resident: {self.maxResident / (1 << 20):.1f} MiB")
+
+        return "\n".join(lines)
+    # endregion
\ No newline at end of file
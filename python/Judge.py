@@ -0,0 +1,313 @@
+import main
+from AST import Program, FunctionStatement
+from Backend import Backend
+import contextlib
+import ctypes
+import glob
+import io
+import json
+import math
+import os
+import resource
+import signal
+import struct
+import sys
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import llvmlite.binding as llvm
+
+# batch judging: every program of a manifest compiled once through main.py's pipeline, its tests run on a pool of worker processes,
+# one JSON line per run written to the report as soon as the run is judged. `python Judge.py [manifest] [report]`
+MANIFEST_PATH: str = "../tests/judge.json"
+REPORT_PATH: str = "../build/judge.jsonl"
+
+# worker processes, 0 for one per core
+JOBS: int = 0
+
+# per run, unless the manifest or a program says otherwise: CPU seconds and MiB the program may use
+TIME_LIMIT: float = 1.0
+MEMORY_LIMIT: int = 256
+
+# the wall clock limit is this many times the CPU one, a run waiting on nothing shouldn't need more
+WALL_FACTOR: float = 2.0
+
+# doubles are accepted within this relative or absolute error of the expected value
+DOUBLE_TOLERANCE: float = 1e-6
+
+# engines a worker keeps loaded, the oldest program goes first
+LOADED_PROGRAMS: int = 16
+
+C_TYPES: dict[str, type] = {
+    "int": ctypes.c_int,
+    "double": ctypes.c_double
+}
+
+RESULT_FORMATS: dict[str, str] = {
+    "int": "<qq",
+    "double": "<dq"
+}
+
+PAGE_SIZE: int = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+# region worker
+workerBackend: Backend | None = None
+workerEngines: dict[int, llvm.ExecutionEngine] = {}
+
+def initializeWorker(optLevel: str, hostCPU: bool) -> None:
+    # the objects were compiled for this target in the parent, the worker only links them
+    global workerBackend
+    workerBackend = Backend(optLevel=optLevel, hostCPU=hostCPU)
+
+def loadProgram(key: int, objects: list[bytes]) -> llvm.ExecutionEngine:
+    engine: llvm.ExecutionEngine | None = workerEngines.pop(key, None)
+    if engine is None:
+        engine = workerBackend.loadObjects(objects)
+        if len(workerEngines) >= LOADED_PROGRAMS:
+            del workerEngines[next(iter(workerEngines))]
+    workerEngines[key] = engine
+    return engine
+
+def memoryUsage() -> tuple[int, int]:
+    # (address space, resident) bytes of this process, zeros where /proc doesn't exist
+    try:
+        with open("/proc/self/statm", "r") as f:
+            size, resident = f.read().split()[:2]
+    except OSError:
+        return 0, 0
+    return int(size) * PAGE_SIZE, int(resident) * PAGE_SIZE
+
+def limitChild(timeLimit: float, memoryLimit: int, addressSpace: int) -> None:
+    # CPU time starts from zero in the child; past the soft limit the kernel sends SIGXCPU, a second later SIGKILL
+    seconds: int = math.ceil(timeLimit)
+    resource.setrlimit(resource.RLIMIT_CPU, (seconds, seconds + 1))
+
+    # the child starts with everything the worker mapped, the program gets its limit on top of that
+    if addressSpace > 0:
+        resource.setrlimit(resource.RLIMIT_AS, (addressSpace + memoryLimit, addressSpace + memoryLimit))
+
+    # CPL keeps everything on the stack, so deep recursion may use the whole limit
+    _, stackHard = resource.getrlimit(resource.RLIMIT_STACK)
+    resource.setrlimit(resource.RLIMIT_STACK, (memoryLimit if stackHard == resource.RLIM_INFINITY else min(memoryLimit, stackHard), stackHard))
+
+    # the rlimit only counts whole seconds: the profiling timer ends the run at the limit itself, the real one on the wall clock.
+    # the default action of SIGPROF and SIGALRM ends the process, which is all a timeout needs
+    signal.setitimer(signal.ITIMER_PROF, timeLimit)
+    signal.setitimer(signal.ITIMER_REAL, timeLimit * WALL_FACTOR)
+
+def runTest(task: tuple) -> dict:
+    key, objects, entry, signature, arguments, timeLimit, memoryLimit = task
+    returnType, parameterTypes = signature
+
+    engine: llvm.ExecutionEngine = loadProgram(key, objects)
+    address: int = engine.get_function_address(entry)
+    if address == 0:
+        return {"verdict": "IE", "message": f"{entry} isn't in the compiled program"}
+
+    function = ctypes.CFUNCTYPE(C_TYPES[returnType], *(C_TYPES[Type] for Type in parameterTypes))(address)
+    values: list[int | float] = [int(argument) if Type == "int" else float(argument) for argument, Type in zip(arguments, parameterTypes)]
+
+    addressSpace, baseline = memoryUsage()
+    readEnd, writeEnd = os.pipe()
+
+    # every run gets a fresh process, so limits, crashes and peak memory belong to that run alone and the worker survives them
+    pid: int = os.fork()
+    if pid == 0:
+        status: int = 1
+        try:
+            os.close(readEnd)
+            limitChild(timeLimit, memoryLimit, addressSpace)
+
+            startTime: int = time.perf_counter_ns()
+            result: int | float = function(*values)
+            elapsed: int = time.perf_counter_ns() - startTime
+
+            os.write(writeEnd, struct.pack(RESULT_FORMATS[returnType], result, elapsed))
+            status = 0
+        finally:
+            os._exit(status)
+
+    os.close(writeEnd)
+    _, waitStatus, usage = os.wait4(pid, 0)
+    with os.fdopen(readEnd, "rb") as f:
+        data: bytes = f.read()
+
+    run: dict = {
+        "cpuTime": round((usage.ru_utime + usage.ru_stime) * 1000, 3),
+        # ru_maxrss is KiB on Linux, and includes the pages the child shared with the worker
+        "peakRSS": usage.ru_maxrss,
+        "memory": max(0, usage.ru_maxrss - baseline // 1024)
+    }
+
+    if len(data) == struct.calcsize(RESULT_FORMATS[returnType]):
+        result, elapsed = struct.unpack(RESULT_FORMATS[returnType], data)
+        run["returned"] = result
+        run["time"] = round(elapsed / 1e6, 6)
+    if os.WIFSIGNALED(waitStatus):
+        run["signal"] = signal.Signals(os.WTERMSIG(waitStatus)).name
+    return run
+# endregion
+
+# region verdicts
+def matches(returned: int | float, expected: int | float, returnType: str) -> bool:
+    if returnType == "double":
+        return math.isclose(returned, expected, rel_tol=DOUBLE_TOLERANCE, abs_tol=DOUBLE_TOLERANCE)
+    return returned == expected
+
+def verdict(run: dict, test: dict, returnType: str, timeLimit: float, memoryLimit: int) -> str:
+    killed: str | None = run.get("signal")
+    if killed in ("SIGXCPU", "SIGPROF", "SIGALRM") or run["cpuTime"] > timeLimit * 1000:
+        return "TLE"
+    # CPL has no pointers, the only thing that faults is a stack growing into the limits
+    if run["memory"] * 1024 > memoryLimit or killed in ("SIGSEGV", "SIGBUS"):
+        return "MLE"
+    if killed is not None or "returned" not in run:
+        return "RE"
+    if "expected" not in test:
+        return "OK"
+    return "AC" if matches(run["returned"], test["expected"], returnType) else "WA"
+# endregion
+
+# region manifest
+def loadTests(specification: list[dict] | str, directory: str) -> list[dict]:
+    # inline test objects, or a glob of JSON files holding one test each, named after the file
+    if isinstance(specification, list):
+        tests: list[dict] = [dict(test) for test in specification]
+    else:
+        tests: list[dict] = []
+        for path in sorted(glob.glob(os.path.join(directory, specification))):
+            with open(path, "r") as f:
+                tests.append({"id": os.path.splitext(os.path.basename(path))[0], **json.load(f)})
+
+    for index, test in enumerate(tests):
+        test.setdefault("id", str(index + 1))
+        test.setdefault("entry", "mn")
+        test.setdefault("arguments", [])
+    return tests
+
+def loadManifest(path: str) -> list[dict]:
+    # programs with their tests and limits; paths are relative to the manifest, limits are seconds and MiB
+    with open(path, "r") as f:
+        manifest: dict = json.load(f)
+
+    directory: str = os.path.dirname(os.path.abspath(path))
+    programs: list[dict] = []
+    for index, program in enumerate(manifest["programs"]):
+        programs.append({
+            "id": program.get("id", os.path.splitext(os.path.basename(program["source"]))[0]),
+            "source": os.path.join(directory, program["source"]),
+            "tests": loadTests(program.get("tests", [{}]), directory),
+            "timeLimit": program.get("timeLimit", manifest.get("timeLimit", TIME_LIMIT)),
+            "memoryLimit": int(program.get("memoryLimit", manifest.get("memoryLimit", MEMORY_LIMIT))) << 20
+        })
+    return programs
+# endregion
+
+def signatures(program: Program) -> dict[str, tuple[str, list[str]]]:
+    return {statement.name.value: (statement.returnType, [parameter.valueType for parameter in statement.parameters])
+            for statement in program.statements if statement.__class__ is FunctionStatement}
+
+def compileSubmission(path: str, backend: Backend) -> tuple[list[bytes] | None, dict[str, tuple[str, list[str]]], str]:
+    # (objects, function signatures, compiler output); main reports parse, resolution and code generation errors by printing them
+    # and exiting, which makes them a CE here
+    main.SOURCE_PATH = path
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        try:
+            program: Program = main.parseSource()
+            functions: dict[str, tuple[str, list[str]]] = signatures(program)
+            main.optimizeProgram(program)
+            moduleRef: llvm.ModuleRef = main.compileProgram(program, backend)
+        except SystemExit:
+            return None, {}, output.getvalue().strip()
+        except Exception as exc:
+            return None, {}, output.getvalue().strip() or str(exc)
+
+    return [backend.emitObject(moduleRef)], functions, ""
+
+class Judge:
+    def __init__(self, reportPath: str, jobs: int | None = None) -> None:
+        self.backend: Backend = Backend(optLevel=main.OPT_LEVEL, hostCPU=main.HOST_CPU)
+        self.jobs: int = jobs if jobs is not None else os.cpu_count() or 1
+        self.executor: ProcessPoolExecutor = ProcessPoolExecutor(max_workers=self.jobs, initializer=initializeWorker, initargs=(main.OPT_LEVEL, main.HOST_CPU))
+
+        os.makedirs(os.path.dirname(os.path.abspath(reportPath)), exist_ok=True)
+        self.report: io.TextIOWrapper = open(reportPath, "w")
+
+        # future -> the program and test it runs
+        self.pending: dict[Future, tuple[dict, dict, str]] = {}
+        self.verdicts: dict[str, int] = {}
+
+    def write(self, line: dict) -> None:
+        self.report.write(json.dumps(line) + "\n")
+        self.report.flush()
+        self.verdicts[line["verdict"]] = self.verdicts.get(line["verdict"], 0) + 1
+
+    def judge(self, programs: list[dict]) -> None:
+        # programs compile here one after another while the workers already run the tests of the ones before
+        for key, program in enumerate(programs):
+            startTime: int = time.perf_counter_ns()
+            objects, functions, message = compileSubmission(program["source"], self.backend)
+            compileTime: float = round((time.perf_counter_ns() - startTime) / 1e6, 3)
+
+            for test in program["tests"]:
+                line: dict = {"program": program["id"], "test": test["id"]}
+                signature: tuple[str, list[str]] | None = functions.get(test["entry"])
+                if objects is None:
+                    self.write({**line, "verdict": "CE", "message": message, "compileTime": compileTime})
+                elif signature is None or len(signature[1]) != len(test["arguments"]):
+                    self.write({**line, "verdict": "IE", "message": f"{test['entry']} isn't a function of {len(test['arguments'])} parameters"})
+                else:
+                    task: tuple = (key, objects, test["entry"], signature, test["arguments"], program["timeLimit"], program["memoryLimit"])
+                    self.pending[self.executor.submit(runTest, task)] = (program, test, signature[0])
+
+            self.collect(block=False)
+
+        while len(self.pending) > 0:
+            self.collect(block=True)
+
+    def collect(self, block: bool) -> None:
+        done, _ = wait(list(self.pending), timeout=None if block else 0, return_when=FIRST_COMPLETED)
+        for future in done:
+            program, test, returnType = self.pending.pop(future)
+            line: dict = {"program": program["id"], "test": test["id"]}
+            try:
+                run: dict = future.result()
+            except Exception as exc:
+                self.write({**line, "verdict": "IE", "message": str(exc)})
+                continue
+
+            if "verdict" in run:
+                self.write({**line, **run})
+                continue
+
+            line["verdict"] = verdict(run, test, returnType, program["timeLimit"], program["memoryLimit"])
+            if "expected" in test:
+                line["expected"] = test["expected"]
+            self.write({**line, **run})
+
+    def close(self) -> None:
+        self.executor.shutdown()
+        self.report.close()
+
+    def __enter__(self) -> "Judge":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+if __name__ == '__main__':
+    manifestPath: str = sys.argv[1] if len(sys.argv) > 1 else MANIFEST_PATH
+    reportPath: str = sys.argv[2] if len(sys.argv) > 2 else REPORT_PATH
+
+    programs: list[dict] = loadManifest(manifestPath)
+
+    startTime: int = time.perf_counter_ns()
+    with Judge(reportPath, jobs=JOBS or None) as judge:
+        judge.judge(programs)
+    elapsed: float = (time.perf_counter_ns() - startTime) / 1e9
+
+    runs: int = sum(judge.verdicts.values())
+    print(f"=== JUDGE ({len(programs)} programs, {runs} runs in {elapsed:.2f} s) ===")
+    for name, count in sorted(judge.verdicts.items()):
+        print(f"{name:<4} {count}")
+    print(f"Report written to {reportPath}")
\ No newline at end of file
@@ -0,0 +1,233 @@
+import main
+from AST import Program, FunctionStatement
+from Backend import Backend
+import ctypes
+import glob
+import json
+import math
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+
+import llvmlite.binding as llvm
+
+# how fast the code CPL generates is, next to the same kernel in C: each kernel in KERNEL_DIRECTORY is a .cpl file defining
+# kernel(x) -> int or double, and a .c file defining the same function
+OPT_LEVELS: list[str] = ["O1", "O2", "O3"]
+
+KERNEL_DIRECTORY: str = "../benchmarks/kernels"
+RESULTS_PATH: str = "../build/kernel-benchmark.json"
+
+# the C reference is built once, the way a judge builds C; CPL ints wrap, so C's have to as well
+C_FLAGS: list[str] = ["-O2", "-fwrapv"]
+
+# kernel calls per timed repetition, and repetitions after the warmup ones
+CALLS: int = 100_000
+REPETITIONS: int = 10
+WARMUP: int = 2
+
+# CPL has no loops, so both sides are timed through the same driver: a loop over kernel(0) .. kernel(n - 1) that sums the results,
+# in its own module or translation unit so it can't inline the kernel
+C_TYPES: dict[str, tuple[str, type]] = {
+    "int": ("int", ctypes.c_longlong),
+    "double": ("double", ctypes.c_double)
+}
+
+C_DRIVER: str = """{Type} kernel({Type} x);
+
+{Sum} bench(int n) {{
+    {Sum} sum = 0;
+    for (int i = 0; i < n; i++)
+        sum += kernel(({Type})i);
+    return sum;
+}}"""
+
+IR_DRIVERS: dict[str, str] = {
+    "int": """declare i32 @"kernel"(i32)
+
+define i64 @"bench"(i32 %"n")
+{
+entry:
+  %"empty" = icmp sle i32 %"n", 0
+  br i1 %"empty", label %"done", label %"loop"
+loop:
+  %"i" = phi i32 [0, %"entry"], [%"next", %"loop"]
+  %"sum" = phi i64 [0, %"entry"], [%"added", %"loop"]
+  %"value" = call i32 @"kernel"(i32 %"i")
+  %"wide" = sext i32 %"value" to i64
+  %"added" = add i64 %"sum", %"wide"
+  %"next" = add i32 %"i", 1
+  %"more" = icmp slt i32 %"next", %"n"
+  br i1 %"more", label %"loop", label %"done"
+done:
+  %"result" = phi i64 [0, %"entry"], [%"added", %"loop"]
+  ret i64 %"result"
+}""",
+    "double": """declare double @"kernel"(double)
+
+define double @"bench"(i32 %"n")
+{
+entry:
+  %"empty" = icmp sle i32 %"n", 0
+  br i1 %"empty", label %"done", label %"loop"
+loop:
+  %"i" = phi i32 [0, %"entry"], [%"next", %"loop"]
+  %"sum" = phi double [0.0, %"entry"], [%"added", %"loop"]
+  %"argument" = sitofp i32 %"i" to double
+  %"value" = call double @"kernel"(double %"argument")
+  %"added" = fadd double %"sum", %"value"
+  %"next" = add i32 %"i", 1
+  %"more" = icmp slt i32 %"next", %"n"
+  br i1 %"more", label %"loop", label %"done"
+done:
+  %"result" = phi double [0.0, %"entry"], [%"added", %"loop"]
+  ret double %"result"
+}"""
+}
+
+# two-sided 95% Student t quantiles by degrees of freedom, the normal one past the table
+T_QUANTILES: dict[int, float] = {
+    1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306, 9: 2.262, 10: 2.228,
+    12: 2.179, 15: 2.131, 20: 2.086, 25: 2.060, 30: 2.042
+}
+
+class Timing:
+    __slots__ = ("mean", "interval", "result")
+
+    def __init__(self, samples: list[float], result: float) -> None:
+        # nanoseconds per kernel call, and the half width of its 95% confidence interval
+        self.mean: float = statistics.mean(samples)
+        self.interval: float = confidenceInterval(samples)
+
+        # what the driver summed up, both sides have to agree on it
+        self.result: float = result
+
+def confidenceInterval(samples: list[float]) -> float:
+    if len(samples) < 2:
+        return math.inf
+
+    degrees: int = len(samples) - 1
+    quantile: float = next((T_QUANTILES[key] for key in sorted(T_QUANTILES) if key >= degrees), 1.96)
+    return quantile * statistics.stdev(samples) / math.sqrt(len(samples))
+
+def timeDriver(bench: callable) -> Timing:
+    samples: list[float] = []
+    for repetition in range(WARMUP + REPETITIONS):
+        startTime: int = time.perf_counter_ns()
+        result: float = bench(CALLS)
+        elapsed: int = time.perf_counter_ns() - startTime
+        if repetition >= WARMUP:
+            samples.append(elapsed / CALLS)
+    return Timing(samples, result)
+
+def kernelType(program: Program) -> str:
+    for statement in program.statements:
+        if statement.__class__ is FunctionStatement and statement.name.value == "kernel":
+            if len(statement.parameters) != 1 or statement.parameters[0].valueType != statement.returnType:
+                raise ValueError("kernel has to take one parameter of its return type")
+            return statement.returnType
+    raise ValueError("no kernel function")
+
+# region CPL
+def compileKernel(path: str, backend: Backend) -> tuple[llvm.ExecutionEngine, str]:
+    # the same frontend, AST optimizer, code generator and LLVM pipeline main.py runs on SOURCE_PATH
+    main.SOURCE_PATH = path
+    program: Program = main.parseSource()
+    Type: str = kernelType(program)
+    main.optimizeProgram(program)
+
+    moduleRef: llvm.ModuleRef = main.compileProgram(program, backend)
+    engine: llvm.ExecutionEngine = backend.loadObjects([backend.emitObject(moduleRef)])
+
+    driver: llvm.ModuleRef = backend.parseAssembly(IR_DRIVERS[Type])
+    backend.optimize(driver)
+    engine.add_module(driver)
+    engine.finalize_object()
+    return engine, Type
+
+def timeKernel(path: str, optLevel: str) -> Timing:
+    backend: Backend = Backend(optLevel=optLevel, hostCPU=main.HOST_CPU)
+    engine, Type = compileKernel(path, backend)
+
+    # the engine owns the code, it stays referenced until the timing is done
+    bench: callable = ctypes.CFUNCTYPE(C_TYPES[Type][1], ctypes.c_int)(engine.get_function_address("bench"))
+    timing: Timing = timeDriver(bench)
+    del engine
+    return timing
+# endregion
+
+# region C
+def timeReference(path: str, Type: str, directory: str) -> Timing:
+    compiler: str = Backend().toolchain()
+    cType, resultType = C_TYPES[Type]
+
+    driverPath: str = os.path.join(directory, "driver.c")
+    with open(driverPath, "w") as f:
+        f.write(C_DRIVER.format(Type=cType, Sum="long long" if Type == "int" else "double"))
+
+    # the same CPU as the JIT when that targets the host
+    libraryPath: str = os.path.join(directory, os.path.splitext(os.path.basename(path))[0] + ".so")
+    flags: list[str] = [*C_FLAGS, "-march=native"] if main.HOST_CPU else C_FLAGS
+    subprocess.run([compiler, *flags, "-shared", "-fPIC", "-o", libraryPath, path, driverPath], check=True)
+
+    library: ctypes.CDLL = ctypes.CDLL(libraryPath)
+    library.bench.restype = resultType
+    library.bench.argtypes = [ctypes.c_int]
+    return timeDriver(library.bench)
+# endregion
+
+def agree(left: float, right: float) -> bool:
+    return left == right or math.isclose(left, right, rel_tol=1e-9)
+
+def table(results: dict) -> str:
+    lines: list[str] = [f"=== GENERATED CODE ({CALLS} calls x {REPETITIONS} repetitions, ns per call with 95% CI, C at {' '.join(C_FLAGS)}) ==="]
+    lines.append(f"{'kernel':<10} {'C':>16} " + " ".join(f"{'CPL ' + level:>16} {'ratio':>6}" for level in OPT_LEVELS))
+
+    for name, result in results.items():
+        reference: dict = result["C"]
+        cells: list[str] = [f"{name:<10} {reference['ns']:>8.2f} ±{reference['ci']:>6.2f}"]
+        for level in OPT_LEVELS:
+            timing: dict = result[level]
+            mark: str = "" if timing["agrees"] else "!"
+            cells.append(f"{timing['ns']:>8.2f} ±{timing['ci']:>6.2f} {timing['ns'] / reference['ns']:>5.2f}{mark}")
+        lines.append(" ".join(cells))
+
+    lines.append("ratio is CPL / C time per call; ! marks a result that differs from C's")
+    return "\n".join(lines)
+
+if __name__ == '__main__':
+    kernels: list[str] = sorted(glob.glob(os.path.join(KERNEL_DIRECTORY, "*.cpl")))
+
+    results: dict[str, dict] = {}
+    wrong: list[str] = []
+    with tempfile.TemporaryDirectory() as directory:
+        for path in kernels:
+            name: str = os.path.splitext(os.path.basename(path))[0]
+
+            # the kernel's type comes from the CPL side, the C side has to match it
+            main.SOURCE_PATH = path
+            Type: str = kernelType(main.parseSource())
+            reference: Timing = timeReference(os.path.splitext(path)[0] + ".c", Type, directory)
+            results[name] = {"type": Type, "C": {"ns": reference.mean, "ci": reference.interval, "result": reference.result}}
+
+            for level in OPT_LEVELS:
+                timing: Timing = timeKernel(path, level)
+                agrees: bool = agree(timing.result, reference.result)
+                results[name][level] = {"ns": timing.mean, "ci": timing.interval, "result": timing.result, "agrees": agrees}
+                if not agrees:
+                    wrong.append(f"{name} at {level}: CPL summed to {timing.result}, C to {reference.result}")
+
+            print(f"{name}: done", flush=True)
+
+    print(table(results))
+    for line in wrong:
+        print(line)
+
+    os.makedirs(os.path.dirname(os.path.abspath(RESULTS_PATH)), exist_ok=True)
+    with open(RESULTS_PATH, "w") as f:
+        json.dump({"calls": CALLS, "repetitions": REPETITIONS, "C flags": C_FLAGS, "kernels": results}, f, indent=4)
+    print(f"Results written to {RESULTS_PATH}")
+
+    exit(1 if len(wrong) > 0 else 0)
\ No newline at end of file
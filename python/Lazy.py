@@ -0,0 +1,223 @@
+import time
+from ctypes import CFUNCTYPE, c_int, c_double, c_void_p, cast
+
+import llvmlite.binding as llvm
+
+from AST import Program, FunctionStatement
+from Backend import Backend
+from HashCons import HashConser
+from Incremental import splittable, unitExternals
+from PerfMap import PerfMap
+from Resolver import Resolver, Symbol
+from TextCompiler import quoteName
+
+IR_TYPES: dict[str, str] = {
+    "int": "i32",
+    "double": "double"
+}
+
+C_TYPES: dict[str, type] = {
+    "int": c_int,
+    "double": c_double
+}
+
+class LazyJITError(Exception):
+    pass
+
+class LazyFunction:
+    # a top-level function: its IR is generated up front, LLVM only sees it on the first call
+    __slots__ = ("name", "ir", "returnType", "parameterTypes", "callees", "functionType", "stub", "implementation", "compileTime", "order")
+
+    def __init__(self, name: str, ir: str, returnType: str, parameterTypes: list[str], callees: list[str]) -> None:
+        self.name: str = name
+        self.ir: str = ir
+
+        self.returnType: str = returnType
+        self.parameterTypes: list[str] = parameterTypes
+        self.functionType: type = CFUNCTYPE(C_TYPES[returnType], *(C_TYPES[Type] for Type in parameterTypes))
+
+        # top-level functions this one calls, their trampolines have to exist before it is linked
+        self.callees: list[str] = callees
+
+        # the Python callback the slot points at until the first call, kept alive here; None until the trampoline exists
+        self.stub: object | None = None
+
+        self.implementation: object | None = None
+        self.compileTime: float = 0.0
+
+        # position in the order functions were first called, -1 while never called
+        self.order: int = -1
+
+class LazyJIT:
+    # every function is reached through a trampoline that jumps via a slot; slots start at a stub that compiles on demand.
+    # trampolines themselves are only made for functions that something can call
+    def __init__(self, backend: Backend, createCompiler: callable, perfMap: PerfMap | None = None) -> None:
+        self.backend: Backend = backend
+        self.createCompiler: callable = createCompiler
+
+        # code compiled on demand is added to the perf map as it appears; the objects MCJIT made since the last finalize
+        self.perfMap: PerfMap | None = perfMap
+        self.newObjects: list[bytes] = []
+
+        self.functions: dict[str, LazyFunction] = {}
+        self.engine: llvm.ExecutionEngine | None = None
+
+        self.errors: list[str] = []
+
+        # a function that fails to compile under a native caller can't raise through the C frames, the error waits here
+        self.pendingError: Exception | None = None
+
+        self.startupTime: float = 0.0
+        self.compiledCount: int = 0
+
+    def load(self, program: Program, hashCons: bool = False) -> bool:
+        # takes the optimized program; False when it can't be split into functions or has errors
+        if not splittable(program):
+            return False
+
+        startTime: float = time.perf_counter()
+
+        if program.symbols is None:
+            resolver: Resolver = Resolver()
+            resolver.resolve(program)
+            if len(resolver.errors) > 0:
+                self.errors.extend(resolver.errors)
+                return False
+
+        if hashCons:
+            HashConser().internProgram(program)
+
+        # generating IR is cheap next to LLVM, doing it now reports every compile error before anything runs
+        definitions: dict[Symbol, FunctionStatement] = {statement.name.symbol: statement for statement in program.statements}
+        for statement in program.statements:
+            externals: list[FunctionStatement] = unitExternals(statement, definitions)
+
+            compiler = self.createCompiler()
+            compiler.compileUnit(statement, program.symbols, externals)
+            if len(compiler.errors) > 0:
+                self.errors.extend(compiler.errors)
+                continue
+
+            parameterTypes: list[str] = [parameter.valueType for parameter in statement.parameters]
+            callees: list[str] = [external.name.value for external in externals]
+            self.functions[statement.name.value] = LazyFunction(statement.name.value, str(compiler.module), statement.returnType, parameterTypes, callees)
+
+        if len(self.errors) > 0:
+            return False
+
+        self.startupTime = time.perf_counter() - startTime
+        return True
+
+    def linkTrampolines(self, names: list[str]) -> None:
+        # a slot and a forwarding function for each function that has none yet, all in one small module
+        functions: list[LazyFunction] = [self.functions[name] for name in names if self.functions[name].stub is None]
+        if len(functions) == 0:
+            return
+
+        self.startEngine()
+
+        lines: list[str] = []
+        for function in functions:
+            returnType: str = IR_TYPES[function.returnType]
+            parameterTypes: list[str] = [IR_TYPES[Type] for Type in function.parameterTypes]
+            pointerType: str = f"{returnType} ({', '.join(parameterTypes)})*"
+
+            slot: str = quoteName(function.name + ".slot")
+            arguments: list[str] = [f'{Type} %".{index}"' for index, Type in enumerate(parameterTypes)]
+
+            lines.append(f"@{slot} = global {pointerType} null")
+            lines.append(f"define {returnType} @{quoteName(function.name)}({', '.join(arguments)})")
+            lines.append("{")
+            lines.append("entry:")
+            lines.append(f'  %"target" = load {pointerType}, {pointerType}* @{slot}')
+            lines.append(f'  %"result" = tail call {returnType} %"target"({", ".join(arguments)})')
+            lines.append(f'  ret {returnType} %"result"')
+            lines.append("}")
+
+        self.engine.add_module(self.backend.parseAssembly("\n".join(lines)))
+        self.finalize()
+
+        for function in functions:
+            function.stub = function.functionType(self.stubFor(function))
+            self.setSlot(function, cast(function.stub, c_void_p).value)
+
+    def startEngine(self) -> None:
+        # the engine starts out empty when the first code needs it, a run that never gets here never pays for it
+        if self.engine is None:
+            self.engine = self.backend.jit(self.backend.parseAssembly(""))
+            if self.perfMap is not None:
+                self.engine.set_object_cache(lambda moduleRef, objectCode: self.newObjects.append(objectCode))
+
+    def finalize(self) -> None:
+        self.engine.finalize_object()
+
+        if self.perfMap is not None and len(self.newObjects) > 0:
+            for objectCode in self.newObjects:
+                self.perfMap.addObject(objectCode, self.engine)
+            self.newObjects = []
+            self.perfMap.write()
+
+    def setSlot(self, function: LazyFunction, address: int) -> None:
+        c_void_p.from_address(self.engine.get_global_value_address(function.name + ".slot")).value = address
+
+    def stubFor(self, function: LazyFunction) -> callable:
+        def stub(*arguments):
+            # only the first call lands here, later ones go straight through the patched slot
+            if self.pendingError is not None:
+                return 0
+            try:
+                return self.materialize(function)(*arguments)
+            except LazyJITError as error:
+                self.pendingError = error
+                return 0
+        return stub
+
+    def materialize(self, function: LazyFunction) -> object:
+        if function.implementation is not None:
+            return function.implementation
+
+        startTime: float = time.perf_counter()
+
+        # its own trampoline too, the function may be compiled before anything called it through one
+        self.startEngine()
+        self.linkTrampolines([function.name, *function.callees])
+
+        try:
+            moduleRef: llvm.ModuleRef = self.backend.parseAssembly(function.ir)
+        except RuntimeError as error:
+            raise LazyJITError(f"~~~ COMPILE ERROR: Function {function.name} failed to compile: {error}")
+        self.backend.optimize(moduleRef)
+
+        # the trampoline owns the name, calls from other functions keep going through it
+        moduleRef.get_function(function.name).name = function.name + ".impl"
+
+        self.engine.add_module(moduleRef)
+        self.finalize()
+
+        address: int = self.engine.get_function_address(function.name + ".impl")
+        self.setSlot(function, address)
+
+        function.implementation = function.functionType(address)
+        function.compileTime = time.perf_counter() - startTime
+        function.order = self.compiledCount
+        self.compiledCount += 1
+        return function.implementation
+
+    def address(self, name: str) -> int:
+        self.linkTrampolines([name])
+        return self.engine.get_function_address(name)
+
+    def run(self, name: str, arguments: tuple = ()) -> int | float:
+        result: int | float = self.functions[name].functionType(self.address(name))(*arguments)
+        if self.pendingError is not None:
+            raise self.pendingError
+        return result
+
+    def report(self) -> str:
+        lines: list[str] = [f"=== LAZY JIT ({self.compiledCount} of {len(self.functions)} functions compiled, startup {round(self.startupTime * 1000, 3)} ms) ==="]
+        for function in self.functions.values():
+            if function.implementation is not None:
+                lines.append(f"{function.name}: compiled #{function.order + 1}, in {round(function.compileTime * 1000, 3)} ms")
+            else:
+                lines.append(f"{function.name}: never called")
+        return "\n".join(lines)
\ No newline at end of file
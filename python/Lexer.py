@@ -1,125 +1,314 @@
-from Token import Token, TokenType, lookupIdentifier
-from typing import Any
+import io
+import os
+import re
+import mmap
+from array import array
+from collections import deque
+from Token import Token, TokenType, TOKEN_KINDS, KIND_OF, IDENTIFIER_KINDS
+from typing import Any, BinaryIO, Iterator
 
-class Lexer:
+# exactly one token per match; whitespace is the only thing finditer skips over
+TOKEN_PATTERN: re.Pattern = re.compile(r"""
+    (?P<identifier>[A-Za-z_]\w*)
+  | (?P<number>[0-9]+(?:,[0-9]*)?)
+  | (?P<arrow>->)
+  | (?P<symbol>[-+*/^%.(){}=:])
+  | (?P<illegal>[^ \t\n\r])
+""", re.VERBOSE)
+
+# byte-level twin of TOKEN_PATTERN; non-ASCII bytes continue identifiers and whole UTF-8 sequences are illegal
+STREAM_TOKEN_PATTERN: re.Pattern = re.compile(rb"""
+    (?P<identifier>[A-Za-z_][A-Za-z0-9_\x80-\xff]*)
+  | (?P<number>[0-9]+(?:,[0-9]*)?)
+  | (?P<arrow>->)
+  | (?P<symbol>[-+*/^%.(){}=:])
+  | (?P<illegal>[\xc0-\xff][\x80-\xbf]*|[^ \t\n\r])
+""", re.VERBOSE)
+
+IDENTIFIER_GROUP: int = TOKEN_PATTERN.groupindex["identifier"]
+NUMBER_GROUP: int = TOKEN_PATTERN.groupindex["number"]
+ARROW_GROUP: int = TOKEN_PATTERN.groupindex["arrow"]
+SYMBOL_GROUP: int = TOKEN_PATTERN.groupindex["symbol"]
+
+SYMBOL_KINDS: dict[str, int] = {
+    '+': KIND_OF[TokenType.PLUS],
+    '-': KIND_OF[TokenType.MINUS],
+    '*': KIND_OF[TokenType.MULTIPLY],
+    '/': KIND_OF[TokenType.DIVIDE],
+    '^': KIND_OF[TokenType.POWER],
+    '%': KIND_OF[TokenType.MODULUS],
+    '.': KIND_OF[TokenType.DOT],
+    '(': KIND_OF[TokenType.LPAREN],
+    ')': KIND_OF[TokenType.RPAREN],
+    '{': KIND_OF[TokenType.LBRACE],
+    '}': KIND_OF[TokenType.RBRACE],
+    '=': KIND_OF[TokenType.EQUALS],
+    ':': KIND_OF[TokenType.COLON]
+}
+
+EOF_KIND: int = KIND_OF[TokenType.EOF]
+ILLEGAL_KIND: int = KIND_OF[TokenType.ILLEGAL]
+INT_KIND: int = KIND_OF[TokenType.INT]
+DOUBLE_KIND: int = KIND_OF[TokenType.DOUBLE]
+IDENTIFIER_KIND: int = KIND_OF[TokenType.IDENTIFIER]
+ARROW_KIND: int = KIND_OF[TokenType.ARROW]
+
+class TokenBuffer:
     def __init__(self, source: str) -> None:
         self.source = source
 
-        self.position: int = -1
-        self.readPosition: int = 0
-        self.lineNumber: int = 1
+        # struct of arrays, one entry per token; literals are spans into the source
+        self.kinds: array = array('B')
+        self.starts: array = array('I')
+        self.ends: array = array('I')
+        self.lineNumbers: array = array('I')
+        self.positions: array = array('I')
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def text(self, index: int) -> str:
+        return self.source[self.starts[index]:self.ends[index]]
+
+    def literal(self, index: int) -> Any:
+        kind: int = self.kinds[index]
+        text: str = self.source[self.starts[index]:self.ends[index]]
+
+        if kind == INT_KIND:
+            return int(text)
+        if kind == DOUBLE_KIND:
+            return float(text.replace(',', '.'))
+        return text
+
+    def token(self, index: int) -> Token:
+        return Token(type=TOKEN_KINDS[self.kinds[index]], literal=self.literal(index), lineNumber=self.lineNumbers[index], position=self.positions[index])
+
+class Lexer:
+    def __init__(self, source: str, offset: int = 0, lineNumber: int = 1) -> None:
+        self.source = source
+
+        # where source starts in a larger file, so positions and line numbers refer to that file
+        self.offset: int = offset
+        self.firstLine: int = lineNumber
+
+        self.buffer: TokenBuffer = self.tokenize()
+        self.index: int = 0
+
+    def tokenize(self) -> TokenBuffer:
+        source: str = self.source
+        buffer: TokenBuffer = TokenBuffer(source)
+
+        addKind = buffer.kinds.append
+        addStart = buffer.starts.append
+        addEnd = buffer.ends.append
+        addLineNumber = buffer.lineNumbers.append
+        addPosition = buffer.positions.append
+
+        lineNumber: int = self.firstLine
+        offset: int = self.offset
+        length: int = len(source)
+        nextNewline: int = source.find('\n')
+
+        for match in TOKEN_PATTERN.finditer(source):
+            group: int = match.lastindex
+            start, end = match.span()
+
+            if 0 <= nextNewline < start:
+                lineNumber += source.count('\n', nextNewline, start)
+                nextNewline = source.find('\n', start)
+
+            # positions follow the character lexer: identifiers and numbers report the index after them
+            if group == SYMBOL_GROUP:
+                kind: int = SYMBOL_KINDS[source[start]]
+                position: int = start
+            elif group == IDENTIFIER_GROUP:
+                kind = IDENTIFIER_KINDS.get(source[start:end], IDENTIFIER_KIND)
+                position = end
+            elif group == NUMBER_GROUP:
+                position = end
+                if end < length and source[end] == ',':
+                    print(f"Error: Invalid number format at line {lineNumber}, position {offset + position}")
+                    kind = ILLEGAL_KIND
+                elif source.find(',', start, end) != -1:
+                    kind = DOUBLE_KIND
+                else:
+                    kind = INT_KIND
+            elif group == ARROW_GROUP:
+                kind = ARROW_KIND
+                position = start + 1
+            else:
+                kind = ILLEGAL_KIND
+                position = start
+
+            addKind(kind)
+            addStart(start)
+            addEnd(end)
+            addLineNumber(lineNumber)
+            addPosition(offset + position)
+
+        if nextNewline >= 0:
+            lineNumber += source.count('\n', nextNewline)
+
+        addKind(EOF_KIND)
+        addStart(length)
+        addEnd(length)
+        addLineNumber(lineNumber)
+        addPosition(offset + length)
+
+        return buffer
+
+    def nextToken(self) -> Token:
+        token: Token = self.buffer.token(self.index)
+
+        # EOF is repeated once the buffer is exhausted
+        if self.index < len(self.buffer) - 1:
+            self.index += 1
+
+        return token
+
+class StreamLexer:
+    def __init__(self, source: str | os.PathLike | BinaryIO, lookahead: int = 2, chunkSize: int = 1 << 16) -> None:
+        self.ownsStream: bool = isinstance(source, (str, os.PathLike))
+        self.stream: BinaryIO = open(source, "rb") if self.ownsStream else source
+
+        self.lookahead: int = lookahead
+        self.chunkSize: int = chunkSize
+
+        # regular files are scanned in place through mmap, anything else through a sliding chunk window
+        self.map: mmap.mmap | None = None
+        try:
+            self.map = mmap.mmap(self.stream.fileno(), 0, access=mmap.ACCESS_READ)
+        except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+            self.map = None
+
+        self.window: deque[Token] = deque()
+        self.tokenStream: Iterator[Token] = self.tokens()
+        self.eofToken: Token | None = None
+
+    def __enter__(self) -> "StreamLexer":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
 
-        self.currentChar: str | None = None
-        self.readChar()
+    def close(self) -> None:
+        self.tokenStream.close()
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        if self.ownsStream:
+            self.stream.close()
 
-    def readChar(self) -> None:
-        if self.readPosition >= len(self.source):
-            self.currentChar = None
+    def tokens(self) -> Iterator[Token]:
+        pattern: re.Pattern = STREAM_TOKEN_PATTERN
+
+        if self.map is not None:
+            window: bytes | mmap.mmap = self.map
+            exhausted: bool = True
         else:
-            self.currentChar = self.source[self.readPosition]
-        
-        self.position = self.readPosition
-        self.readPosition += 1
-
-    def skipWhitespace(self) -> None:
-        while self.currentChar in [' ', '\t', '\n', '\r']:
-            if self.currentChar == '\n':
-                self.lineNumber += 1
-            
-            self.readChar()
-
-    def newToken(self, tokenType: TokenType, literal: Any) -> Token:
-        return Token(type=tokenType, literal=literal, lineNumber=self.lineNumber, position=self.position)
-    
-    def readNumber(self) -> Token:
-        startPosition: int = self.position
-        decimalCounter: int = 0
-
-        output: str = ""
-        while self.currentChar.isdigit() or self.currentChar == ',':
-            if self.currentChar == ',':
-                decimalCounter += 1
-
-            if decimalCounter > 1:
-                print(f"Error: Invalid number format at line {self.lineNumber}, position {self.position}")
-                return self.newToken(TokenType.ILLEGAL, self.source[startPosition:self.position])
-            
-            output += self.currentChar
-            self.readChar()
-
-            if self.currentChar is None:
+            window = self.stream.read(self.chunkSize)
+            exhausted = len(window) == 0
+
+        # base is the absolute byte offset of window[0]
+        base: int = 0
+        index: int = 0
+        lineNumber: int = 1
+        nextNewline: int = window.find(b'\n')
+
+        while True:
+            match: re.Match | None = pattern.search(window, index)
+
+            # a token touching the end of a chunk may continue in the next one
+            if not exhausted and (match is None or match.end() == len(window)):
+                chunk: bytes = self.stream.read(self.chunkSize)
+                exhausted = len(chunk) == 0
+
+                while 0 <= nextNewline < index:
+                    lineNumber += 1
+                    nextNewline = window.find(b'\n', nextNewline + 1)
+
+                base += index
+                window = window[index:] + chunk
+                index = 0
+                nextNewline = window.find(b'\n')
+                continue
+
+            if match is None:
                 break
-        
-        if decimalCounter == 0:
-            return self.newToken(TokenType.INT, int(output))
-        else:
-            return self.newToken(TokenType.DOUBLE, float(output.replace(',', '.')))
-        
-    def isLetter(self, char: str) -> Token:
-        return 'a' <= char and char <= 'z' or 'A' <= char and char <= 'Z' or char == '_'
-
-    def readIdentifier(self) -> str:
-        position: int = self.position
-        while self.currentChar is not None and (self.isLetter(self.currentChar) or self.currentChar.isalnum()):
-            self.readChar()
-        
-        return self.source[position:self.position]
-
-    def peekChar(self) -> str | None:
-        if self.readPosition >= len(self.source):
-            return None
-        return self.source[self.readPosition]
 
-    def nextToken(self) -> Token:
-        token: Token = None
-
-        self.skipWhitespace()
-
-        match self.currentChar:
-            case '+':
-                token = self.newToken(TokenType.PLUS, self.currentChar)
-            case '-':
-                if (self.peekChar() == '>'):
-                    char = self.currentChar
-                    self.readChar()
-                    token = self.newToken(TokenType.ARROW, char + self.currentChar)
-                else:
-                    token = self.newToken(TokenType.MINUS, self.currentChar)
-            case '*':
-                token = self.newToken(TokenType.MULTIPLY, self.currentChar)
-            case '/':
-                token = self.newToken(TokenType.DIVIDE, self.currentChar)
-            case '^':
-                token = self.newToken(TokenType.POWER, self.currentChar)
-            case '%':
-                token = self.newToken(TokenType.MODULUS, self.currentChar)
-            case '.':
-                token = self.newToken(TokenType.DOT, self.currentChar)
-            case '(':
-                token = self.newToken(TokenType.LPAREN, self.currentChar)
-            case ')':
-                token = self.newToken(TokenType.RPAREN, self.currentChar)
-            case '{':
-                token = self.newToken(TokenType.LBRACE, self.currentChar)
-            case '}':
-                token = self.newToken(TokenType.RBRACE, self.currentChar)
-            case '=':
-                token = self.newToken(TokenType.EQUALS, self.currentChar)
-            case ':':
-                token = self.newToken(TokenType.COLON, self.currentChar)
-            case None:
-                token = self.newToken(TokenType.EOF, "")
-            case _:
-                if self.isLetter(self.currentChar):
-                    literal: str = self.readIdentifier()
-                    tokenType: TokenType = lookupIdentifier(literal)
-                    token = self.newToken(tokenType, literal)
-                    return self.newToken(tokenType, literal)
-                elif self.currentChar.isdigit():
-                    token = self.readNumber()
-                    return token
+            group: int = match.lastindex
+            start, end = match.span()
+
+            while 0 <= nextNewline < start:
+                lineNumber += 1
+                nextNewline = window.find(b'\n', nextNewline + 1)
+
+            if group == SYMBOL_GROUP:
+                tokenType: TokenType = TOKEN_KINDS[SYMBOL_KINDS[chr(window[start])]]
+                literal: Any = chr(window[start])
+                position: int = start
+            elif group == IDENTIFIER_GROUP:
+                literal = bytes(window[start:end]).decode("utf-8", errors="replace")
+                if not literal.isascii():
+                    literal, end = self.trimIdentifier(literal, start, end)
+                tokenType = TOKEN_KINDS[IDENTIFIER_KINDS.get(literal, IDENTIFIER_KIND)]
+                position = end
+            elif group == NUMBER_GROUP:
+                text: bytes = bytes(window[start:end])
+                position = end
+                if end < len(window) and window[end] == ord(','):
+                    print(f"Error: Invalid number format at line {lineNumber}, position {base + position}")
+                    tokenType = TokenType.ILLEGAL
+                    literal = text.decode("ascii")
+                elif b',' in text:
+                    tokenType = TokenType.DOUBLE
+                    literal = float(text.replace(b',', b'.'))
                 else:
-                    token = self.newToken(TokenType.ILLEGAL, self.currentChar)
-        
-        self.readChar()
-        return token
\ No newline at end of file
+                    tokenType = TokenType.INT
+                    literal = int(text)
+            elif group == ARROW_GROUP:
+                tokenType = TokenType.ARROW
+                literal = "->"
+                position = start + 1
+            else:
+                tokenType = TokenType.ILLEGAL
+                literal = bytes(window[start:end]).decode("utf-8", errors="replace")
+                position = start
+
+            index = end
+            yield Token(type=tokenType, literal=literal, lineNumber=lineNumber, position=base + position)
+
+        while nextNewline >= 0:
+            lineNumber += 1
+            nextNewline = window.find(b'\n', nextNewline + 1)
+
+        yield Token(type=TokenType.EOF, literal="", lineNumber=lineNumber, position=base + len(window))
+
+    def trimIdentifier(self, literal: str, start: int, end: int) -> tuple[str, int]:
+        # the byte pattern lets any non-ASCII byte continue an identifier, the character lexer only alphanumerics
+        for offset, char in enumerate(literal):
+            if not (char.isalnum() or char == '_'):
+                literal = literal[:offset]
+                return literal, start + len(literal.encode("utf-8"))
+        return literal, end
+
+    def fill(self, count: int) -> None:
+        while len(self.window) < count:
+            token: Token | None = next(self.tokenStream, None)
+            if token is None:
+                self.window.append(self.eofToken)
+            else:
+                if token.type == TokenType.EOF:
+                    self.eofToken = token
+                self.window.append(token)
+
+    def peekToken(self, offset: int = 0) -> Token:
+        if offset >= self.lookahead:
+            raise ValueError(f"Lookahead of {offset + 1} tokens exceeds the window of {self.lookahead}")
+
+        self.fill(offset + 1)
+        return self.window[offset]
+
+    def nextToken(self) -> Token:
+        self.fill(1)
+        return self.window.popleft()
@@ -0,0 +1,259 @@
+from AST import Program, Statement, Expression, ExpressionStatement, InfixExpression, IntegerLiteral, DoubleLiteral
+from AST import ShallStatement, IdentifierLiteral, BlockStatement, FunctionStatement, ReturnStatement, AssignStatement
+from AST import CallExpression
+
+from Evaluator import ConstantEvaluator, foldInteger, foldDouble
+from Resolver import Symbol
+
+def foldInfix(operator: str, leftNode: Expression | None, rightNode: Expression | None) -> Expression | None:
+    if leftNode.__class__ is IntegerLiteral and rightNode.__class__ is IntegerLiteral:
+        value: int | None = foldInteger(operator, leftNode.value, rightNode.value)
+        return IntegerLiteral(value=value) if value is not None else None
+
+    if leftNode.__class__ is DoubleLiteral and rightNode.__class__ is DoubleLiteral:
+        value: float | None = foldDouble(operator, leftNode.value, rightNode.value)
+        return DoubleLiteral(value=value) if value is not None else None
+
+    return None
+
+def readsOf(node: Expression | None) -> set[Symbol]:
+    symbols: set[Symbol] = set()
+    stack: list[Expression | None] = [node]
+
+    while len(stack) > 0:
+        current: Expression | None = stack.pop()
+        if current.__class__ is InfixExpression:
+            stack.append(current.leftNode)
+            stack.append(current.rightNode)
+        elif current.__class__ is CallExpression:
+            # the callee names a function, not a variable
+            stack.extend(current.arguments)
+        elif current.__class__ is IdentifierLiteral:
+            symbols.add(current.symbol)
+
+    return symbols
+
+def statementReads(statement: Statement | None) -> set[Symbol]:
+    statementClass: type = statement.__class__
+
+    if statementClass is ExpressionStatement:
+        return readsOf(statement.expression)
+    if statementClass is ShallStatement:
+        return readsOf(statement.value)
+    if statementClass is AssignStatement:
+        return readsOf(statement.rightValue)
+    if statementClass is ReturnStatement:
+        return readsOf(statement.returnValue)
+    if statementClass is FunctionStatement:
+        return statementReads(statement.body)
+    if statementClass is BlockStatement:
+        symbols: set[Symbol] = set()
+        for inner in statement.statements:
+            symbols |= statementReads(inner)
+        return symbols
+    return set()
+
+class Optimizer:
+    def __init__(self, enabled: bool = True, constantFolding: bool = True, constantPropagation: bool = True, deadStoreElimination: bool = True, compileTimeEvaluation: bool = True) -> None:
+        self.enabled: bool = enabled
+        self.constantFolding: bool = constantFolding
+        self.constantPropagation: bool = constantPropagation
+        self.deadStoreElimination: bool = deadStoreElimination
+        self.compileTimeEvaluation: bool = compileTimeEvaluation
+
+        self.evaluator: ConstantEvaluator | None = None
+
+        self.stats: dict[str, dict[str, int]] = {
+            "constant folding": {"folded": 0},
+            "constant propagation": {"propagated": 0},
+            "compile-time evaluation": {"evaluated": 0, "memoized": 0, "abandoned": 0},
+            "dead store elimination": {"removed": 0, "unreachable": 0}
+        }
+
+    def optimize(self, program: Program) -> Program:
+        # takes a resolved program, variables are told apart by their symbols;
+        # rewrites the statement lists in place, expression nodes are never mutated, so shared subtrees stay intact
+        if not self.enabled:
+            return program
+
+        # purity is decided on the program as written, before any function body is rewritten
+        if self.compileTimeEvaluation and self.constantFolding:
+            self.evaluator = ConstantEvaluator(program)
+
+        for statement in program.statements:
+            if statement.__class__ is FunctionStatement:
+                self.optimizeFunction(statement)
+
+        if self.evaluator is not None:
+            self.stats["compile-time evaluation"]["memoized"] = self.evaluator.hits
+
+        return program
+
+    def optimizeFunction(self, function: FunctionStatement) -> None:
+        body: BlockStatement = function.body
+
+        for statement in body.statements:
+            if statement.__class__ is FunctionStatement:
+                self.optimizeFunction(statement)
+
+        if self.constantFolding or self.constantPropagation:
+            self.foldBlock(body)
+
+        if self.deadStoreElimination:
+            self.eliminateDeadStores(body)
+
+    # region folding and propagation
+    def fold(self, node: Expression | None, constants: dict[Symbol, Expression]) -> Expression | None:
+        results: list[Expression | None] = []
+        stack: list[tuple[Expression | None, bool]] = [(node, False)]
+
+        while len(stack) > 0:
+            current, visited = stack.pop()
+            currentClass: type = current.__class__
+
+            if currentClass is InfixExpression:
+                if not visited:
+                    stack.append((current, True))
+                    stack.append((current.rightNode, False))
+                    stack.append((current.leftNode, False))
+                    continue
+
+                rightNode: Expression | None = results.pop()
+                leftNode: Expression | None = results.pop()
+
+                folded: Expression | None = foldInfix(current.operator, leftNode, rightNode) if self.constantFolding else None
+                if folded is not None:
+                    self.stats["constant folding"]["folded"] += 1
+                    results.append(folded)
+                elif leftNode is current.leftNode and rightNode is current.rightNode:
+                    results.append(current)
+                else:
+                    results.append(InfixExpression(leftNode=leftNode, operator=current.operator, rightNode=rightNode))
+            elif currentClass is CallExpression:
+                if not visited:
+                    stack.append((current, True))
+                    for argument in reversed(current.arguments):
+                        stack.append((argument, False))
+                    continue
+
+                count: int = len(current.arguments)
+                arguments: list[Expression | None] = results[len(results) - count:]
+                del results[len(results) - count:]
+
+                evaluated: Expression | None = self.evaluateCall(current.function, arguments)
+                if evaluated is not None:
+                    results.append(evaluated)
+                elif all(argument is original for argument, original in zip(arguments, current.arguments)):
+                    results.append(current)
+                else:
+                    results.append(CallExpression(function=current.function, arguments=arguments))
+            elif currentClass is IdentifierLiteral and current.symbol in constants:
+                self.stats["constant propagation"]["propagated"] += 1
+                results.append(constants[current.symbol])
+            else:
+                results.append(current)
+
+        return results[0]
+
+    def evaluateCall(self, function: Expression | None, arguments: list[Expression | None]) -> Expression | None:
+        if self.evaluator is None or function.__class__ is not IdentifierLiteral:
+            return None
+        if not all(argument.__class__ is IntegerLiteral or argument.__class__ is DoubleLiteral for argument in arguments):
+            return None
+
+        result: Expression | None = self.evaluator.evaluate(function.symbol, arguments)
+        self.stats["compile-time evaluation"]["evaluated" if result is not None else "abandoned"] += 1
+        return result
+
+    def foldBlock(self, block: BlockStatement) -> None:
+        # straight-line code, so a forward walk knows the exact value of every variable holding a constant
+        # a nested function can't reach the variables of this one, the Resolver rejects that, so its definition changes none of them
+        constants: dict[Symbol, Expression] = {}
+        propagate: bool = self.constantPropagation
+
+        for statement in block.statements:
+            statementClass: type = statement.__class__
+
+            if statementClass is ShallStatement or statementClass is AssignStatement:
+                isShall: bool = statementClass is ShallStatement
+                symbol: Symbol = statement.name.symbol if isShall else statement.ident.symbol
+
+                value: Expression | None = self.fold(statement.value if isShall else statement.rightValue, constants)
+                if isShall:
+                    statement.value = value
+                else:
+                    statement.rightValue = value
+
+                if propagate and (value.__class__ is IntegerLiteral or value.__class__ is DoubleLiteral):
+                    constants[symbol] = value
+                else:
+                    constants.pop(symbol, None)
+            elif statementClass is ExpressionStatement:
+                statement.expression = self.fold(statement.expression, constants)
+            elif statementClass is ReturnStatement:
+                statement.returnValue = self.fold(statement.returnValue, constants)
+    # endregion
+
+    # region dead store elimination
+    def eliminateDeadStores(self, block: BlockStatement) -> None:
+        stats: dict[str, int] = self.stats["dead store elimination"]
+
+        statements: list[Statement] = block.statements
+        for index, statement in enumerate(statements):
+            if statement.__class__ is ReturnStatement:
+                stats["unreachable"] += len(statements) - index - 1
+                statements = statements[:index + 1]
+                break
+
+        # only stores after a declaration in this block are ours to remove, anything else must still reach the compiler
+        declared: set[Symbol] = set()
+        removable: set[int] = set()
+        for statement in statements:
+            if statement.__class__ is ShallStatement:
+                declared.add(statement.name.symbol)
+            elif statement.__class__ is AssignStatement and statement.ident.symbol in declared:
+                removable.add(id(statement))
+
+        # walk backwards with the variables read before their next store, and those a kept store writes
+        live: set[Symbol] = set()
+        stored: set[Symbol] = set()
+        kept: list[Statement | None] = []
+
+        for statement in reversed(statements):
+            statementClass: type = statement.__class__
+
+            if statementClass is AssignStatement and id(statement) in removable:
+                symbol: Symbol = statement.ident.symbol
+                if symbol not in live:
+                    stats["removed"] += 1
+                    continue
+
+                live.discard(symbol)
+                live |= readsOf(statement.rightValue)
+                stored.add(symbol)
+            elif statementClass is ShallStatement:
+                symbol = statement.name.symbol
+
+                # a declaration fixes the variable's type, so it stays while any later store to the variable does
+                if symbol not in live and symbol not in stored:
+                    stats["removed"] += 1
+                    continue
+
+                stored.discard(symbol)
+                live.discard(symbol)
+                live |= readsOf(statement.value)
+            else:
+                live |= statementReads(statement)
+
+            kept.append(statement)
+
+        kept.reverse()
+        block.statements = kept
+    # endregion
+
+    def report(self) -> str:
+        lines: list[str] = ["=== AST OPTIMIZER ==="]
+        for passName, counters in self.stats.items():
+            summary: str = ", ".join(f"{counter}: {count}" for counter, count in counters.items())
+            lines.append(f"{passName:<24} {summary}")
+        return "\n".join(lines)
\ No newline at end of file
@@ -0,0 +1,195 @@
+import contextlib
+import io
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import llvmlite.binding as llvm
+
+from AST import Program, FunctionStatement
+from Arena import ASTArena
+from Lexer import Lexer, ILLEGAL_KIND
+from IndexedParser import IndexedParser
+from Backend import Backend
+from Compiler import Compiler
+from TextCompiler import TextCompiler
+from HashCons import HashConser
+from Resolver import Resolver
+
+# region worker
+workerBackend: Backend | None = None
+workerOptions: tuple[bool, bool, bool, bool, dict[str, list[str]] | None, str | None] = (True, False, False, False, None, None)
+
+def initializeWorker(optLevel: str, hostCPU: bool, textBackend: bool, cse: bool, ssa: bool, instrument: bool = False, functionAttributes: dict[str, list[str]] | None = None,
+                     debugFile: str | None = None) -> None:
+    # one backend per worker process, created once and reused for every unit it gets
+    global workerBackend, workerOptions
+    workerBackend = Backend(optLevel=optLevel, hostCPU=hostCPU)
+    workerOptions = (textBackend, cse, ssa, instrument, functionAttributes, debugFile)
+
+def serializeUnit(node: FunctionStatement, externals: list[FunctionStatement]) -> bytes:
+    # the callees travel as bodiless stubs, enough for the worker to resolve and declare them;
+    # symbols stay behind, the worker resolves the small program again
+    program: Program = Program()
+    for external in externals:
+        program.statements.append(FunctionStatement(parameters=external.parameters, body=None, name=external.name, returnType=external.returnType))
+    program.statements.append(node)
+
+    arena: ASTArena = ASTArena()
+    arena.root = arena.add(program)
+    return arena.serialize()
+
+def compileUnits(units: list[bytes]) -> list[tuple[bytes | None, bytes | None, list[str]]]:
+    # (object, bitcode, errors) per unit
+    textBackend, cse, ssa, instrument, functionAttributes, debugFile = workerOptions
+    results: list[tuple[bytes | None, bytes | None, list[str]]] = []
+
+    for data in units:
+        program: Program = ASTArena.deserialize(data).toProgram()
+
+        resolver: Resolver = Resolver()
+        resolver.resolve(program)
+        if len(resolver.errors) > 0:
+            results.append((None, None, resolver.errors))
+            continue
+
+        if cse:
+            HashConser().internProgram(program)
+
+        compilerClass: type = TextCompiler if textBackend else Compiler
+        compiler: Compiler | TextCompiler = compilerClass(cse=cse, ssa=ssa, instrument=instrument, functionAttributes=functionAttributes, debugFile=debugFile)
+        compiler.compileUnit(program.statements[-1], program.symbols, program.statements[:-1])
+        if len(compiler.errors) > 0:
+            results.append((None, None, compiler.errors))
+            continue
+
+        moduleRef: llvm.ModuleRef = workerBackend.parse(compiler.module)
+        workerBackend.optimize(moduleRef)
+        results.append((workerBackend.emitObject(moduleRef), moduleRef.as_bitcode(), []))
+
+    return results
+# endregion
+
+class CompilePool:
+    # compiles units, each into its own module and object, on a pool of worker processes
+    def __init__(self, optLevel: str = "O2", hostCPU: bool = True, textBackend: bool = True, cse: bool = False, ssa: bool = False, jobs: int | None = None, batchesPerJob: int = 4,
+                 instrument: bool = False, functionAttributes: dict[str, list[str]] | None = None, debugFile: str | None = None) -> None:
+        self.jobs: int = jobs if jobs is not None else os.cpu_count() or 1
+
+        # a few batches per worker: big enough to amortize pickling, small enough to balance uneven functions
+        self.batchesPerJob: int = batchesPerJob
+
+        self.executor: ProcessPoolExecutor = ProcessPoolExecutor(max_workers=self.jobs, initializer=initializeWorker, initargs=(optLevel, hostCPU, textBackend, cse, ssa, instrument, functionAttributes, debugFile))
+
+    def compile(self, units: list[tuple[FunctionStatement, list[FunctionStatement]]]) -> list[tuple[bytes | None, bytes | None, list[str]]]:
+        serialized: list[bytes] = [serializeUnit(node, externals) for node, externals in units]
+
+        batchSize: int = max(1, -(-len(serialized) // (self.jobs * self.batchesPerJob)))
+        batches: list[list[bytes]] = [serialized[start:start + batchSize] for start in range(0, len(serialized), batchSize)]
+
+        # map keeps the submission order, so results line up with units
+        results: list[tuple[bytes | None, bytes | None, list[str]]] = []
+        for batch in self.executor.map(compileUnits, batches):
+            results.extend(batch)
+        return results
+
+    def close(self) -> None:
+        self.executor.shutdown()
+
+    def __enter__(self) -> "CompilePool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+# region frontend worker
+BRACE_PATTERN: re.Pattern = re.compile(r"[{}]")
+
+def splitSource(source: str, chunkCount: int) -> list[tuple[int, int]] | None:
+    # cuts right after the braces that close a top-level function; None if the braces don't balance
+    boundaries: list[int] = []
+    depth: int = 0
+    for match in BRACE_PATTERN.finditer(source):
+        if match.group() == "{":
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                boundaries.append(match.end())
+            elif depth < 0:
+                return None
+
+    if depth != 0:
+        return None
+
+    # neighbouring functions are merged until every chunk has about its share of the characters
+    target: int = max(1, len(source) // chunkCount)
+    chunks: list[tuple[int, int]] = []
+    start: int = 0
+    for boundary in boundaries:
+        if boundary - start >= target:
+            chunks.append((start, boundary))
+            start = boundary
+    if start < len(source) or len(chunks) == 0:
+        chunks.append((start, len(source)))
+
+    return chunks
+
+def parseChunk(chunk: tuple[str, int, int]) -> bytes | None:
+    # the arena of the chunk's statements, None if the chunk has lexer or parser errors
+    text, offset, lineNumber = chunk
+
+    # the lexer reports some errors itself; they are printed by the sequential parse that errors fall back to
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        lexer: Lexer = Lexer(text, offset=offset, lineNumber=lineNumber)
+    if output.getvalue() or ILLEGAL_KIND in lexer.buffer.kinds:
+        return None
+
+    parser: IndexedParser = IndexedParser(lexer.buffer)
+    program: Program = parser.parseProgram()
+    if len(parser.errors) > 0:
+        return None
+
+    arena: ASTArena = ASTArena()
+    arena.root = arena.add(program)
+    return arena.serialize()
+# endregion
+
+class ParallelFrontend:
+    # lexes and parses top-level chunks of one source in worker processes
+    def __init__(self, jobs: int | None = None, chunksPerJob: int = 4, minimumChunk: int = 1 << 16) -> None:
+        self.jobs: int = jobs if jobs is not None else os.cpu_count() or 1
+        self.chunksPerJob: int = chunksPerJob
+
+        # below this many characters a chunk costs more to ship than to parse here
+        self.minimumChunk: int = minimumChunk
+
+    def parse(self, source: str) -> Program | None:
+        # None when the source needs the sequential parse: unbalanced braces or any error, whose messages it owns
+        chunkCount: int = max(1, min(self.jobs * self.chunksPerJob, len(source) // self.minimumChunk))
+        spans: list[tuple[int, int]] | None = splitSource(source, chunkCount)
+        if spans is None:
+            return None
+
+        # one chunk is just the sequential parse with extra steps
+        if len(spans) < 2:
+            return None
+
+        chunks: list[tuple[str, int, int]] = []
+        lineNumber: int = 1
+        previousStart: int = 0
+        for start, end in spans:
+            lineNumber += source.count("\n", previousStart, start)
+            chunks.append((source[start:end], start, lineNumber))
+            previousStart = start
+
+        with ProcessPoolExecutor(max_workers=min(self.jobs, len(chunks))) as executor:
+            results: list[bytes | None] = list(executor.map(parseChunk, chunks))
+
+        program: Program = Program()
+        for data in results:
+            if data is None:
+                return None
+            program.statements.extend(ASTArena.deserialize(data).toProgram().statements)
+
+        return program
\ No newline at end of file
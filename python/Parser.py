@@ -5,6 +5,7 @@ from enum import Enum, auto
 
 from AST import Statement, Program, Expression, InfixExpression, IntegerLiteral, DoubleLiteral, ExpressionStatement 
 from AST import IdentifierLiteral, ShallStatement, FunctionStatement, ReturnStatement, BlockStatement, AssignStatement
+from AST import CallExpression, FunctionParameter
 
 # precedence types
 class PrecedenceType(Enum):
@@ -25,9 +26,15 @@ PRECEDENCES: dict[TokenType, PrecedenceType] = {
     TokenType.MULTIPLY: PrecedenceType.P_PRODUCT,
     TokenType.DIVIDE: PrecedenceType.P_PRODUCT,
     TokenType.MODULUS: PrecedenceType.P_PRODUCT,
-    TokenType.POWER: PrecedenceType.P_EXPONENT
+    TokenType.POWER: PrecedenceType.P_EXPONENT,
+    TokenType.LPAREN: PrecedenceType.P_CALL
 }
 
+# frames of the iterative expression parser
+INFIX_FRAME: int = 0
+GROUP_FRAME: int = 1
+CALL_FRAME: int = 2
+
 class Parser:
     def __init__(self, lexer: Lexer) -> None:
         self.lexer: Lexer = lexer
@@ -40,8 +47,7 @@ class Parser:
         self.prefixParseFns: dict[TokenType, callable] = {
             TokenType.IDENTIFIER: self.parseIdentifier,
             TokenType.INT: self.parseIntegerLiteral,
-            TokenType.DOUBLE: self.parseDoubleLiteral,
-            TokenType.LPAREN: self.parseGroupedExpression
+            TokenType.DOUBLE: self.parseDoubleLiteral
         }
 
         self.infixParseFns: dict[TokenType, callable] = {
@@ -108,18 +114,23 @@ class Parser:
     
     # region statement helpers
     def parseStatement(self) -> Statement:
+        line: int = self.currentToken.lineNumber
         if self.currentToken.type == TokenType.IDENTIFIER and self.peekTokenIs(TokenType.EQUALS):
-            return self.parseAssignmentStatement()
-        
-        match self.currentToken.type:
-            case TokenType.SHALL:
-                return self.parseShallStatement()
-            case TokenType.FUNC:
-                return self.parseFunctionStatement()
-            case TokenType.RET:
-                return self.parseReturnStatement()
-            case _:
-                return self.parseExpressionStatement()
+            statement: Statement = self.parseAssignmentStatement()
+        else:
+            match self.currentToken.type:
+                case TokenType.SHALL:
+                    statement: Statement = self.parseShallStatement()
+                case TokenType.FUNC:
+                    statement: Statement = self.parseFunctionStatement()
+                case TokenType.RET:
+                    statement: Statement = self.parseReturnStatement()
+                case _:
+                    statement: Statement = self.parseExpressionStatement()
+
+        if statement is not None:
+            statement.line = line
+        return statement
             
     def parseShallStatement(self) -> ShallStatement:
         # shall a: int = 137
@@ -162,7 +173,7 @@ class Parser:
     def parseFunctionStatement(self) -> FunctionStatement:
         statement: FunctionStatement = FunctionStatement()
         
-        # f name() -> int { r 2. }
+        # f name(a: int. b: int) -> int { r 2. }
 
         if not self.expectPeek(TokenType.IDENTIFIER):
             return None
@@ -172,9 +183,9 @@ class Parser:
         if not self.expectPeek(TokenType.LPAREN):
             return None
         
-        statement.parameters = []
+        statement.parameters = self.parseFunctionParameters()
 
-        if not self.expectPeek(TokenType.RPAREN):
+        if statement.parameters is None:
             return None
         
         if not self.expectPeek(TokenType.ARROW):
@@ -192,6 +203,38 @@ class Parser:
 
         return statement
 
+    def parseFunctionParameters(self) -> list[FunctionParameter]:
+        # parameters are separated by dots, the same way the language swaps ',' and '.' everywhere else
+        parameters: list[FunctionParameter] = []
+
+        if self.peekTokenIs(TokenType.RPAREN):
+            self.nextToken()
+            return parameters
+
+        while True:
+            if not self.expectPeek(TokenType.IDENTIFIER):
+                return None
+
+            name: str = self.currentToken.literal
+
+            if not self.expectPeek(TokenType.COLON):
+                return None
+
+            if not self.expectPeek(TokenType.TYPE):
+                return None
+
+            parameters.append(FunctionParameter(value=name, valueType=self.currentToken.literal))
+
+            if not self.peekTokenIs(TokenType.DOT):
+                break
+
+            self.nextToken()
+
+        if not self.expectPeek(TokenType.RPAREN):
+            return None
+
+        return parameters
+
     def parseReturnStatement(self) -> ReturnStatement:
         statement: Statement = ReturnStatement()
 
@@ -235,43 +278,81 @@ class Parser:
 
     # region expression helpers
     def parseExpression(self, precedence: PrecedenceType) -> Expression:
-        prefixFunction: callable | None = self.prefixParseFns.get(self.currentToken.type)
-        if prefixFunction is None:
-            self.noPrefixParseFnError(self.currentToken.type)
-            return None
-        
-        leftExpression: Expression = prefixFunction()
-        while not self.peekTokenIs(TokenType.DOT) and precedence.value < self.peekPrecedence().value:
-            infixFunction: callable | None = self.infixParseFns.get(self.peekToken.type)
-            if infixFunction is None:
-                return leftExpression
-            
-            self.nextToken()
-
-            leftExpression = infixFunction(leftExpression)
-
-        return leftExpression
-
-    def parseInfixExpression(self, leftNode: Expression) -> Expression:
-        infixExpression: InfixExpression = InfixExpression(leftNode=leftNode, operator=self.currentToken.literal)
-
-        precedence = self.currentPrecedence()
-        
-        self.nextToken()
-
-        infixExpression.rightNode = self.parseExpression(precedence)
-
-        return infixExpression
-    
-    def parseGroupedExpression(self) -> Expression:
-        self.nextToken()
-
-        expression: Expression = self.parseExpression(PrecedenceType.P_LOWEST)
-
-        if not self.expectPeek(TokenType.RPAREN):
-            return None
-        
-        return expression
+        # iterative Pratt loop: every operand that is still being parsed has a frame (kind, precedence, leftNode, payload)
+        # on this stack; the payload is (infixFunction, operator) for operators and the argument list for calls
+        frames: list[tuple[int, PrecedenceType, Expression, Any]] = []
+
+        while True:
+            if self.currentTokenIs(TokenType.LPAREN):
+                frames.append((GROUP_FRAME, precedence, None, None))
+                self.nextToken()
+                precedence = PrecedenceType.P_LOWEST
+                continue
+
+            prefixFunction: callable | None = self.prefixParseFns.get(self.currentToken.type)
+            if prefixFunction is None:
+                self.noPrefixParseFnError(self.currentToken.type)
+                leftExpression: Expression = None
+                finished: bool = True
+            else:
+                leftExpression = prefixFunction()
+                finished = False
+
+            while True:
+                if not finished and not self.peekTokenIs(TokenType.DOT) and precedence.value < self.peekPrecedence().value:
+                    if self.peekTokenIs(TokenType.LPAREN):
+                        self.nextToken()
+                        if self.peekTokenIs(TokenType.RPAREN):
+                            self.nextToken()
+                            leftExpression = self.parseCallExpression(leftExpression, [])
+                            continue
+
+                        frames.append((CALL_FRAME, precedence, leftExpression, []))
+                        self.nextToken()
+                        precedence = PrecedenceType.P_LOWEST
+                        break
+
+                    infixFunction: callable | None = self.infixParseFns.get(self.peekToken.type)
+                    if infixFunction is not None:
+                        self.nextToken()
+                        frames.append((INFIX_FRAME, precedence, leftExpression, (infixFunction, self.currentToken.literal)))
+                        precedence = self.currentPrecedence()
+                        self.nextToken()
+                        break
+
+                if len(frames) == 0:
+                    return leftExpression
+
+                frameKind, precedence, leftNode, payload = frames.pop()
+                finished = False
+
+                if frameKind == INFIX_FRAME:
+                    infixFunction, operator = payload
+                    leftExpression = infixFunction(leftNode, operator, leftExpression)
+                elif frameKind == GROUP_FRAME:
+                    if not self.expectPeek(TokenType.RPAREN):
+                        leftExpression = None
+                else:
+                    payload.append(leftExpression)
+
+                    # f(a. b): a dot continues the argument list
+                    if self.peekTokenIs(TokenType.DOT):
+                        self.nextToken()
+                        self.nextToken()
+                        frames.append((CALL_FRAME, precedence, leftNode, payload))
+                        precedence = PrecedenceType.P_LOWEST
+                        break
+
+                    if self.expectPeek(TokenType.RPAREN):
+                        leftExpression = self.parseCallExpression(leftNode, payload)
+                    else:
+                        leftExpression = None
+
+    def parseInfixExpression(self, leftNode: Expression, operator: str, rightNode: Expression) -> Expression:
+        return InfixExpression(leftNode=leftNode, operator=operator, rightNode=rightNode)
+
+    def parseCallExpression(self, function: Expression, arguments: list[Expression]) -> Expression:
+        return CallExpression(function=function, arguments=arguments)
     # endregion
 
     # region prefix helpers
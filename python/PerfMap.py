@@ -0,0 +1,301 @@
+import bisect
+import os
+import struct
+
+import llvmlite.binding as llvm
+
+# ELF section and symbol kinds that matter here
+SHT_SYMTAB: int = 2
+SHT_RELA: int = 4
+STT_FUNC: int = 2
+STT_SECTION: int = 3
+SHN_UNDEF: int = 0
+
+# DWARF line program opcodes (DWARF 4, section 6.2.5)
+DW_LNS_COPY: int = 1
+DW_LNS_ADVANCE_PC: int = 2
+DW_LNS_ADVANCE_LINE: int = 3
+DW_LNS_CONST_ADD_PC: int = 8
+DW_LNS_FIXED_ADVANCE_PC: int = 9
+DW_LNE_END_SEQUENCE: int = 1
+DW_LNE_SET_ADDRESS: int = 2
+
+class ElfSection:
+    __slots__ = ("name", "type", "offset", "size", "link", "info")
+
+    def __init__(self, name: str, type: int, offset: int, size: int, link: int, info: int) -> None:
+        self.name: str = name
+        self.type: int = type
+        self.offset: int = offset
+        self.size: int = size
+        self.link: int = link
+        self.info: int = info
+
+class ElfSymbol:
+    __slots__ = ("name", "kind", "section", "value", "size")
+
+    def __init__(self, name: str, kind: int, section: int, value: int, size: int) -> None:
+        self.name: str = name
+        self.kind: int = kind
+        self.section: int = section
+        self.value: int = value
+        self.size: int = size
+
+class ObjectFile:
+    # just enough of a relocatable little-endian ELF64 object to find its functions and its line table
+    def __init__(self, data: bytes) -> None:
+        self.data: bytes = data
+        self.sections: list[ElfSection] = []
+        self.symbols: list[ElfSymbol] = []
+
+        # section index -> {offset inside it -> (symbol index, addend)}
+        self.relocations: dict[int, dict[int, tuple[int, int]]] = {}
+
+        if data[:4] == b"\x7fELF" and data[4] == 2 and data[5] == 1:
+            self.readSections()
+            self.readSymbols()
+            self.readRelocations()
+
+    def valid(self) -> bool:
+        return len(self.sections) > 0
+
+    # region reading
+    def readSections(self) -> None:
+        sectionOffset: int = struct.unpack_from("<Q", self.data, 0x28)[0]
+        entrySize, count, namesIndex = struct.unpack_from("<HHH", self.data, 0x3A)
+
+        headers: list[tuple] = [struct.unpack_from("<IIQQQQIIQQ", self.data, sectionOffset + index * entrySize) for index in range(count)]
+        namesOffset: int = headers[namesIndex][4]
+        for name, type, _, _, offset, size, link, info, _, _ in headers:
+            self.sections.append(ElfSection(self.string(namesOffset + name), type, offset, size, link, info))
+
+    def readSymbols(self) -> None:
+        for section in self.sections:
+            if section.type != SHT_SYMTAB:
+                continue
+
+            namesOffset: int = self.sections[section.link].offset
+            for offset in range(section.offset, section.offset + section.size, 24):
+                name, info, _, index, value, size = struct.unpack_from("<IBBHQQ", self.data, offset)
+                self.symbols.append(ElfSymbol(self.string(namesOffset + name), info & 0xF, index, value, size))
+
+    def readRelocations(self) -> None:
+        for section in self.sections:
+            if section.type != SHT_RELA:
+                continue
+
+            relocations: dict[int, tuple[int, int]] = self.relocations.setdefault(section.info, {})
+            for offset in range(section.offset, section.offset + section.size, 24):
+                target, info, addend = struct.unpack_from("<QQq", self.data, offset)
+                relocations[target] = (info >> 32, addend)
+
+    def string(self, offset: int) -> str:
+        return self.data[offset:self.data.index(b"\0", offset)].decode("utf-8", "replace")
+
+    def section(self, name: str) -> int:
+        for index, section in enumerate(self.sections):
+            if section.name == name:
+                return index
+        return -1
+    # endregion
+
+    def functions(self) -> list[ElfSymbol]:
+        return [symbol for symbol in self.symbols if symbol.kind == STT_FUNC and symbol.section != SHN_UNDEF and symbol.size > 0]
+
+    # region line table
+    def lineRows(self) -> list[list[tuple[ElfSymbol, int, int]]]:
+        # the rows of every sequence in .debug_line as (symbol the address is relative to, offset from it, line);
+        # the addresses are relocated at load time, so each sequence starts from the symbol of its set_address relocation
+        index: int = self.section(".debug_line")
+        if index < 0:
+            return []
+
+        data: bytes = self.data
+        section: ElfSection = self.sections[index]
+        relocations: dict[int, tuple[int, int]] = self.relocations.get(index, {})
+
+        sequences: list[list[tuple[ElfSymbol, int, int]]] = []
+        position: int = section.offset
+        end: int = section.offset + section.size
+        while position < end:
+            unitLength: int = struct.unpack_from("<I", data, position)[0]
+            offsetSize: int = 4
+            position += 4
+            if unitLength == 0xFFFFFFFF:
+                unitLength = struct.unpack_from("<Q", data, position)[0]
+                offsetSize = 8
+                position += 8
+            unitEnd: int = position + unitLength
+
+            version: int = struct.unpack_from("<H", data, position)[0]
+            if not 2 <= version <= 4:
+                # DWARF 5 moves the file table around, the compilers ask for version 4
+                position = unitEnd
+                continue
+
+            headerLength: int = int.from_bytes(data[position + 2:position + 2 + offsetSize], "little")
+            cursor: int = position + 2 + offsetSize
+            program: int = cursor + headerLength
+
+            minimumLength: int = data[cursor]
+            cursor += 2 if version >= 4 else 1
+            lineBase: int = struct.unpack_from("<b", data, cursor + 1)[0]
+            lineRange: int = data[cursor + 2]
+            opcodeBase: int = data[cursor + 3]
+            standardLengths: bytes = data[cursor + 4:cursor + 3 + opcodeBase]
+
+            sequences.extend(self.runLineProgram(program, unitEnd, section.offset, relocations, minimumLength, lineBase, lineRange, opcodeBase, standardLengths))
+            position = unitEnd
+
+        return sequences
+
+    def runLineProgram(self, position: int, end: int, sectionStart: int, relocations: dict[int, tuple[int, int]],
+                       minimumLength: int, lineBase: int, lineRange: int, opcodeBase: int, standardLengths: bytes) -> list[list[tuple[ElfSymbol, int, int]]]:
+        data: bytes = self.data
+        sequences: list[list[tuple[ElfSymbol, int, int]]] = []
+        rows: list[tuple[ElfSymbol, int, int]] = []
+
+        symbol: ElfSymbol | None = None
+        address: int = 0
+        line: int = 1
+
+        while position < end:
+            opcode: int = data[position]
+            position += 1
+
+            if opcode >= opcodeBase:
+                adjusted: int = opcode - opcodeBase
+                address += (adjusted // lineRange) * minimumLength
+                line += lineBase + adjusted % lineRange
+                rows.append((symbol, address, line))
+            elif opcode == 0:
+                length, position = readUnsigned(data, position)
+                extended: int = data[position]
+                if extended == DW_LNE_END_SEQUENCE:
+                    rows.append((symbol, address, line))
+                    if symbol is not None:
+                        sequences.append(rows)
+                    rows = []
+                    symbol = None
+                    address = 0
+                    line = 1
+                elif extended == DW_LNE_SET_ADDRESS:
+                    relocation: tuple[int, int] | None = relocations.get(position + 1 - sectionStart)
+                    if relocation is not None:
+                        symbol = self.symbols[relocation[0]]
+                        address = relocation[1]
+                position += length
+            elif opcode == DW_LNS_COPY:
+                rows.append((symbol, address, line))
+            elif opcode == DW_LNS_ADVANCE_PC:
+                advance, position = readUnsigned(data, position)
+                address += advance * minimumLength
+            elif opcode == DW_LNS_ADVANCE_LINE:
+                advance, position = readSigned(data, position)
+                line += advance
+            elif opcode == DW_LNS_CONST_ADD_PC:
+                address += ((255 - opcodeBase) // lineRange) * minimumLength
+            elif opcode == DW_LNS_FIXED_ADVANCE_PC:
+                address += struct.unpack_from("<H", data, position)[0]
+                position += 2
+            else:
+                # file, column, flags and the like: skip their operands
+                for _ in range(standardLengths[opcode - 1]):
+                    _, position = readUnsigned(data, position)
+
+        return sequences
+    # endregion
+
+def readUnsigned(data: bytes, position: int) -> tuple[int, int]:
+    value: int = 0
+    shift: int = 0
+    while True:
+        byte: int = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            return value, position
+
+def readSigned(data: bytes, position: int) -> tuple[int, int]:
+    value: int = 0
+    shift: int = 0
+    while True:
+        byte: int = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            if byte & 0x40:
+                value -= 1 << shift
+            return value, position
+
+class PerfMap:
+    # the /tmp/perf-<pid>.map that perf reads to name samples in JIT code: "start size name" per line, in hex.
+    # with line tables in the objects every range of machine code is named "function:line", otherwise just "function"
+    def __init__(self, path: str | None = None) -> None:
+        self.path: str = path if path is not None else f"/tmp/perf-{os.getpid()}.map"
+        self.entries: list[tuple[int, int, str]] = []
+        self.written: int = 0
+
+    def addObject(self, objectCode: bytes, engine: llvm.ExecutionEngine) -> int:
+        # the engine placed every section of the object somewhere, a function's address minus its offset gives where
+        objectFile: ObjectFile = ObjectFile(objectCode)
+        if not objectFile.valid():
+            return 0
+
+        bases: dict[int, int] = {}
+        functions: list[tuple[int, ElfSymbol]] = []
+        for symbol in objectFile.functions():
+            address: int = engine.get_function_address(symbol.name)
+            if address == 0:
+                continue
+            bases.setdefault(symbol.section, address - symbol.value)
+            functions.append((address, symbol))
+
+        entries: list[tuple[int, int, str]] = []
+        for rows in objectFile.lineRows():
+            entries.extend(self.lineEntries(rows, bases, functions))
+
+        if len(entries) == 0:
+            entries = [(address, symbol.size, symbol.name) for address, symbol in functions]
+
+        self.entries.extend(entries)
+        return len(entries)
+
+    def lineEntries(self, rows: list[tuple[ElfSymbol, int, int]], bases: dict[int, int], functions: list[tuple[int, ElfSymbol]]) -> list[tuple[int, int, str]]:
+        functions = sorted(functions, key=lambda function: function[0])
+        starts: list[int] = [address for address, _ in functions]
+
+        entries: list[tuple[int, int, str]] = []
+        for (symbol, offset, line), (_, nextOffset, _) in zip(rows, rows[1:]):
+            base: int | None = bases.get(symbol.section) if symbol is not None else None
+            if base is None or nextOffset <= offset:
+                continue
+
+            start: int = base + (symbol.value if symbol.kind != STT_SECTION else 0) + offset
+            position: int = bisect.bisect_right(starts, start) - 1
+            if position < 0:
+                continue
+
+            # padding between functions belongs to neither
+            address, function = functions[position]
+            size: int = min(nextOffset - offset, address + function.size - start)
+            if size <= 0:
+                continue
+
+            # line 0 is code the optimizer couldn't pin to one statement
+            name: str = f"{function.name}:{line}" if line > 0 else function.name
+            if len(entries) > 0 and entries[-1][2] == name and entries[-1][0] + entries[-1][1] == start:
+                # consecutive rows of the same line make one range
+                entries[-1] = (entries[-1][0], entries[-1][1] + size, name)
+            else:
+                entries.append((start, size, name))
+        return entries
+
+    def write(self) -> None:
+        # the first write starts the file, later ones append what was added since, so a JIT can call it after every compile
+        with open(self.path, "a" if self.written > 0 else "w") as f:
+            for start, size, name in sorted(self.entries[self.written:]):
+                f.write(f"{start:x} {size:x} {name}\n")
+        self.written = len(self.entries)
\ No newline at end of file
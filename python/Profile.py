@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+from ctypes import c_uint64
+
+import llvmlite.binding as llvm
+
+from AST import Program, FunctionStatement
+from Incremental import nestedFunctions
+
+# every instrumented function owns a global "<name>.profile" of two i64: calls, then cycles spent inside, callees included
+PROFILE_SUFFIX: str = ".profile"
+
+class FunctionProfile:
+    __slots__ = ("name", "calls", "cycles")
+
+    def __init__(self, name: str, calls: int = 0, cycles: int = 0) -> None:
+        self.name: str = name
+        self.calls: int = calls
+        self.cycles: int = cycles
+
+class RuntimeProfile:
+    # what an instrumented run measured, and the hot and cold functions a later compile derives from it
+    def __init__(self, functions: dict[str, FunctionProfile] | None = None, hotFraction: float = 0.9) -> None:
+        self.functions: dict[str, FunctionProfile] = functions if functions is not None else {}
+
+        # the most called functions that together make up this share of all calls are hot
+        self.hotFraction: float = hotFraction
+
+        self.hot: set[str] = set()
+        self.cold: set[str] = set()
+        self.classify()
+
+    def classify(self) -> None:
+        totalCalls: int = sum(function.calls for function in self.functions.values())
+
+        covered: int = 0
+        for function in sorted(self.functions.values(), key=lambda function: -function.calls):
+            if function.calls == 0:
+                # never ran in the profiled run
+                self.cold.add(function.name)
+            elif covered < self.hotFraction * totalCalls:
+                self.hot.add(function.name)
+                covered += function.calls
+
+    # region collecting
+    @classmethod
+    def collect(cls, engine: llvm.ExecutionEngine, program: Program) -> "RuntimeProfile":
+        # reads the counters of every function the program defines out of the engine that ran it
+        functions: dict[str, FunctionProfile] = {}
+        for statement in program.statements:
+            if statement.__class__ is not FunctionStatement:
+                continue
+
+            for node in nestedFunctions(statement):
+                address: int = engine.get_global_value_address(node.name.value + PROFILE_SUFFIX)
+                if address == 0:
+                    continue
+
+                counters = (c_uint64 * 2).from_address(address)
+                functions[node.name.value] = FunctionProfile(node.name.value, counters[0], counters[1])
+
+        return cls(functions)
+    # endregion
+
+    # region files
+    @classmethod
+    def load(cls, path: str) -> "RuntimeProfile":
+        with open(path, "r") as f:
+            data: dict = json.load(f)
+
+        return cls({name: FunctionProfile(name, entry["calls"], entry["cycles"]) for name, entry in data["functions"].items()})
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.json(), f, indent=4)
+
+    def json(self) -> dict:
+        return {"functions": {name: {"calls": function.calls, "cycles": function.cycles} for name, function in self.functions.items()}}
+
+    def digest(self) -> str:
+        # what a compile that used the profile depends on
+        return hashlib.sha256(json.dumps(self.json(), sort_keys=True).encode()).hexdigest()
+    # endregion
+
+    # region optimization
+    def functionAttributes(self) -> dict[str, list[str]]:
+        # hot functions are worth inlining; cold ones stay out of line and out of the way
+        attributes: dict[str, list[str]] = {name: ["inlinehint"] for name in self.hot}
+        attributes.update((name, ["cold", "noinline"]) for name in self.cold)
+        return attributes
+
+    def order(self, program: Program) -> None:
+        # functions are emitted in program order, so sorting the top-level ones lays the hot code out together and the cold code last;
+        # a top-level function's rank is that of its hottest nested function
+        if any(statement.__class__ is not FunctionStatement for statement in program.statements):
+            return
+
+        def rank(statement: FunctionStatement) -> tuple[int, int]:
+            calls: list[int] = [self.functions[node.name.value].calls for node in nestedFunctions(statement) if node.name.value in self.functions]
+            hottest: int = max(calls, default=0)
+            return (0 if hottest > 0 else 1, -hottest)
+
+        program.statements.sort(key=rank)
+    # endregion
+
+    def table(self) -> str:
+        functions: list[FunctionProfile] = sorted(self.functions.values(), key=lambda function: -function.cycles)
+        totalCycles: int = max((function.cycles for function in functions), default=0)
+
+        lines: list[str] = ["=== RUNTIME PROFILE (cycles include callees) ==="]
+        lines.append(f"{'function':<24} {'calls':>12} {'cycles':>16} {'cycles/call':>12} {'share':>7}")
+        for function in functions:
+            perCall: str = f"{function.cycles / function.calls:.1f}" if function.calls > 0 else "-"
+            share: float = 100 * function.cycles / totalCycles if totalCycles > 0 else 0.0
+            tier: str = " hot" if function.name in self.hot else " cold" if function.name in self.cold else ""
+            lines.append(f"{function.name:<24} {function.calls:>12} {function.cycles:>16} {perCall:>12} {share:>6.1f}%{tier}")
+        return "\n".join(lines)
\ No newline at end of file
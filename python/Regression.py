@@ -0,0 +1,170 @@
+import main
+from Judge import compileSubmission, C_TYPES
+from Backend import Backend
+from Cache import CompilationCache
+from AST import Program
+from Lazy import LazyJIT, LazyJITError
+from VM import TieredJIT, VMError
+import contextlib
+import ctypes
+import io
+import json
+import math
+import os
+import tempfile
+
+import llvmlite.binding as llvm
+
+# regression programs: every case of the manifest compiled and run through main.py's pipeline under each configuration,
+# which all have to give the expected result or compile error
+MANIFEST_PATH: str = "../tests/regression.json"
+
+# main.py settings each configuration overrides for the whole run
+CONFIGURATIONS: dict[str, dict[str, object]] = {
+    "default": {},
+    # the two code generators have to agree on every result and every error
+    "llvmlite": {"TEXT_BACKEND": 0},
+    # and so do the AST optimizer's folding and the code it folds away
+    "unoptimized": {"OPTIMIZE_AST": 0},
+    # variables as SSA values and as stack slots, in both code generators
+    "stack slots": {"SSA_CODEGEN": 0},
+    "llvmlite stack slots": {"TEXT_BACKEND": 0, "SSA_CODEGEN": 0},
+    # functions compiled on their first call, interpreted by the VM throughout, and promoted from it after one call
+    "lazy": {"LAZY_JIT": 1},
+    "vm": {"TIERED_VM": 1, "TIER_THRESHOLD": 0},
+    "tiered": {"TIERED_VM": 1, "TIER_THRESHOLD": 1},
+    # the other frontends: the streaming lexer, the flat AST arena and hash-consed expressions
+    "stream lexer": {"STREAM_LEXER": 1},
+    "arena": {"ARENA_AST": 1},
+    "hash-consing": {"HASH_CONS": 1}
+}
+
+# settings that change the emitted code, each has to give the cached object a key of its own
+CACHE_SETTINGS: list[dict[str, object]] = [
+    {"OPTIMIZE_AST": 0},
+    {"SSA_CODEGEN": 0},
+    {"HASH_CONS": 1},
+    {"TEXT_BACKEND": 0},
+    {"ARENA_AST": 1},
+    {"RUNTIME_PROFILE": 1},
+    {"debugFile": "/tmp/program.cpl"}
+]
+
+def configure(settings: dict[str, object]) -> dict[str, object]:
+    # returns what the settings replaced
+    previous: dict[str, object] = {name: getattr(main, name) for name in settings}
+    for name, value in settings.items():
+        setattr(main, name, value)
+    return previous
+
+def same(result: int | float, expected: int | float) -> bool:
+    # NaN only ever equals another NaN here
+    if isinstance(result, float) and isinstance(expected, float) and math.isnan(result) and math.isnan(expected):
+        return True
+    return result == expected
+
+def number(value: int | float | str) -> int | float:
+    # JSON has no infinities or NaN, the manifest spells them as strings
+    return float(value) if isinstance(value, str) else value
+
+def runNative(path: str, entry: str, arguments: list, backend: Backend) -> tuple[int | float | None, str]:
+    # (what entry returned, compiler output)
+    objects, functions, message = compileSubmission(path, backend)
+    if objects is None:
+        return None, message
+
+    # the engine owns the code, it has to outlive the call
+    engine: llvm.ExecutionEngine = backend.loadObjects(objects)
+    returnType, parameterTypes = functions[entry]
+    function = ctypes.CFUNCTYPE(C_TYPES[returnType], *(C_TYPES[Type] for Type in parameterTypes))(engine.get_function_address(entry))
+    return function(*arguments), ""
+
+def runLazy(path: str, entry: str, arguments: list, backend: Backend) -> tuple[int | float | None, str]:
+    # the lazy and tiered paths of main.py, which fall back to the whole-program build on programs they can't split
+    main.SOURCE_PATH = path
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        try:
+            program: Program = main.parseSource()
+            main.optimizeProgram(program)
+        except SystemExit:
+            return None, output.getvalue().strip()
+
+    lazy: LazyJIT = TieredJIT(backend, main.createCompiler, main.TIER_THRESHOLD) if main.TIERED_VM else LazyJIT(backend, main.createCompiler)
+    if not lazy.load(program, hashCons=main.HASH_CONS):
+        if len(lazy.errors) > 0:
+            return None, "\n".join(lazy.errors)
+        return runNative(path, entry, arguments, backend)
+
+    try:
+        return lazy.run(entry, tuple(arguments)), ""
+    except (VMError, LazyJITError) as error:
+        return None, str(error)
+
+def check(case: dict, result: int | float | None, message: str) -> str | None:
+    # what went wrong, None if nothing did
+    if "error" in case:
+        if result is not None:
+            return f"expected the compile error \"{case['error']}\", returned {result}"
+        if case["error"] not in message:
+            return f"expected the compile error \"{case['error']}\", got: {message}"
+        return None
+
+    if result is None:
+        return f"expected {case['returns']}, didn't compile: {message}"
+    if not same(result, number(case["returns"])):
+        return f"expected {case['returns']}, returned {result}"
+    return None
+
+def checkCacheKeys(backend: Backend) -> list[str]:
+    # the object cached under one setting must never be loaded under another
+    def backendKey() -> str:
+        return cache.backendKey("source", main.OPT_LEVEL, backend.triple, backend.cpu, backend.features, main.codegenOptions())
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache: CompilationCache = CompilationCache(directory)
+        default: str = backendKey()
+        if backendKey() != default:
+            return ["the same settings gave two cache keys"]
+
+        problems: list[str] = []
+        for settings in CACHE_SETTINGS:
+            previous: dict[str, object] = configure(settings)
+            if backendKey() == default:
+                problems.append(f"cache key ignores {', '.join(f'{name} = {value}' for name, value in settings.items())}")
+            configure(previous)
+        return problems
+
+def loadCases(path: str) -> list[dict]:
+    with open(path, "r") as f:
+        cases: list[dict] = json.load(f)["cases"]
+
+    directory: str = os.path.dirname(os.path.abspath(path))
+    for case in cases:
+        case["source"] = os.path.join(directory, case["source"])
+        case.setdefault("entry", "mn")
+        case["arguments"] = [number(argument) for argument in case.get("arguments", [])]
+    return cases
+
+if __name__ == '__main__':
+    cases: list[dict] = loadCases(MANIFEST_PATH)
+
+    failures: list[str] = []
+    for configuration, settings in CONFIGURATIONS.items():
+        previous: dict[str, object] = configure(settings)
+        backend: Backend = Backend(optLevel=main.OPT_LEVEL, hostCPU=main.HOST_CPU)
+
+        for case in cases:
+            run: callable = runLazy if main.LAZY_JIT or main.TIERED_VM else runNative
+            result, message = run(case["source"], case["entry"], case["arguments"], backend)
+            problem: str | None = check(case, result, message)
+            if problem is not None:
+                failures.append(f"{os.path.basename(case['source'])} ({configuration}): {problem}")
+
+        configure(previous)
+
+    failures.extend(checkCacheKeys(Backend(optLevel=main.OPT_LEVEL, hostCPU=main.HOST_CPU)))
+
+    print(f"=== REGRESSION ({len(cases)} cases x {len(CONFIGURATIONS)} configurations) ===")
+    print("\n".join(failures) if len(failures) > 0 else "all passed")
+
+    exit(1 if len(failures) > 0 else 0)
\ No newline at end of file
@@ -0,0 +1,166 @@
+from AST import Program, Statement, Expression, ExpressionStatement, InfixExpression, CallExpression
+from AST import ShallStatement, IdentifierLiteral, BlockStatement, FunctionStatement, ReturnStatement, AssignStatement
+
+# symbol kinds
+VARIABLE: int = 0
+FUNCTION: int = 1
+
+class Symbol:
+    # depth and index place the symbol in its scope; id is its slot in the program-wide symbol table
+    __slots__ = ("name", "kind", "depth", "index", "id")
+
+    def __init__(self, name: str, kind: int, depth: int, index: int, id: int) -> None:
+        self.name: str = name
+        self.kind: int = kind
+        self.depth: int = depth
+        self.index: int = index
+        self.id: int = id
+
+    def __repr__(self) -> str:
+        return f"Symbol({self.name}, depth={self.depth}, index={self.index})"
+
+class Scope:
+    __slots__ = ("parent", "depth", "records", "slots")
+
+    def __init__(self, parent: "Scope | None" = None) -> None:
+        self.parent: Scope | None = parent
+        self.depth: int = parent.depth + 1 if parent is not None else 0
+        self.records: dict[str, Symbol] = {}
+        self.slots: list[Symbol] = []
+
+class Resolver:
+    def __init__(self) -> None:
+        self.errors: list[str] = []
+
+        # every symbol of the program, indexed by Symbol.id
+        self.symbols: list[Symbol] = []
+
+        self.scope: Scope = Scope()
+
+    def resolve(self, program: Program) -> Program:
+        # top-level functions are visible everywhere, so calls may precede the definition
+        for statement in program.statements:
+            if statement.__class__ is FunctionStatement:
+                self.declareFunction(statement)
+
+        for statement in program.statements:
+            self.resolveStatement(statement)
+
+        program.symbols = self.symbols
+        return program
+
+    # region scopes
+    def declare(self, name: str, kind: int) -> Symbol:
+        scope: Scope = self.scope
+        symbol: Symbol = Symbol(name, kind, scope.depth, len(scope.slots), len(self.symbols))
+
+        scope.records[name] = symbol
+        scope.slots.append(symbol)
+        self.symbols.append(symbol)
+        return symbol
+
+    def declareFunction(self, node: FunctionStatement) -> None:
+        name: str = node.name.value
+
+        # a second definition in the same scope shares the symbol, the Compiler reports the duplicate
+        existing: Symbol | None = self.scope.records.get(name)
+        if existing is None or existing.kind != FUNCTION:
+            existing = self.declare(name, FUNCTION)
+
+        node.name.symbol = existing
+
+    def lookup(self, name: str) -> Symbol | None:
+        scope: Scope | None = self.scope
+        while scope is not None:
+            symbol: Symbol | None = scope.records.get(name)
+            if symbol is not None:
+                return symbol
+            scope = scope.parent
+        return None
+
+    def lookupVariable(self, name: str) -> Symbol | None:
+        symbol: Symbol | None = self.lookup(name)
+
+        if symbol is None:
+            self.errors.append(f"~~~ COMPILE ERROR: Identifier {name} wasn't declared previously.")
+        elif symbol.kind == FUNCTION:
+            self.errors.append(f"~~~ COMPILE ERROR: Function {name} can't be used as a value.")
+            return None
+        elif symbol.depth != self.scope.depth:
+            # every function has its own frame, variables of an enclosing function are out of reach
+            self.errors.append(f"~~~ COMPILE ERROR: Identifier {name} belongs to an enclosing function.")
+            return None
+
+        return symbol
+
+    def lookupFunction(self, name: str) -> Symbol | None:
+        symbol: Symbol | None = self.lookup(name)
+
+        if symbol is None:
+            self.errors.append(f"~~~ COMPILE ERROR: Identifier {name} wasn't declared previously.")
+        elif symbol.kind != FUNCTION:
+            self.errors.append(f"~~~ COMPILE ERROR: {name} is not a function.")
+            return None
+
+        return symbol
+    # endregion
+
+    def resolveStatement(self, statement: Statement | None) -> None:
+        statementClass: type = statement.__class__
+
+        if statementClass is ShallStatement:
+            self.resolveExpression(statement.value)
+
+            # redeclaring a variable of this scope reuses its slot
+            name: str = statement.name.value
+            symbol: Symbol | None = self.scope.records.get(name)
+            if symbol is None or symbol.kind != VARIABLE:
+                symbol = self.declare(name, VARIABLE)
+
+            statement.name.symbol = symbol
+        elif statementClass is AssignStatement:
+            self.resolveExpression(statement.rightValue)
+            statement.ident.symbol = self.lookupVariable(statement.ident.value)
+        elif statementClass is ReturnStatement:
+            self.resolveExpression(statement.returnValue)
+        elif statementClass is ExpressionStatement:
+            self.resolveExpression(statement.expression)
+        elif statementClass is BlockStatement:
+            for inner in statement.statements:
+                self.resolveStatement(inner)
+        elif statementClass is FunctionStatement:
+            self.resolveFunction(statement)
+
+    def resolveFunction(self, node: FunctionStatement) -> None:
+        # nested functions become visible at their definition, top-level ones were declared up front
+        if self.scope.depth > 0:
+            self.declareFunction(node)
+
+        self.scope = Scope(parent=self.scope)
+
+        for parameter in node.parameters:
+            parameter.symbol = self.declare(parameter.value, VARIABLE)
+
+        if node.body is not None:
+            self.resolveStatement(node.body)
+
+        self.scope = self.scope.parent
+
+    def resolveExpression(self, node: Expression | None) -> None:
+        stack: list[Expression | None] = [node]
+
+        while len(stack) > 0:
+            current: Expression | None = stack.pop()
+            currentClass: type = current.__class__
+
+            if currentClass is InfixExpression:
+                stack.append(current.rightNode)
+                stack.append(current.leftNode)
+            elif currentClass is CallExpression:
+                if current.function.__class__ is IdentifierLiteral:
+                    current.function.symbol = self.lookupFunction(current.function.value)
+                else:
+                    self.errors.append("~~~ COMPILE ERROR: Only functions can be called.")
+                stack.extend(reversed(current.arguments))
+            elif currentClass is IdentifierLiteral:
+                current.symbol = self.lookupVariable(current.value)
\ No newline at end of file
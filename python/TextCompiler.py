@@ -0,0 +1,526 @@
+import os
+import re
+import struct
+
+from AST import Node, Program, Expression, ExpressionStatement, InfixExpression, IntegerLiteral, DoubleLiteral, CallExpression
+from AST import ShallStatement, IdentifierLiteral, BlockStatement, FunctionStatement, ReturnStatement, AssignStatement
+
+from Arena import NONE
+from Resolver import Resolver, Symbol
+from Compiler import slotOf, DEBUG_TYPES
+
+# instruction per (operator, type), mirroring Compiler.emitInfix
+INFIX_INSTRUCTIONS: dict[tuple[str, str], str] = {
+    ("+", "i32"): "add",
+    ("-", "i32"): "sub",
+    ("*", "i32"): "mul",
+    ("/", "i32"): "sdiv",
+    ("%", "i32"): "srem",
+    ("+", "double"): "fadd",
+    ("-", "double"): "fsub",
+    ("*", "double"): "fmul",
+    ("/", "double"): "fdiv",
+    ("%", "double"): "frem"
+}
+
+SIMPLE_IDENTIFIER: re.Pattern = re.compile(r"[-a-zA-Z$._][-a-zA-Z$._0-9]*$")
+
+def formatDouble(value: float) -> str:
+    # LLVM's exact form for doubles: the IEEE bit pattern in hex
+    return f"0x{struct.unpack('<Q', struct.pack('<d', value))[0]:016x}"
+
+def quoteName(name: str) -> str:
+    # llvmlite always quotes value names and escapes only backslashes and quotes
+    return '"' + name.replace("\\", "\\5c").replace('"', "\\22") + '"'
+
+def formatLabel(name: str) -> str:
+    return name if SIMPLE_IDENTIFIER.match(name) else quoteName(name)
+
+class TextFunction:
+    __slots__ = ("name", "returnType", "paramTypes", "attributes", "header", "allocas", "body", "counter", "names")
+
+    def __init__(self, name: str, returnType: str, paramTypes: list[str]) -> None:
+        self.name: str = name
+        self.returnType: str = returnType
+        self.paramTypes: list[str] = paramTypes
+        self.attributes: list[str] = []
+
+        # text is written as the walk goes; allocas are kept apart so they end up at the top of the entry block
+        self.header: str | None = None
+        self.allocas: list[str] = []
+        self.body: list[str] = []
+
+        self.counter: int = 0
+        self.names: set[str] = set()
+
+    def isDeclaration(self) -> bool:
+        return self.header is None
+
+    def isTerminated(self) -> bool:
+        return len(self.body) > 0 and self.body[-1].startswith("  ret ")
+
+    def text(self) -> str:
+        if self.header is None:
+            return f"declare {self.returnType} @{quoteName(self.name)}({', '.join(self.paramTypes)})"
+        return "\n".join([self.header, *self.allocas, *self.body, "}"])
+
+class TextModule:
+    # quacks like ir.Module as far as Backend is concerned: triple, data_layout and str()
+    def __init__(self, name: str = "main") -> None:
+        self.name: str = name
+        self.triple: str = "unknown-unknown-unknown"
+        self.data_layout: str = ""
+
+        self.globals: list[str] = []
+        self.functions: dict[str, TextFunction] = {}
+
+        # numbered metadata nodes, identical ones shared like llvmlite does, and the named lists that refer to them
+        self.metadata: list[str] = []
+        self.metadataIndex: dict[str, str] = {}
+        self.namedMetadata: dict[str, list[str]] = {}
+
+    def addMetadata(self, text: str, distinct: bool = False) -> str:
+        reference: str | None = None if distinct else self.metadataIndex.get(text)
+        if reference is None:
+            reference = f"!{len(self.metadata)}"
+            self.metadata.append(f"{reference} = {'distinct ' if distinct else ''}{text}")
+            if not distinct:
+                self.metadataIndex[text] = reference
+        return reference
+
+    def __str__(self) -> str:
+        lines: list[str] = [f'; ModuleID = "{self.name}"', f'target triple = "{self.triple}"', f'target datalayout = "{self.data_layout}"', ""]
+        lines.extend(self.globals)
+        lines.extend(function.text() + "\n" for function in self.functions.values())
+        lines.extend(f"!{name} = !{{{', '.join(references)}}}" for name, references in self.namedMetadata.items())
+        lines.extend(self.metadata)
+        return "\n".join(lines)
+
+class TextCompiler:
+    def __init__(self, cse: bool = False, ssa: bool = False, instrument: bool = False, functionAttributes: dict[str, list[str]] | None = None,
+                 debugFile: str | None = None) -> None:
+        self.typeMap: dict[str, str] = {
+            "int": "i32",
+            "double": "double"
+        }
+
+        self.module: TextModule = TextModule("main")
+
+        self.errors: list[str] = []
+
+        # per resolved symbol: (pointer, type) for variables, or (value, type) with ssa on; (function, return type) for functions
+        self.slots: list[tuple[str | TextFunction, str] | None] = []
+
+        self.function: TextFunction | None = None
+
+        self.visitors: dict[type, callable] = {
+            Program: self.visitProgram,
+
+            # statements
+            ExpressionStatement: self.visitExpressionStatement,
+            ShallStatement: self.visitShallStatement,
+            FunctionStatement: self.visitFunctionStatement,
+            BlockStatement: self.visitBlockStatement,
+            ReturnStatement: self.visitReturnStatement,
+            AssignStatement: self.visitAssignStatement,
+
+            # expressions
+            InfixExpression: self.emitExpression,
+            CallExpression: self.emitExpression
+        }
+
+        # same block-local reuse as Compiler
+        self.cse: bool = cse
+        self.valueCache: dict[Expression, tuple[str, str, frozenset[int]]] = {}
+        self.cacheUsers: dict[int, list[Expression]] = {}
+
+        # there is no control flow, so every function is one block and a variable's current value is simply its slot
+        self.ssa: bool = ssa
+
+        # the same profiling counters as Compiler: the current function's global and the cycle count at its entry
+        self.instrument: bool = instrument
+        self.profileCounters: str | None = None
+        self.cycleStart: str | None = None
+
+        self.functionAttributes: dict[str, list[str]] = functionAttributes if functionAttributes is not None else {}
+
+        # the same debug info as Compiler; location is the suffix every emitted instruction gets, empty without one
+        self.debugFile: str | None = None
+        self.debugUnit: str | None = None
+        self.debugScope: str | None = None
+        self.location: str = ""
+        if debugFile is not None:
+            self.startDebugInfo(debugFile)
+
+    def compile(self, node: Node) -> None:
+        visitor: callable | None = self.visitors.get(node.__class__)
+        if visitor is not None:
+            visitor(node)
+
+    # region visit methods
+    def visitProgram(self, node: Program) -> None:
+        if node.symbols is None:
+            resolver: Resolver = Resolver()
+            resolver.resolve(node)
+            self.errors.extend(resolver.errors)
+
+        self.slots = [None] * len(node.symbols)
+
+        for statement in node.statements:
+            if statement.__class__ is FunctionStatement:
+                self.declareFunction(statement.name.value, slotOf(statement.name.symbol), statement.returnType, self.parameterList(statement))
+
+        for statement in node.statements:
+            self.compile(statement)
+
+    def compileUnit(self, node: FunctionStatement, symbols: list[Symbol], externals: list[FunctionStatement]) -> None:
+        # one resolved top-level function on its own; the functions it calls are only declared, another module defines them
+        self.slots = [None] * len(symbols)
+
+        for external in externals:
+            self.declareFunction(external.name.value, slotOf(external.name.symbol), external.returnType, self.parameterList(external))
+
+        self.compile(node)
+
+    def visitExpressionStatement(self, node: ExpressionStatement) -> None:
+        self.compile(node.expression)
+
+    def visitShallStatement(self, node: ShallStatement) -> None:
+        value, Type = self.emitExpression(node.value)
+        self.declareVariable(slotOf(node.name.symbol), value, Type)
+
+    def visitBlockStatement(self, node: BlockStatement) -> None:
+        for statement in node.statements:
+            # whatever follows a return is unreachable, the TypeChecker has still seen it
+            if self.function.isTerminated():
+                break
+            self.locate(statement.line)
+            self.compile(statement)
+
+    def visitReturnStatement(self, node: ReturnStatement) -> None:
+        value, Type = self.emitExpression(node.returnValue)
+        self.emitReturn(value, Type)
+
+    def visitFunctionStatement(self, node: FunctionStatement) -> None:
+        outerScope = self.beginFunction(node.name.value, slotOf(node.name.symbol), node.returnType, self.parameterList(node), node.line)
+
+        self.compile(node.body)
+
+        self.endFunction(outerScope)
+
+    def visitAssignStatement(self, node: AssignStatement) -> None:
+        value, Type = self.emitExpression(node.rightValue)
+        self.assignVariable(slotOf(node.ident.symbol), value, Type)
+    # endregion
+
+    # region expressions
+    def emitExpression(self, node: Expression) -> tuple[str, str]:
+        # the same explicit-stack post-order walk as Compiler.emitExpression, producing (operand text, type) pairs
+        values: list[tuple[str, str]] = []
+        stack: list[tuple[Expression, bool]] = [(node, False)]
+
+        cse: bool = self.cse
+        reads: list[frozenset[int]] = []
+
+        while len(stack) > 0:
+            current, visited = stack.pop()
+            currentClass: type = current.__class__
+
+            if visited:
+                if currentClass is CallExpression:
+                    count: int = len(current.arguments)
+                    arguments: list[tuple[str, str]] = values[len(values) - count:]
+                    del values[len(values) - count:]
+
+                    callee: int = slotOf(current.function.symbol) if current.function.__class__ is IdentifierLiteral else NONE
+                    value, Type = self.emitCall(callee, arguments)
+
+                    if cse:
+                        nodeReads: frozenset[int] = frozenset().union(*reads[len(reads) - count:])
+                        del reads[len(reads) - count:]
+                else:
+                    rightValue, rightType = values.pop()
+                    leftValue, leftType = values.pop()
+                    value, Type = self.emitInfix(current.operator, leftValue, leftType, rightValue, rightType)
+
+                    if cse:
+                        rightReads: frozenset[int] = reads.pop()
+                        nodeReads = reads.pop() | rightReads
+
+                values.append((value, Type))
+
+                if cse:
+                    reads.append(nodeReads)
+                    self.cacheValue(current, value, Type, nodeReads)
+            elif currentClass is InfixExpression or currentClass is CallExpression:
+                cached: tuple[str, str, frozenset[int]] | None = self.valueCache.get(current) if cse else None
+                if cached is not None:
+                    values.append((cached[0], cached[1]))
+                    reads.append(cached[2])
+                    continue
+
+                stack.append((current, True))
+                if currentClass is CallExpression:
+                    for argument in reversed(current.arguments):
+                        stack.append((argument, False))
+                else:
+                    stack.append((current.rightNode, False))
+                    stack.append((current.leftNode, False))
+            elif currentClass is IntegerLiteral:
+                values.append((str(current.value), "i32"))
+                if cse:
+                    reads.append(frozenset())
+            elif currentClass is DoubleLiteral:
+                values.append((formatDouble(current.value), "double"))
+                if cse:
+                    reads.append(frozenset())
+            else:
+                slot: int = slotOf(current.symbol)
+                cached = self.valueCache.get(current) if cse else None
+                if cached is not None:
+                    values.append((cached[0], cached[1]))
+                else:
+                    value, Type = self.loadVariable(slot)
+                    values.append((value, Type))
+                    if cse:
+                        self.cacheValue(current, value, Type, frozenset((slot,)))
+                if cse:
+                    reads.append(frozenset((slot,)))
+
+        return values.pop()
+
+    def emitInfix(self, operator: str, leftValue: str, leftType: str, rightValue: str, rightType: str) -> tuple[str, str]:
+        instruction: str | None = INFIX_INSTRUCTIONS.get((operator, leftType)) if leftType == rightType else None
+        if instruction is None:
+            # the placeholder never reaches LLVM, every caller stops on the errors first
+            self.errors.append(f"~~~ COMPILE ERROR: Operator {operator} can't be applied to {leftType} and {rightType}.")
+            return "undef", leftType
+
+        return self.emitValue(f"{instruction} {leftType} {leftValue}, {rightValue}"), leftType
+
+    def emitCall(self, slot: int, arguments: list[tuple[str, str]]) -> tuple[str, str]:
+        record: tuple[TextFunction, str] | None = self.slots[slot] if slot != NONE else None
+        if record is None:
+            return "undef", "i32"
+
+        function, returnType = record
+        if [Type for _, Type in arguments] != function.paramTypes:
+            self.errors.append(f"~~~ COMPILE ERROR: Function {function.name} called with the wrong arguments.")
+            return "undef", returnType
+
+        argumentList: str = ", ".join(f"{Type} {value}" for value, Type in arguments)
+        return self.emitValue(f"call {returnType} @{quoteName(function.name)}({argumentList})"), returnType
+    # endregion
+
+    # region helpers
+    def emit(self, instruction: str) -> None:
+        # void instructions take a number as well, so the numbering stays the same as llvmlite's
+        self.function.counter += 1
+        self.function.body.append(f"  {instruction}{self.location}")
+
+    def emitValue(self, instruction: str) -> str:
+        value: str = self.newValue()
+        self.function.body.append(f"  {value} = {instruction}{self.location}")
+        return value
+
+    def newValue(self) -> str:
+        self.function.counter += 1
+        return f'%".{self.function.counter}"'
+
+    def parameterList(self, node: FunctionStatement) -> list[tuple[str, str, int]]:
+        return [(par.value, par.valueType, slotOf(par.symbol)) for par in node.parameters]
+
+    def declareFunction(self, name: str, slot: int, returnTypeName: str, parameters: list[tuple[str, str, int]]) -> TextFunction:
+        record: tuple[TextFunction, str] | None = self.slots[slot] if slot != NONE else None
+        if record is not None and record[0].isDeclaration():
+            return record[0]
+
+        if name in self.module.functions:
+            self.errors.append(f"~~~ COMPILE ERROR: Function {name} was already defined.")
+            suffix: int = 1
+            while f"{name}.{suffix}" in self.module.functions:
+                suffix += 1
+            name = f"{name}.{suffix}"
+
+        returnType: str = self.typeMap[returnTypeName]
+        function: TextFunction = TextFunction(name, returnType, [self.typeMap[typeName] for _, typeName, _ in parameters])
+        function.attributes = self.functionAttributes.get(name, [])
+        self.module.functions[name] = function
+
+        if record is None and slot != NONE:
+            self.slots[slot] = (function, returnType)
+
+        return function
+
+    def beginFunction(self, name: str, slot: int, returnTypeName: str, parameters: list[tuple[str, str, int]], line: int = 0) -> tuple:
+        function: TextFunction = self.declareFunction(name, slot, returnTypeName, parameters)
+
+        outerScope: tuple = (self.function, self.valueCache, self.cacheUsers, self.profileCounters, self.cycleStart, self.debugScope, self.location)
+        self.function = function
+        self.valueCache = {}
+        self.cacheUsers = {}
+
+        # llvmlite numbers the return value and the arguments before the first instruction
+        function.counter = 1 + len(parameters)
+
+        label: str = f"{name}_entry"
+        function.names.add(label)
+
+        arguments: list[str] = []
+        for paramName, _ in zip((parameter[0] for parameter in parameters), function.paramTypes):
+            # repeated parameter names get the same .N suffixes llvmlite would give them
+            unique: str = paramName
+            suffix: int = 0
+            while unique in function.names:
+                suffix += 1
+                unique = f"{paramName}.{suffix}"
+            function.names.add(unique)
+            arguments.append(f"%{quoteName(unique)}")
+
+        parameterList: str = ", ".join(f"{Type} {argument}" for Type, argument in zip(function.paramTypes, arguments))
+        attributes: str = "".join(f" {attribute}" for attribute in function.attributes)
+
+        if self.debugUnit is not None:
+            self.debugScope = self.subprogram(function, returnTypeName, parameters, line)
+            attributes += f" !dbg {self.debugScope}"
+            self.locate(line)
+
+        function.header = f"define {function.returnType} @{quoteName(function.name)}({parameterList}){attributes}\n{{\n{formatLabel(label)}:"
+
+        if self.instrument:
+            self.profileEntry(function)
+
+        for (_, _, paramSlot), Type, argument in zip(parameters, function.paramTypes, arguments):
+            self.declareVariable(paramSlot, argument, Type)
+
+        return outerScope
+
+    def endFunction(self, outerScope: tuple) -> None:
+        if not self.function.isTerminated():
+            self.errors.append(f"~~~ COMPILE ERROR: Function {self.function.name} ended without returning a value.")
+
+        self.function, self.valueCache, self.cacheUsers, self.profileCounters, self.cycleStart, self.debugScope, self.location = outerScope
+
+    def emitReturn(self, value: str, Type: str) -> None:
+        if Type != self.function.returnType:
+            # caught here, not by the IR parser, which only sees a lazily compiled function on its first call
+            self.errors.append(f"~~~ COMPILE ERROR: Function {self.function.name} returns {self.function.returnType}, not {Type}.")
+            value, Type = "undef", self.function.returnType
+
+        if self.instrument:
+            self.profileExit()
+        self.emit(f"ret {Type} {value}")
+
+    def profileEntry(self, function: TextFunction) -> None:
+        # calls += 1, then remember the cycle counter for the returns
+        self.profileCounters = "@" + quoteName(function.name + ".profile")
+        self.module.globals.append(f"{self.profileCounters} = global {{i64, i64}} zeroinitializer")
+
+        callsPointer: str = self.emitValue(f"getelementptr {{i64, i64}}, {{i64, i64}}* {self.profileCounters}, i32 0, i32 0")
+        calls: str = self.emitValue(f"load i64, i64* {callsPointer}")
+        incremented: str = self.emitValue(f"add i64 {calls}, 1")
+        self.emit(f"store i64 {incremented}, i64* {callsPointer}")
+
+        self.cycleStart = self.emitValue(f"call i64 @{self.cycleCounter()}()")
+
+    def profileExit(self) -> None:
+        # cycles += now - start
+        now: str = self.emitValue(f"call i64 @{self.cycleCounter()}()")
+        elapsed: str = self.emitValue(f"sub i64 {now}, {self.cycleStart}")
+
+        cyclesPointer: str = self.emitValue(f"getelementptr {{i64, i64}}, {{i64, i64}}* {self.profileCounters}, i32 0, i32 1")
+        cycles: str = self.emitValue(f"load i64, i64* {cyclesPointer}")
+        total: str = self.emitValue(f"add i64 {cycles}, {elapsed}")
+        self.emit(f"store i64 {total}, i64* {cyclesPointer}")
+
+    def startDebugInfo(self, path: str) -> None:
+        path = os.path.abspath(path)
+        self.debugFile = self.module.addMetadata(f"!DIFile(filename: {quoteName(os.path.basename(path))}, directory: {quoteName(os.path.dirname(path))})")
+        self.debugUnit = self.module.addMetadata(f'!DICompileUnit(language: DW_LANG_C, file: {self.debugFile}, producer: "cpl", isOptimized: true, '
+                                                 f'runtimeVersion: 0, emissionKind: FullDebug)', distinct=True)
+        self.module.namedMetadata["llvm.dbg.cu"] = [self.debugUnit]
+        self.module.namedMetadata["llvm.module.flags"] = [
+            self.module.addMetadata('!{i32 7, !"Dwarf Version", i32 4}'),
+            self.module.addMetadata('!{i32 2, !"Debug Info Version", i32 3}')
+        ]
+
+    def subprogram(self, function: TextFunction, returnTypeName: str, parameters: list[tuple[str, str, int]], line: int) -> str:
+        types: list[str] = [self.debugType(typeName) for typeName in [returnTypeName, *(typeName for _, typeName, _ in parameters)]]
+        typeList: str = self.module.addMetadata("!{" + ", ".join(types) + "}")
+        subroutineType: str = self.module.addMetadata(f"!DISubroutineType(types: {typeList})")
+
+        return self.module.addMetadata(f"!DISubprogram(name: {quoteName(function.name)}, scope: {self.debugFile}, file: {self.debugFile}, line: {line}, "
+                                       f"type: {subroutineType}, scopeLine: {line}, spFlags: DISPFlagDefinition | DISPFlagOptimized, "
+                                       f"unit: {self.debugUnit})", distinct=True)
+
+    def debugType(self, typeName: str) -> str:
+        size, encoding = DEBUG_TYPES[typeName]
+        return self.module.addMetadata(f"!DIBasicType(name: {quoteName(typeName)}, size: {size}, encoding: {encoding})")
+
+    def locate(self, line: int) -> None:
+        if self.debugScope is not None and line > 0:
+            self.location = f", !dbg {self.module.addMetadata(f'!DILocation(line: {line}, column: 0, scope: {self.debugScope})')}"
+
+    def cycleCounter(self) -> str:
+        name: str = "llvm.readcyclecounter"
+        if name not in self.module.functions:
+            self.module.functions[name] = TextFunction(name, "i64", [])
+        return quoteName(name)
+
+    def declareVariable(self, slot: int, value: str, Type: str) -> None:
+        if slot == NONE:
+            return
+
+        record: tuple[str, str] | None = self.slots[slot]
+        if record is not None and Type != record[1]:
+            self.errors.append(f"~~~ COMPILE ERROR: A {Type} can't be assigned to a variable of type {record[1]}.")
+            return
+
+        if self.ssa:
+            self.slots[slot] = (value, Type)
+        elif record is None:
+            pointer: str = self.newValue()
+            self.function.allocas.append(f"  {pointer} = alloca {Type}")
+            self.emit(f"store {Type} {value}, {Type}* {pointer}")
+            self.slots[slot] = (pointer, Type)
+        else:
+            self.emit(f"store {Type} {value}, {record[1]}* {record[0]}")
+
+        self.invalidate(slot)
+
+    def assignVariable(self, slot: int, value: str, Type: str) -> None:
+        if slot == NONE or self.slots[slot] is None:
+            return
+
+        if Type != self.slots[slot][1]:
+            self.errors.append(f"~~~ COMPILE ERROR: A {Type} can't be assigned to a variable of type {self.slots[slot][1]}.")
+            return
+
+        if self.ssa:
+            self.slots[slot] = (value, Type)
+        else:
+            pointer, pointerType = self.slots[slot]
+            self.emit(f"store {Type} {value}, {pointerType}* {pointer}")
+
+        self.invalidate(slot)
+
+    def loadVariable(self, slot: int) -> tuple[str, str]:
+        record: tuple[str, str] | None = self.slots[slot] if slot != NONE else None
+        if record is None:
+            return "undef", "i32"
+
+        if self.ssa:
+            return record
+
+        pointer, Type = record
+        return self.emitValue(f"load {Type}, {Type}* {pointer}"), Type
+
+    def cacheValue(self, node: Expression, value: str, Type: str, reads: frozenset[int]) -> None:
+        self.valueCache[node] = (value, Type, reads)
+        for slot in reads:
+            self.cacheUsers.setdefault(slot, []).append(node)
+
+    def invalidate(self, slot: int) -> None:
+        for node in self.cacheUsers.pop(slot, ()):
+            self.valueCache.pop(node, None)
+    # endregion
\ No newline at end of file
@@ -80,4 +80,15 @@ def lookupIdentifier(identifier: str) -> TokenType:
     if identifier in TYPE_KEYWORDS:
         return TokenType.TYPE
     
-    return TokenType.IDENTIFIER
\ No newline at end of file
+    return TokenType.IDENTIFIER
+
+# small-integer token kinds, indices into TOKEN_KINDS
+TOKEN_KINDS: list[TokenType] = list(TokenType)
+KIND_OF: dict[TokenType, int] = {tokenType: kind for kind, tokenType in enumerate(TOKEN_KINDS)}
+
+# identifier spellings that lex to something other than IDENTIFIER, with the same priority as lookupIdentifier
+IDENTIFIER_KINDS: dict[str, int] = {
+    **{identifier: KIND_OF[TokenType.TYPE] for identifier in TYPE_KEYWORDS},
+    **{identifier: KIND_OF[tokenType] for identifier, tokenType in ALTERNATIVE_KEYWORDS.items()},
+    **{identifier: KIND_OF[tokenType] for identifier, tokenType in KEYWORRDS.items()}
+}
\ No newline at end of file
@@ -0,0 +1,129 @@
+from AST import Program, Statement, Expression, ExpressionStatement, InfixExpression, IntegerLiteral, DoubleLiteral, CallExpression
+from AST import ShallStatement, IdentifierLiteral, BlockStatement, FunctionStatement, ReturnStatement, AssignStatement
+from Resolver import Symbol
+
+# the names the code generators give the types in their errors
+IR_NAMES: dict[str, str] = {
+    "int": "i32",
+    "double": "double"
+}
+
+class TypeChecker:
+    # every error the code generators would report, found on the resolved program before the AST optimizer
+    # gets to drop the code that holds them; unreachable statements are checked like any other
+    def __init__(self) -> None:
+        self.errors: list[str] = []
+
+        # variables by symbol, a redeclaration keeps the type of the first declaration
+        self.types: dict[Symbol, str] = {}
+
+        # functions by symbol, a repeated definition shares the symbol and its calls go to the first one
+        self.functions: dict[Symbol, FunctionStatement] = {}
+        self.names: set[str] = set()
+
+    def check(self, program: Program) -> Program:
+        # top-level functions are declared up front, nested ones at their definition
+        for statement in program.statements:
+            if statement.__class__ is FunctionStatement:
+                self.functions.setdefault(statement.name.symbol, statement)
+
+        for statement in program.statements:
+            if statement.__class__ is FunctionStatement:
+                self.checkFunction(statement)
+
+        return program
+
+    def checkFunction(self, node: FunctionStatement) -> None:
+        # the code generators share one module, so function names are unique across the program
+        if node.name.value in self.names:
+            self.errors.append(f"~~~ COMPILE ERROR: Function {node.name.value} was already defined.")
+        self.names.add(node.name.value)
+        self.functions.setdefault(node.name.symbol, node)
+
+        for parameter in node.parameters:
+            self.types[parameter.symbol] = parameter.valueType
+
+        returns: bool = False
+        for statement in node.body.statements:
+            self.checkStatement(statement, node)
+            returns = returns or statement.__class__ is ReturnStatement
+
+        if not returns:
+            self.errors.append(f"~~~ COMPILE ERROR: Function {node.name.value} ended without returning a value.")
+
+    def checkStatement(self, statement: Statement | None, function: FunctionStatement) -> None:
+        statementClass: type = statement.__class__
+
+        if statementClass is ShallStatement or statementClass is AssignStatement:
+            isShall: bool = statementClass is ShallStatement
+            Type: str | None = self.typeOf(statement.value if isShall else statement.rightValue)
+            symbol: Symbol = statement.name.symbol if isShall else statement.ident.symbol
+
+            current: str | None = self.types.get(symbol)
+            if current is None and isShall:
+                self.types[symbol] = Type
+            elif current is not None and Type is not None and Type != current:
+                self.errors.append(f"~~~ COMPILE ERROR: A {IR_NAMES[Type]} can't be assigned to a variable of type {IR_NAMES[current]}.")
+        elif statementClass is ReturnStatement:
+            Type = self.typeOf(statement.returnValue)
+            if Type is not None and Type != function.returnType:
+                self.errors.append(f"~~~ COMPILE ERROR: Function {function.name.value} returns {IR_NAMES[function.returnType]}, not {IR_NAMES[Type]}.")
+        elif statementClass is ExpressionStatement:
+            self.typeOf(statement.expression)
+        elif statementClass is BlockStatement:
+            for inner in statement.statements:
+                self.checkStatement(inner, function)
+        elif statementClass is FunctionStatement:
+            self.checkFunction(statement)
+
+    def typeOf(self, node: Expression | None) -> str | None:
+        # None where the type is unknown, which never reports a second error for the same mistake
+        results: list[str | None] = []
+        stack: list[tuple[Expression | None, bool]] = [(node, False)]
+
+        while len(stack) > 0:
+            current, visited = stack.pop()
+            currentClass: type = current.__class__
+
+            if currentClass is InfixExpression:
+                if not visited:
+                    stack.append((current, True))
+                    stack.append((current.rightNode, False))
+                    stack.append((current.leftNode, False))
+                    continue
+
+                rightType: str | None = results.pop()
+                leftType: str | None = results.pop()
+                if leftType is not None and rightType is not None and leftType != rightType:
+                    self.errors.append(f"~~~ COMPILE ERROR: Operator {current.operator} can't be applied to {IR_NAMES[leftType]} and {IR_NAMES[rightType]}.")
+                results.append(leftType if leftType is not None else rightType)
+            elif currentClass is CallExpression:
+                if not visited:
+                    stack.append((current, True))
+                    for argument in reversed(current.arguments):
+                        stack.append((argument, False))
+                    continue
+
+                count: int = len(current.arguments)
+                arguments: list[str | None] = results[len(results) - count:]
+                del results[len(results) - count:]
+
+                function: FunctionStatement | None = self.functions.get(current.function.symbol)
+                if function is None:
+                    results.append(None)
+                    continue
+
+                parameters: list[str] = [parameter.valueType for parameter in function.parameters]
+                if len(arguments) != len(parameters) or any(Type is not None and Type != parameter for Type, parameter in zip(arguments, parameters)):
+                    self.errors.append(f"~~~ COMPILE ERROR: Function {function.name.value} called with the wrong arguments.")
+                results.append(function.returnType)
+            elif currentClass is IntegerLiteral:
+                results.append("int")
+            elif currentClass is DoubleLiteral:
+                results.append("double")
+            elif currentClass is IdentifierLiteral:
+                results.append(self.types.get(current.symbol))
+            else:
+                results.append(None)
+
+        return results[0]
\ No newline at end of file
@@ -0,0 +1,408 @@
+import math
+import time
+
+from AST import Program, Statement, Expression, ExpressionStatement, InfixExpression, IntegerLiteral, DoubleLiteral, CallExpression
+from AST import ShallStatement, IdentifierLiteral, BlockStatement, FunctionStatement, ReturnStatement, AssignStatement
+from Backend import Backend
+from Evaluator import wrapInt32, INT, DOUBLE
+from Incremental import nestedFunctions
+from Lazy import LazyJIT, LazyFunction, LazyJITError
+from PerfMap import PerfMap
+from Resolver import Symbol
+
+# region opcodes
+# every instruction is four ints in the code list: opcode, a, b, c; a is the destination register
+MOVE: int = 0               # a = b
+LOAD_CONSTANT: int = 1      # a = constants[b]
+ADD: int = 2                # a = b + c, i32
+SUBTRACT: int = 3
+MULTIPLY: int = 4
+DIVIDE: int = 5
+REMAINDER: int = 6
+DOUBLE_ADD: int = 7         # a = b + c, double
+DOUBLE_SUBTRACT: int = 8
+DOUBLE_MULTIPLY: int = 9
+DOUBLE_DIVIDE: int = 10
+DOUBLE_REMAINDER: int = 11
+CALL: int = 12              # a = functions[b](c, c + 1, ...)
+RETURN: int = 13            # return a
+FALL_OFF: int = 14          # the end of a function that never returned
+
+OPCODES: dict[tuple[str, str], int] = {
+    ("+", INT): ADD,
+    ("-", INT): SUBTRACT,
+    ("*", INT): MULTIPLY,
+    ("/", INT): DIVIDE,
+    ("%", INT): REMAINDER,
+    ("+", DOUBLE): DOUBLE_ADD,
+    ("-", DOUBLE): DOUBLE_SUBTRACT,
+    ("*", DOUBLE): DOUBLE_MULTIPLY,
+    ("/", DOUBLE): DOUBLE_DIVIDE,
+    ("%", DOUBLE): DOUBLE_REMAINDER
+}
+# endregion
+
+INT32_MIN: int = -(1 << 31)
+INT32_MAX: int = (1 << 31) - 1
+
+# deeper than this and native code would have run out of stack long ago
+MAX_FRAMES: int = 100_000
+
+class VMError(Exception):
+    pass
+
+class BytecodeFunction:
+    __slots__ = ("name", "parameterCount", "registerCount", "code", "constants", "unit", "calls", "native")
+
+    def __init__(self, name: str, parameterCount: int, unit: str | None) -> None:
+        self.name: str = name
+        self.parameterCount: int = parameterCount
+
+        # parameters first, then the other variables by their slot, then temporaries
+        self.registerCount: int = parameterCount
+        self.code: list[int] = []
+        self.constants: list[int | float] = []
+
+        # the top-level function LLVM compiles this one with, None for nested functions, which go along with their parent
+        self.unit: str | None = unit
+
+        self.calls: int = 0
+
+        # set once the function is promoted, calls then skip the VM
+        self.native: object | None = None
+
+class BytecodeCompiler:
+    # expects a resolved program that the Compiler accepted, so types are only tracked to pick instructions
+    def __init__(self) -> None:
+        self.functions: list[BytecodeFunction] = []
+        self.indices: dict[Symbol, int] = {}
+        self.returnTypes: dict[Symbol, str] = {}
+
+    def compileProgram(self, program: Program) -> dict[str, BytecodeFunction]:
+        # the top-level functions by name
+        nodes: list[tuple[FunctionStatement, str]] = []
+        for statement in program.statements:
+            for node in nestedFunctions(statement):
+                self.indices[node.name.symbol] = len(self.functions)
+                self.returnTypes[node.name.symbol] = node.returnType
+                self.functions.append(BytecodeFunction(node.name.value, len(node.parameters), statement.name.value if node is statement else None))
+                nodes.append((node, statement.name.value))
+
+        for node, _ in nodes:
+            self.compileFunction(node, self.functions[self.indices[node.name.symbol]])
+
+        return {statement.name.value: self.functions[self.indices[statement.name.symbol]] for statement in program.statements}
+
+    def compileFunction(self, node: FunctionStatement, function: BytecodeFunction) -> None:
+        statements: list[Statement] = []
+        stack: list[Statement | None] = [node.body]
+        while len(stack) > 0:
+            current: Statement | None = stack.pop()
+            if current.__class__ is BlockStatement:
+                stack.extend(reversed(current.statements))
+            elif current is not None and current.__class__ is not FunctionStatement:
+                statements.append(current)
+
+        # variables keep the register of their slot, temporaries go above all of them
+        base: int = len(node.parameters)
+        for statement in statements:
+            if statement.__class__ is ShallStatement:
+                base = max(base, statement.name.symbol.index + 1)
+
+        self.code: list[int] = function.code
+        self.constants: list[int | float] = function.constants
+        self.constantIndices: dict[tuple[str, int | float], int] = {}
+        self.base: int = base
+        self.top: int = base
+        self.registerCount: int = base
+        self.types: dict[int, str] = {parameter.symbol.index: parameter.valueType for parameter in node.parameters}
+
+        for statement in statements:
+            statementClass: type = statement.__class__
+
+            if statementClass is ShallStatement:
+                self.storeVariable(statement.name.symbol.index, statement.value)
+            elif statementClass is AssignStatement:
+                self.storeVariable(statement.ident.symbol.index, statement.rightValue)
+            elif statementClass is ReturnStatement:
+                register, _ = self.emitExpression(statement.returnValue)
+                self.emit(RETURN, register, 0, 0)
+            elif statementClass is ExpressionStatement and (statement.expression.__class__ is InfixExpression or statement.expression.__class__ is CallExpression):
+                # the Compiler only emits infix and call expression statements
+                self.emitExpression(statement.expression)
+
+            self.top = base
+
+        self.emit(FALL_OFF, 0, 0, 0)
+        function.registerCount = self.registerCount
+
+    def storeVariable(self, register: int, node: Expression) -> None:
+        value, Type = self.emitExpression(node)
+
+        # the instruction that made a temporary writes to the variable instead
+        if value >= self.base:
+            self.code[-3] = register
+        elif value != register:
+            self.emit(MOVE, register, value, 0)
+
+        self.types[register] = Type
+
+    def emitExpression(self, node: Expression) -> tuple[int, str]:
+        # post-order over an explicit stack; temporaries are allocated and freed like a stack, so an operand's temporaries are always on top
+        values: list[tuple[int, str]] = []
+        stack: list[tuple[Expression, bool]] = [(node, False)]
+
+        while len(stack) > 0:
+            current, visited = stack.pop()
+            currentClass: type = current.__class__
+
+            if visited:
+                if currentClass is CallExpression:
+                    count: int = len(current.arguments)
+                    arguments: list[tuple[int, str]] = values[len(values) - count:]
+                    del values[len(values) - count:]
+
+                    self.free(register for register, _ in arguments)
+                    start: int = self.top
+
+                    # arguments go to consecutive registers; a temporary only ever moves up, so moving the last one first never overwrites one still needed
+                    for index in range(count - 1, -1, -1):
+                        if arguments[index][0] != start + index:
+                            self.emit(MOVE, start + index, arguments[index][0], 0)
+                    self.registerCount = max(self.registerCount, start + count)
+
+                    symbol: Symbol = current.function.symbol
+                    register: int = self.allocate()
+                    self.emit(CALL, register, self.indices[symbol], start)
+                    values.append((register, self.returnTypes[symbol]))
+                else:
+                    right, rightType = values.pop()
+                    left, leftType = values.pop()
+                    self.free((left, right))
+
+                    register = self.allocate()
+                    self.emit(OPCODES[(current.operator, leftType)], register, left, right)
+                    values.append((register, leftType))
+            elif currentClass is InfixExpression:
+                stack.append((current, True))
+                stack.append((current.rightNode, False))
+                stack.append((current.leftNode, False))
+            elif currentClass is CallExpression:
+                stack.append((current, True))
+                for argument in reversed(current.arguments):
+                    stack.append((argument, False))
+            elif currentClass is IntegerLiteral or currentClass is DoubleLiteral:
+                Type: str = INT if currentClass is IntegerLiteral else DOUBLE
+                register = self.allocate()
+                self.emit(LOAD_CONSTANT, register, self.constant(Type, wrapInt32(current.value) if Type == INT else current.value), 0)
+                values.append((register, Type))
+            else:
+                register = current.symbol.index
+                values.append((register, self.types[register]))
+
+        return values.pop()
+
+    # region helpers
+    def emit(self, opcode: int, a: int, b: int, c: int) -> None:
+        self.code.extend((opcode, a, b, c))
+
+    def allocate(self) -> int:
+        register: int = self.top
+        self.top += 1
+        self.registerCount = max(self.registerCount, self.top)
+        return register
+
+    def free(self, registers) -> None:
+        for register in registers:
+            if register >= self.base:
+                self.top -= 1
+
+    def constant(self, Type: str, value: int | float) -> int:
+        # hex keeps 0.0 and -0.0 apart
+        key: tuple[str, int | float] = (Type, value.hex() if Type == DOUBLE else value)
+        index: int | None = self.constantIndices.get(key)
+        if index is None:
+            index = len(self.constants)
+            self.constants.append(value)
+            self.constantIndices[key] = index
+        return index
+    # endregion
+
+class VirtualMachine:
+    # register machine: each frame is a flat list of registers, calls push the caller's state instead of recursing in Python
+    def __init__(self, functions: list[BytecodeFunction], promote: callable = None, threshold: int = 0) -> None:
+        self.functions: list[BytecodeFunction] = functions
+
+        # called with a function that just reached threshold calls; returns its native code, or None to keep interpreting
+        self.promote: callable | None = promote
+        self.threshold: int = threshold if promote is not None else 0
+
+    def invoke(self, function: BytecodeFunction, arguments: tuple) -> int | float:
+        function.calls += 1
+        if function.calls == self.threshold and function.unit is not None:
+            function.native = self.promote(function)
+
+        if function.native is not None:
+            return function.native(*arguments)
+        return self.execute(function, list(arguments))
+
+    def execute(self, function: BytecodeFunction, arguments: list[int | float]) -> int | float:
+        functions: list[BytecodeFunction] = self.functions
+        threshold: int = self.threshold
+
+        registers: list[int | float] = arguments + [0] * (function.registerCount - len(arguments))
+        code: list[int] = function.code
+        constants: list[int | float] = function.constants
+        pc: int = 0
+
+        # (function, registers, pc, destination) of every caller
+        frames: list[tuple[BytecodeFunction, list[int | float], int, int]] = []
+
+        while True:
+            opcode: int = code[pc]
+            a: int = code[pc + 1]
+            b: int = code[pc + 2]
+            c: int = code[pc + 3]
+            pc += 4
+
+            if opcode == LOAD_CONSTANT:
+                registers[a] = constants[b]
+            elif opcode == MOVE:
+                registers[a] = registers[b]
+            elif opcode <= REMAINDER:
+                left: int = registers[b]
+                right: int = registers[c]
+                if opcode == ADD:
+                    value: int = left + right
+                elif opcode == SUBTRACT:
+                    value = left - right
+                elif opcode == MULTIPLY:
+                    value = left * right
+                else:
+                    if right == 0:
+                        raise VMError(f"~~~ RUNTIME ERROR: Division by zero in {function.name}.")
+
+                    # sdiv and srem truncate toward zero
+                    value = abs(left) // abs(right)
+                    if (left < 0) != (right < 0):
+                        value = -value
+                    if opcode == REMAINDER:
+                        value = left - right * value
+
+                registers[a] = value if INT32_MIN <= value <= INT32_MAX else wrapInt32(value)
+            elif opcode <= DOUBLE_REMAINDER:
+                registers[a] = self.doubleArithmetic(opcode, registers[b], registers[c])
+            elif opcode == CALL:
+                callee: BytecodeFunction = functions[b]
+                count: int = callee.parameterCount
+
+                callee.calls += 1
+                if callee.calls == threshold and callee.unit is not None:
+                    callee.native = self.promote(callee)
+
+                if callee.native is not None:
+                    registers[a] = callee.native(*registers[c:c + count])
+                    continue
+
+                if len(frames) >= MAX_FRAMES:
+                    raise VMError(f"~~~ RUNTIME ERROR: Call stack overflow in {callee.name}.")
+
+                frames.append((function, registers, pc, a))
+
+                calleeRegisters: list[int | float] = registers[c:c + count]
+                calleeRegisters.extend([0] * (callee.registerCount - count))
+
+                function, registers, pc = callee, calleeRegisters, 0
+                code, constants = callee.code, callee.constants
+            elif opcode == RETURN:
+                value = registers[a]
+                if len(frames) == 0:
+                    return value
+
+                function, registers, pc, destination = frames.pop()
+                code, constants = function.code, function.constants
+                registers[destination] = value
+            else:
+                raise VMError(f"~~~ RUNTIME ERROR: {function.name} ended without returning a value.")
+
+    def doubleArithmetic(self, opcode: int, left: float, right: float) -> float:
+        # IEEE semantics where Python raises: fdiv by zero gives an infinity or NaN, frem of an infinity or by zero gives NaN
+        if opcode == DOUBLE_ADD:
+            return left + right
+        if opcode == DOUBLE_SUBTRACT:
+            return left - right
+        if opcode == DOUBLE_MULTIPLY:
+            return left * right
+        if opcode == DOUBLE_DIVIDE:
+            if right == 0.0:
+                if left == 0.0 or math.isnan(left):
+                    return math.nan
+                return math.copysign(math.inf, left) * math.copysign(1.0, right)
+            return left / right
+
+        try:
+            return math.fmod(left, right)
+        except ValueError:
+            return math.nan
+
+class TieredJIT(LazyJIT):
+    # functions start out interpreted; one called threshold times is compiled by LLVM and every later call runs native code.
+    # interpreted functions sit behind the same trampolines as lazy ones, so native callers reach the VM through the stub
+    def __init__(self, backend: Backend, createCompiler: callable, threshold: int = 1000, perfMap: PerfMap | None = None) -> None:
+        super().__init__(backend, createCompiler, perfMap)
+
+        # 0 keeps everything in the VM
+        self.threshold: int = threshold
+
+        self.bytecode: dict[str, BytecodeFunction] = {}
+        self.machine: VirtualMachine | None = None
+
+    def load(self, program: Program, hashCons: bool = False) -> bool:
+        # the IR is still generated up front, it reports compile errors and is ready when a function gets hot
+        if not super().load(program, hashCons):
+            return False
+
+        startTime: float = time.perf_counter()
+
+        compiler: BytecodeCompiler = BytecodeCompiler()
+        self.bytecode = compiler.compileProgram(program)
+        self.machine = VirtualMachine(compiler.functions, self.promote if self.threshold > 0 else None, self.threshold)
+
+        self.startupTime += time.perf_counter() - startTime
+        return True
+
+    def promote(self, function: BytecodeFunction) -> object:
+        return self.materialize(self.functions[function.unit])
+
+    def stubFor(self, function: LazyFunction) -> callable:
+        bytecode: BytecodeFunction = self.bytecode[function.name]
+
+        def stub(*arguments):
+            # native code calling a function that is still interpreted
+            if self.pendingError is not None:
+                return 0
+            try:
+                return self.machine.invoke(bytecode, arguments)
+            except (VMError, LazyJITError) as error:
+                # it can't cross the C frames, it waits in pendingError until the VM is back on top
+                self.pendingError = error
+                return 0
+        return stub
+
+    def run(self, name: str, arguments: tuple = ()) -> int | float:
+        result: int | float = self.machine.invoke(self.bytecode[name], arguments)
+        if self.pendingError is not None:
+            raise self.pendingError
+        return result
+
+    def report(self) -> str:
+        lines: list[str] = [f"=== TIERED JIT ({self.compiledCount} of {len(self.functions)} functions compiled, threshold {self.threshold}, startup {round(self.startupTime * 1000, 3)} ms) ==="]
+        for name, function in self.functions.items():
+            calls: int = self.bytecode[name].calls
+            if function.implementation is not None:
+                lines.append(f"{name}: {calls} calls, compiled #{function.order + 1}, in {round(function.compileTime * 1000, 3)} ms")
+            elif calls > 0:
+                lines.append(f"{name}: {calls} calls, interpreted")
+            else:
+                lines.append(f"{name}: never called")
+        return "\n".join(lines)
\ No newline at end of file
@@ -1,8 +1,26 @@
-from Lexer import Lexer
+from Lexer import Lexer, StreamLexer
 from Parser import Parser
+from IndexedParser import IndexedParser
 from AST import Program
+from Arena import ASTArena
 from Compiler import Compiler
+from TextCompiler import TextCompiler, TextModule
+from HashCons import HashConser
+from Optimizer import Optimizer
+from Resolver import Resolver
+from TypeChecker import TypeChecker
+from Backend import Backend
+from Cache import CompilationCache, hashFile
+from Incremental import IncrementalBuilder
+from Parallel import CompilePool, ParallelFrontend
+from Lazy import LazyJIT, LazyJITError
+from VM import TieredJIT, VMError
+from Instrumentation import Instrumentation
+from Profile import RuntimeProfile
+from PerfMap import PerfMap
 import json
+import os
+import subprocess
 import time
 
 from llvmlite import ir
@@ -11,28 +29,109 @@ from ctypes import CFUNCTYPE, c_int, c_double
 
 LEXER_DEBUG: bool = 0
 PARSER_DEBUG: bool = 0
+OPTIMIZER_DEBUG: bool = 0
 COMPILER_DEBUG: bool = 0
 RUN_PROGRAM: bool = 1
+STREAM_LEXER: bool = 0
+ARENA_AST: bool = 0
+HASH_CONS: bool = 0
+OPTIMIZE_AST: bool = 1
+SSA_CODEGEN: bool = 1
+HOST_CPU: bool = 1
+TEXT_BACKEND: bool = 1
+COMPILATION_CACHE: bool = 1
+CACHE_DEBUG: bool = 0
+INCREMENTAL: bool = 0
+INCREMENTAL_DEBUG: bool = 0
+PARALLEL_BUILD: bool = 0
+PARALLEL_FRONTEND: bool = 0
+AOT_BUILD: bool = 0
+LAZY_JIT: bool = 0
+LAZY_JIT_DEBUG: bool = 0
+TIERED_VM: bool = 0
+PROFILE_PIPELINE: bool = 0
+PROFILE_MEMORY: bool = 1
+RUNTIME_PROFILE: bool = 0
+DEBUG_INFO: bool = 0
+PERF_MAP: bool = 0
 
-if __name__ == '__main__':
-    with open("../tests/test.cpl", "r") as f:
-        source: str = f.read()
+# O0, O1, O2, O3, Os or Oz
+OPT_LEVEL: str = "O2"
+
+# calls after which TIERED_VM hands a function to LLVM, 0 to interpret everything
+TIER_THRESHOLD: int = 1000
+
+# worker processes for PARALLEL_BUILD and PARALLEL_FRONTEND, 0 for one per core
+JOBS: int = 0
+
+SOURCE_PATH: str = "../tests/test.cpl"
+
+# AOT_BUILD output; OBJECT_PATH may be empty to skip the object file
+EXECUTABLE_PATH: str = "../build/program"
+OBJECT_PATH: str = "../build/program.o"
+
+CACHE_PATH: str = "../.cache"
+CACHE_SIZE: int = 256 << 20
+
+# PROFILE_PIPELINE repeats the uncached pipeline, leaving the warmup runs out of the numbers
+PROFILE_RUNS: int = 5
+PROFILE_WARMUP: int = 1
+PROFILE_PATH: str = "../build/profile.json"
+
+instrumentation: Instrumentation = Instrumentation(enabled=PROFILE_PIPELINE, memory=PROFILE_MEMORY)
+
+# RUNTIME_PROFILE writes the counters of the instrumented run here; PGO_PROFILE_PATH reads such a file back for the next compile, empty for none
+RUNTIME_PROFILE_PATH: str = "../build/runtime-profile.json"
+PGO_PROFILE_PATH: str = ""
+
+pgoProfile: RuntimeProfile | None = RuntimeProfile.load(PGO_PROFILE_PATH) if PGO_PROFILE_PATH else None
+
+# DEBUG_INFO gives the code DWARF line tables for this file, which debuggers and PERF_MAP's /tmp/perf-<pid>.map use to name source lines
+debugFile: str | None = os.path.abspath(SOURCE_PATH) if DEBUG_INFO else None
 
+def parseSource() -> Program:
     if LEXER_DEBUG:
         print("=== LEXER DEBUG ===")
-        debugLexer: Lexer = Lexer(source)
-        while debugLexer.currentChar is not None:
-            print(debugLexer.nextToken())
+        with StreamLexer(SOURCE_PATH) as debugLexer:
+            for token in debugLexer.tokens():
+                print(token)
 
-    lexer: Lexer = Lexer(source)
-    parser: Parser = Parser(lexer)
+    program: Program | None = None
 
-    program: Program = parser.parseProgram()
-    
-    if len(parser.errors) > 0:
-        for error in parser.errors:
-            print(error)
-        exit(1)
+    if STREAM_LEXER:
+        # tokens are produced lazily from the mapped file, the source is never held as one str
+        lexer: StreamLexer = StreamLexer(SOURCE_PATH)
+    else:
+        with instrumentation.phase("read"):
+            with open(SOURCE_PATH, "r") as f:
+                source: str = f.read()
+
+        if PARALLEL_FRONTEND:
+            # top-level functions are lexed and parsed in worker processes; errors and small files take the sequential path
+            with instrumentation.phase("parallel frontend"):
+                program = ParallelFrontend(jobs=JOBS or None).parse(source)
+
+        lexer: Lexer | None = None
+        if program is None:
+            with instrumentation.phase("lex"):
+                lexer = Lexer(source)
+            instrumentation.count("tokens", len(lexer.buffer.kinds))
+
+    if program is None:
+        if STREAM_LEXER:
+            parser: Parser = Parser(lexer)
+        else:
+            # the whole token buffer is available, so parse it by index
+            parser: IndexedParser = IndexedParser(lexer.buffer)
+
+        # the stream lexer produces its tokens as the parser asks, so lexing is part of this phase there
+        with instrumentation.phase("parse"):
+            program = parser.parseProgram()
+        
+        if len(parser.errors) > 0:
+            for error in parser.errors:
+                print(error)
+            exit(1)
 
     if PARSER_DEBUG:
         print("=== PARSER DEBUG ===")
@@ -41,12 +140,114 @@ if __name__ == '__main__':
         
         print ("AST saved to ast.json")
 
-    compiler: Compiler = Compiler()
-    compiler.compile(program)
+    return program
+
+def resolveProgram(program: Program) -> None:
+    # bind every identifier to its slot once, so neither the optimizer nor code generation searches scopes, then check the types;
+    # both run before the optimizer, which would otherwise drop the errors of code it removes without a word
+    resolver: Resolver = Resolver()
+    with instrumentation.phase("resolution"):
+        resolver.resolve(program)
+
+    errors: list[str] = resolver.errors
+    if len(errors) == 0:
+        checker: TypeChecker = TypeChecker()
+        with instrumentation.phase("type checking"):
+            checker.check(program)
+        errors = checker.errors
+
+    if len(errors) > 0:
+        for error in errors:
+            print(error)
+        exit(1)
+
+def optimizeProgram(program: Program) -> None:
+    if program.symbols is None:
+        resolveProgram(program)
+
+    if instrumentation.enabled:
+        instrumentation.count("AST nodes", len(ASTArena.fromProgram(program)))
+
+    optimizer: Optimizer = Optimizer(enabled=OPTIMIZE_AST)
+    with instrumentation.phase("AST optimization"):
+        optimizer.optimize(program)
+
+    if instrumentation.enabled:
+        instrumentation.count("optimized AST nodes", len(ASTArena.fromProgram(program)))
+
+    if pgoProfile is not None:
+        # hot functions first, never executed ones last
+        pgoProfile.order(program)
+
+    if OPTIMIZER_DEBUG:
+        print(optimizer.report())
+
+def profileOptions() -> tuple[bool, dict[str, list[str]] | None]:
+    # an executable has nobody to read its counters, so only JIT runs are instrumented
+    instrument: bool = RUNTIME_PROFILE and not AOT_BUILD
+    functionAttributes: dict[str, list[str]] | None = pgoProfile.functionAttributes() if pgoProfile is not None else None
+    return instrument, functionAttributes
+
+def createCompiler() -> Compiler | TextCompiler:
+    instrument, functionAttributes = profileOptions()
+
+    # variables become SSA values directly instead of stack slots for LLVM to promote
+    if TEXT_BACKEND and not ARENA_AST:
+        # writes the IR text straight away, LLVM parses it the same way it parses llvmlite's output
+        return TextCompiler(cse=HASH_CONS, ssa=SSA_CODEGEN, instrument=instrument, functionAttributes=functionAttributes, debugFile=debugFile)
+    return Compiler(cse=HASH_CONS, ssa=SSA_CODEGEN, instrument=instrument, functionAttributes=functionAttributes, debugFile=debugFile)
+
+def codegenOptions() -> tuple:
+    # every setting that changes the emitted code is part of the cache key; the PGO digest stands for the attributes it adds
+    instrument, _ = profileOptions()
+    textBackend: bool = TEXT_BACKEND and not ARENA_AST
+    return (OPTIMIZE_AST, SSA_CODEGEN, HASH_CONS, textBackend, ARENA_AST, instrument, pgoProfile.digest() if pgoProfile is not None else "", debugFile or "")
+
+def compileProgram(program: Program, backend: Backend) -> llvm.ModuleRef:
+    if program.symbols is None:
+        resolveProgram(program)
+
+    if HASH_CONS:
+        # share identical subtrees so the compiler can reuse their values
+        with instrumentation.phase("hash-consing"):
+            HashConser().internProgram(program)
+
+    compiler: Compiler | TextCompiler = createCompiler()
+
+    with instrumentation.phase("code generation"):
+        if ARENA_AST:
+            # flatten the tree and let the node objects go before code generation
+            arena: ASTArena = ASTArena.fromProgram(program)
+            del program
+            compiler.compileArena(arena)
+        else:
+            compiler.compile(program)
+
+    # calls with the wrong arguments, duplicate definitions and mismatched operands leave placeholders behind
+    if len(compiler.errors) > 0:
+        for error in compiler.errors:
+            print(error)
+        exit(1)
 
     # output
-    module: ir.Module = compiler.module
-    module.triple = llvm.get_default_triple()
+    module: ir.Module | TextModule = compiler.module
+
+    with instrumentation.phase("IR printing"):
+        text: str = str(module)
+    instrumentation.count("IR bytes", len(text))
+
+    try:
+        with instrumentation.phase("parse_assembly"):
+            moduleRef: llvm.ModuleRef = backend.parseAssembly(text, verify=False)
+        with instrumentation.phase("verification"):
+            moduleRef.verify()
+    except Exception as exc:
+        print(exc)
+        raise
+
+    if instrumentation.enabled:
+        instrumentation.count("functions", sum(1 for function in moduleRef.functions if not function.is_declaration))
+        instrumentation.count("IR instructions", countInstructions(moduleRef))
 
     if COMPILER_DEBUG:
         with open("../debug/a.ll", "w") as f:
@@ -54,28 +255,185 @@ if __name__ == '__main__':
         print("=== COMPILER DEBUG ===")
         print(module)
 
-    if RUN_PROGRAM:
-        llvm.initialize()
-        llvm.initialize_native_target()
-        llvm.initialize_native_asmprinter()
-        
-        try:
-            llvmIrParsed = llvm.parse_assembly(str(module))
-            llvmIrParsed.verify()
-        except Exception as exc:
-            print(exc)
-            raise
+    with instrumentation.phase("LLVM optimization"):
+        backend.optimize(moduleRef)
+
+    if instrumentation.enabled:
+        instrumentation.count("optimized IR instructions", countInstructions(moduleRef))
+
+    if COMPILER_DEBUG:
+        print(f"=== OPTIMIZED IR ({OPT_LEVEL}, {backend.cpu or 'generic'}) ===")
+        print(moduleRef)
+
+    return moduleRef
+
+def countInstructions(moduleRef: llvm.ModuleRef) -> int:
+    return sum(1 for function in moduleRef.functions for block in function.blocks for _ in block.instructions)
+
+def runProgram(entry: int) -> None:
+    cfunc = CFUNCTYPE(c_int)(entry)
+
+    startTime = time.time()
+    result = cfunc()
+    endTime = time.time()
+
+    print(f'\nProgram returned: {result}\n === Executed in {round((endTime - startTime) * 1000, 9)} ms. ===')
+
+def runLazy(lazy: LazyJIT) -> None:
+    startTime = time.time()
+    try:
+        result = lazy.run('mn')
+    except (VMError, LazyJITError) as error:
+        print(error)
+        exit(1)
+    endTime = time.time()
+
+    print(f'\nProgram returned: {result}\n === Executed in {round((endTime - startTime) * 1000, 9)} ms. ===')
+
+def profilePipeline(backend: Backend) -> None:
+    # the default path without the cache: parse, compile the whole program, JIT it and run mn
+    result: int | None = None
+    for run in range(PROFILE_WARMUP + PROFILE_RUNS):
+        instrumentation.startRun(warmup=run < PROFILE_WARMUP)
+
+        program: Program = parseSource()
+        optimizeProgram(program)
+        moduleRef: llvm.ModuleRef = compileProgram(program, backend)
+
+        with instrumentation.phase("MCJIT finalization"):
+            engine: llvm.ExecutionEngine = backend.jit(moduleRef)
+
+        if RUN_PROGRAM:
+            cfunc = CFUNCTYPE(c_int)(engine.get_function_address('mn'))
+            with instrumentation.phase("execution"):
+                result = cfunc()
+
+        instrumentation.endRun()
+
+    if result is not None:
+        print(f'\nProgram returned: {result}')
+    print(instrumentation.table())
+
+    instrumentation.save(PROFILE_PATH)
+    print(f"Profile written to {PROFILE_PATH}")
+
+if __name__ == '__main__':
+    backend: Backend = Backend(optLevel=OPT_LEVEL, hostCPU=HOST_CPU)
+
+    if PROFILE_PIPELINE:
+        profilePipeline(backend)
+        exit(0)
+
+    # the debug output comes from the pipeline itself, so asking for it bypasses the cache
+    # the runtime profile names its functions after the program, which a cached object skips
+    useCache: bool = COMPILATION_CACHE and not (LEXER_DEBUG or PARSER_DEBUG or OPTIMIZER_DEBUG or COMPILER_DEBUG or RUNTIME_PROFILE)
+    cache: CompilationCache | None = CompilationCache(CACHE_PATH, maxBytes=CACHE_SIZE) if useCache else None
+
+    options: tuple = codegenOptions()
+    perFunction: bool = INCREMENTAL or PARALLEL_BUILD
+    # counting calls needs every function compiled with the counters in, not left to the VM or to first use
+    lazyRun: bool = (LAZY_JIT or TIERED_VM) and RUN_PROGRAM and not AOT_BUILD and not RUNTIME_PROFILE
+
+    # per-function objects replace the whole-program one when functions are built one by one
+    objects: list[bytes] | None = None
+    objectCode: bytes | None = None
+
+    if cache is not None:
+        sourceDigest: str = hashFile(SOURCE_PATH)
+        frontendKey: str = cache.frontendKey(sourceDigest)
+        backendKey: str = cache.backendKey(sourceDigest, OPT_LEVEL, backend.triple, backend.cpu, backend.features, options)
+
+        if not perFunction and not lazyRun:
+            objectCode = cache.load(backendKey, "object")
+
+    if objectCode is None:
+        # the AST is shared by every optimization level and target, so it may still be there
+        astData: bytes | None = cache.load(frontendKey, "ast") if cache is not None else None
+        if astData is not None:
+            program: Program = ASTArena.deserialize(astData).toProgram()
+        else:
+            program: Program = parseSource()
+            if cache is not None:
+                cache.store(frontendKey, {"ast": ASTArena.fromProgram(program).serialize()})
+
+        optimizeProgram(program)
+
+        if lazyRun:
+            # nothing is code generated up front: functions compile on their first call, or start in the VM and compile once hot
+            perfMap: PerfMap | None = PerfMap() if PERF_MAP else None
+            lazy: LazyJIT = TieredJIT(backend, createCompiler, TIER_THRESHOLD, perfMap) if TIERED_VM else LazyJIT(backend, createCompiler, perfMap)
+            if lazy.load(program, hashCons=HASH_CONS):
+                if cache is not None:
+                    cache.saveStatistics()
+                runLazy(lazy)
+                if LAZY_JIT_DEBUG:
+                    print(lazy.report())
+                exit(0)
+
+            if len(lazy.errors) > 0:
+                for error in lazy.errors:
+                    print(error)
+                exit(1)
+
+        if perFunction:
+            instrument, functionAttributes = profileOptions()
+            pool: CompilePool | None = CompilePool(OPT_LEVEL, HOST_CPU, TEXT_BACKEND and not ARENA_AST, HASH_CONS, SSA_CODEGEN, jobs=JOBS or None,
+                                                   instrument=instrument, functionAttributes=functionAttributes, debugFile=debugFile) if PARALLEL_BUILD else None
+
+            builder: IncrementalBuilder = IncrementalBuilder(backend, createCompiler, cache if INCREMENTAL else None, options, pool, locations=DEBUG_INFO)
+            objects = builder.build(program, hashCons=HASH_CONS)
+
+            if pool is not None:
+                pool.close()
+
+            if len(builder.errors) > 0:
+                for error in builder.errors:
+                    print(error)
+                exit(1)
+
+            if INCREMENTAL_DEBUG:
+                print(builder.report() if objects is not None else "=== INCREMENTAL BUILD ===\nnot split, building the whole program")
+
+        if objects is None:
+            moduleRef: llvm.ModuleRef = compileProgram(program, backend)
+
+            # code generation happens once, the same object is cached and loaded into the engine
+            objectCode = backend.emitObject(moduleRef)
+            if cache is not None:
+                cache.store(backendKey, {"bitcode": moduleRef.as_bitcode(), "object": objectCode})
+
+    if cache is not None:
+        cache.saveStatistics()
+        if CACHE_DEBUG:
+            print(cache.report())
+
+    if objects is None:
+        objects = [objectCode]
 
-        targetMachine = llvm.Target.from_default_triple().create_target_machine()
+    if AOT_BUILD:
+        # a standalone executable, later runs pay neither Python nor LLVM
+        if OBJECT_PATH:
+            backend.writeObject(objects, OBJECT_PATH)
+        backend.linkExecutable(objects, EXECUTABLE_PATH)
+        print(f"Executable written to {EXECUTABLE_PATH}")
 
-        engine = llvm.create_mcjit_compiler(llvmIrParsed, targetMachine)
-        engine.finalize_object()
+        if RUN_PROGRAM:
+            subprocess.run([os.path.abspath(EXECUTABLE_PATH)])
+    elif RUN_PROGRAM:
+        # the engine owns the code, it has to outlive the call
+        engine: llvm.ExecutionEngine = backend.loadObjects(objects)
 
-        entry = engine.get_function_address('mn')
-        cfunc = CFUNCTYPE(c_int)(entry)
+        if PERF_MAP:
+            # written before the run, so a profiler still finds it if the program never returns
+            perfMap: PerfMap = PerfMap()
+            for objectCode in objects:
+                perfMap.addObject(objectCode, engine)
+            perfMap.write()
 
-        startTime = time.time()
-        result = cfunc()
-        endTime = time.time()
+        runProgram(engine.get_function_address('mn'))
 
-        print(f'\nProgram returned: {result}\n === Executed in {round((endTime - startTime) * 1000, 9)} ms. ===')
\ No newline at end of file
+        if RUNTIME_PROFILE:
+            runtimeProfile: RuntimeProfile = RuntimeProfile.collect(engine, program)
+            print(runtimeProfile.table())
+            runtimeProfile.save(RUNTIME_PROFILE_PATH)
+            print(f"Runtime profile written to {RUNTIME_PROFILE_PATH}")
\ No newline at end of file